@@ -0,0 +1,2 @@
+## @package bench
+#  Benchmarks of interpreter loading and execution.
@@ -0,0 +1,54 @@
+## @package batch_throughput
+#  Throughput of lockstep batch engine and per-input processes.
+#
+#  Usage: python -m bench.batch_throughput [BATCH_SIZE] [PROCESS_COUNT]
+
+from bench.programs import batch_program, to_text
+from interpret.batch import run_batch
+from interpret.core import Interpreter
+from parse.parse_text import parse_text
+
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+## Number of loop iterations of benchmarked program.
+ITERATIONS = 200
+
+## Entrypoint of a benchmark.
+def main():
+  batch_size = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+  process_count = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+  source = to_text(batch_program(ITERATIONS))
+  inputs = [f"{idx % 1000 + 1}\n" for idx in range(batch_size)]
+
+  interpreter = Interpreter()
+  parse_text(io.StringIO(source), interpreter)
+  interpreter.instr_sort()
+  start = time.perf_counter()
+  results = run_batch(interpreter._instr_list, inputs)
+  batch_time = time.perf_counter() - start
+
+  script = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                        "interpret.py")
+  with tempfile.NamedTemporaryFile("w", suffix=".IPPcode22") as src_file:
+    src_file.write(source)
+    src_file.flush()
+    start = time.perf_counter()
+    for text in inputs[:process_count]:
+      proc = subprocess.run([sys.executable, script, "--source", src_file.name,
+                             "--source-format", "text"],
+                            input=text, capture_output=True, text=True)
+      assert proc.stdout == results[inputs.index(text)].stdout
+    process_time = time.perf_counter() - start
+
+  vectorized = sum(result.vectorized for result in results)
+  print(f"batch:     {batch_size} inputs, {batch_size / batch_time:.1f} inputs/s"
+        f" ({vectorized} vectorized)")
+  print(f"processes: {process_count} inputs, {process_count / process_time:.1f} inputs/s")
+
+if __name__ == "__main__":
+  main()
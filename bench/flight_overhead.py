@@ -0,0 +1,57 @@
+## @package flight_overhead
+#  Overhead of flight recorder.
+#
+#  Compares Interpreter.execute to execution recorded by flight
+#  recorder, with and without types of variable operands.
+#
+#  Usage: python -m bench.flight_overhead [ITERATIONS]
+
+from bench.hook_overhead import measure
+from bench.programs import batch_program, to_text
+from interpret.core import Interpreter
+from interpret.flight import FlightRecorder
+from interpret.instruction import Instruction
+from parse.parse_text import parse_text
+
+import io
+import sys
+
+## Run interpreter with flight recorder of positions.
+#  @param interpreter Interpreter with loaded instructions.
+def flight_run(interpreter):
+  interpreter.execute_flight(FlightRecorder())
+
+## Run interpreter with flight recorder of positions and types.
+#  @param interpreter Interpreter with loaded instructions.
+def flight_types_run(interpreter):
+  recorder = FlightRecorder(types = True)
+  recorder.start(interpreter._instr_list)
+  try:
+    interpreter.execute_flight(recorder)
+  finally:
+    recorder.stop()
+
+## Entrypoint of a benchmark.
+def main():
+  iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+  interpreter = Interpreter()
+  parse_text(io.StringIO(to_text(batch_program(iterations))), interpreter)
+  interpreter.instr_sort()
+  interpreter.find_labels()
+  Instruction.switch_interpreter(interpreter)
+
+  output = io.StringIO()
+  stdout = sys.stdout
+  sys.stdout = output
+  try:
+    plain, flight, flight_types = measure(interpreter, (Interpreter.execute, flight_run,
+                                                        flight_types_run))
+  finally:
+    sys.stdout = stdout
+
+  print(f"execute:               {plain:.3f} s")
+  print(f"flight recorder:       {flight:.3f} s ({(flight / plain - 1) * 100:+.1f} %)")
+  print(f"flight recorder types: {flight_types:.3f} s ({(flight_types / plain - 1) * 100:+.1f} %)")
+
+if __name__ == "__main__":
+  main()
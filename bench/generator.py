@@ -0,0 +1,247 @@
+## @package generator
+#  Generator of synthetic programs for load and performance testing.
+#
+#  Generated programs are valid IPPcode22 programs in XML representation
+#  with tunable size and shape. For each program, input file and expected
+#  output and exit code produced by reference interpreter are written
+#  in the usual test layout (name.src, name.in, name.out, name.rc).
+#
+#  Usage: python -m bench.generator OUTDIR [options]
+
+from bench.programs import to_text, to_xml
+from interpret.core import Interpreter
+from interpret.runner import run_program
+from parse.parse_text import parse_text
+
+import argparse
+import io
+import os
+import random
+
+## Number of integer variables in global frame.
+INT_VARS = 4
+## Modulus keeping integer values small.
+MODULUS = 1009
+
+## Program generator.
+#
+#  Program is built as list of instructions (see bench.programs),
+#  main body first, then recursive function.
+class ProgramGenerator:
+  ## Program generator constructor.
+  #  @param rng             Random number generator.
+  #  @param instr_count     Approximate number of instructions.
+  #  @param loop_depth      Maximal nesting of loops.
+  #  @param loop_iterations Number of iterations of each loop.
+  #  @param recursion_depth Depth of recursive calls (0 for none).
+  #  @param mix             Weights of integer, string and stack statements.
+  #  @param label_density   Probability of label after statement.
+  def __init__(self, rng, instr_count, loop_depth = 2, loop_iterations = 10,
+               recursion_depth = 0, mix = (3, 1, 1), label_density = 0.05):
+    self._rng = rng                         ## Random number generator.
+    self._instr_count = instr_count         ## Approximate number of instructions.
+    self._loop_depth = loop_depth           ## Maximal nesting of loops.
+    self._loop_iterations = loop_iterations ## Iterations of each loop.
+    self._recursion_depth = recursion_depth ## Depth of recursive calls.
+    self._mix = mix                         ## Weights of statement kinds.
+    self._label_density = label_density     ## Probability of label.
+    self._program = []                      ## Generated instructions.
+    self._label_count = 0                   ## Number of created labels.
+
+  ## Append instruction.
+  #  @param opcode Opcode of instruction.
+  #  @param args   Arguments as (type, text) tuples.
+  def _emit(self, opcode, *args):
+    self._program.append((opcode, list(args)))
+
+  ## Create unique label name.
+  #  @param prefix Prefix of label name.
+  #  @return Label name.
+  def _new_label(self, prefix):
+    self._label_count += 1
+    return f"{prefix}{self._label_count}"
+
+  ## Random integer variable.
+  #  @return Argument of variable.
+  def _int_var(self):
+    return ("var", f"GF@i{self._rng.randrange(INT_VARS)}")
+
+  ## Generate whole program.
+  #  @return List of instructions.
+  def generate(self):
+    for idx in range(INT_VARS):
+      self._emit("DEFVAR", ("var", f"GF@i{idx}"))
+      self._emit("MOVE", ("var", f"GF@i{idx}"), ("int", str(idx)))
+    for depth in range(self._loop_depth):
+      self._emit("DEFVAR", ("var", f"GF@loop{depth}"))
+    for name in ("s", "t", "c", "tmp", "r"):
+      self._emit("DEFVAR", ("var", f"GF@{name}"))
+    self._emit("MOVE", ("var", "GF@s"), ("string", ""))
+    self._emit("MOVE", ("var", "GF@t"), ("string", "ab\\032c"))
+    self._emit("READ", ("var", "GF@i0"), ("type", "int"))
+    self._emit("JUMPIFNEQ", ("label", "input_ok"), ("var", "GF@i0"), ("nil", "nil"))
+    self._emit("MOVE", ("var", "GF@i0"), ("int", "0"))
+    self._emit("LABEL", ("label", "input_ok"))
+
+    if self._recursion_depth:
+      self._emit("PUSHS", ("int", str(self._recursion_depth)))
+      self._emit("CALL", ("label", "rec"))
+      self._emit("POPS", ("var", "GF@r"))
+      self._emit("WRITE", ("var", "GF@r"))
+      self._emit("WRITE", ("string", "\\010"))
+
+    while len(self._program) < self._instr_count:
+      self._statement(0)
+
+    for idx in range(INT_VARS):
+      self._emit("WRITE", ("var", f"GF@i{idx}"))
+      self._emit("WRITE", ("string", "\\010"))
+    self._emit("WRITE", ("var", "GF@s"))
+    self._emit("WRITE", ("string", "\\010"))
+    self._emit("EXIT", ("int", "0"))
+
+    if self._recursion_depth:
+      self._recursive_function()
+    return self._program
+
+  ## Generate one statement (group of instructions).
+  #  @param depth Current loop nesting.
+  def _statement(self, depth):
+    if depth < self._loop_depth and self._rng.random() < 0.1:
+      self._loop(depth)
+    else:
+      kind = self._rng.choices(("int", "string", "stack"), weights = self._mix)[0]
+      getattr(self, f"_{kind}_statement")()
+
+    if self._rng.random() < self._label_density:
+      label = self._new_label("l")
+      if self._rng.random() < 0.5:
+        self._emit("JUMP", ("label", label))
+      self._emit("LABEL", ("label", label))
+
+  ## Generate loop with fixed number of iterations.
+  #  @param depth Current loop nesting.
+  def _loop(self, depth):
+    counter = ("var", f"GF@loop{depth}")
+    start = self._new_label("loop")
+    end = self._new_label("end")
+    self._emit("MOVE", counter, ("int", "0"))
+    self._emit("LABEL", ("label", start))
+    self._emit("JUMPIFEQ", ("label", end), counter, ("int", str(self._loop_iterations)))
+    for _ in range(self._rng.randint(1, 4)):
+      self._statement(depth + 1)
+    self._emit("ADD", counter, counter, ("int", "1"))
+    self._emit("JUMP", ("label", start))
+    self._emit("LABEL", ("label", end))
+
+  ## Generate integer statement.
+  #  @details Result is reduced modulo MODULUS so values stay small.
+  def _int_statement(self):
+    dest = self._int_var()
+    opcode = self._rng.choice(("ADD", "SUB", "MUL"))
+    operand = self._int_var() if self._rng.random() < 0.5 \
+              else ("int", str(self._rng.randint(1, 9)))
+    self._emit(opcode, dest, self._int_var(), operand)
+    self._emit("IDIV", ("var", "GF@tmp"), dest, ("int", str(MODULUS)))
+    self._emit("MUL", ("var", "GF@tmp"), ("var", "GF@tmp"), ("int", str(MODULUS)))
+    self._emit("SUB", dest, dest, ("var", "GF@tmp"))
+
+  ## Generate string statement.
+  #  @details Strings do not grow in loops.
+  def _string_statement(self):
+    choice = self._rng.randrange(3)
+    if choice == 0:
+      self._emit("CONCAT", ("var", "GF@s"), ("var", "GF@t"),
+                 ("string", self._rng.choice(("x", "yz", "\\035"))))
+    elif choice == 1:
+      self._emit("STRLEN", self._int_var(), ("var", "GF@t"))
+    else:
+      self._emit("GETCHAR", ("var", "GF@c"), ("var", "GF@t"),
+                 ("int", str(self._rng.randrange(4))))
+      self._emit("CONCAT", ("var", "GF@s"), ("var", "GF@c"), ("var", "GF@t"))
+
+  ## Generate stack statement.
+  def _stack_statement(self):
+    dest = self._int_var()
+    self._emit("PUSHS", self._int_var())
+    self._emit("PUSHS", ("int", str(self._rng.randint(1, 9))))
+    self._emit(self._rng.choice(("ADDS", "SUBS")))
+    self._emit("POPS", dest)
+
+  ## Generate recursive function returning its recursion depth.
+  #  @details Takes depth from data stack and returns result on it.
+  def _recursive_function(self):
+    self._emit("LABEL", ("label", "rec"))
+    self._emit("CREATEFRAME")
+    self._emit("PUSHFRAME")
+    self._emit("DEFVAR", ("var", "LF@d"))
+    self._emit("POPS", ("var", "LF@d"))
+    self._emit("JUMPIFEQ", ("label", "rec_base"), ("var", "LF@d"), ("int", "0"))
+    self._emit("SUB", ("var", "LF@d"), ("var", "LF@d"), ("int", "1"))
+    self._emit("PUSHS", ("var", "LF@d"))
+    self._emit("CALL", ("label", "rec"))
+    self._emit("POPS", ("var", "LF@d"))
+    self._emit("ADD", ("var", "LF@d"), ("var", "LF@d"), ("int", "1"))
+    self._emit("PUSHS", ("var", "LF@d"))
+    self._emit("POPFRAME")
+    self._emit("RETURN")
+    self._emit("LABEL", ("label", "rec_base"))
+    self._emit("PUSHS", ("int", "0"))
+    self._emit("POPFRAME")
+    self._emit("RETURN")
+
+## Run program by reference interpreter.
+#  @param program    List of instructions.
+#  @param input_text Text of standard input.
+#  @return Tuple of standard output, standard error output and exit code.
+def reference_run(program, input_text):
+  interpreter = Interpreter()
+  parse_text(io.StringIO(to_text(program)), interpreter)
+  interpreter.instr_sort()
+  return run_program(interpreter._instr_list, input_text)
+
+## Create argument parser of generator.
+#  @return Created parser.
+def create_argparser():
+  arg_parser = argparse.ArgumentParser(description="Generate IPPcode22 test programs.")
+  arg_parser.add_argument("outdir", help="output directory")
+  arg_parser.add_argument("--programs", type=int, default=10, help="number of programs")
+  arg_parser.add_argument("--instructions", type=int, default=1000,
+                          help="approximate number of instructions per program")
+  arg_parser.add_argument("--loop-depth", type=int, default=2, help="maximal nesting of loops")
+  arg_parser.add_argument("--loop-iterations", type=int, default=10,
+                          help="iterations of each loop")
+  arg_parser.add_argument("--recursion-depth", type=int, default=0,
+                          help="depth of recursive calls")
+  arg_parser.add_argument("--mix", default="3,1,1",
+                          help="weights of integer, string and stack statements")
+  arg_parser.add_argument("--label-density", type=float, default=0.05,
+                          help="probability of label after statement")
+  arg_parser.add_argument("--seed", type=int, default=0, help="random seed")
+  return arg_parser
+
+## Entrypoint of a generator.
+def main():
+  args = create_argparser().parse_args()
+  mix = tuple(float(weight) for weight in args.mix.split(","))
+  os.makedirs(args.outdir, exist_ok=True)
+  rng = random.Random(args.seed)
+  for idx in range(args.programs):
+    program = ProgramGenerator(rng, args.instructions, args.loop_depth,
+                               args.loop_iterations, args.recursion_depth,
+                               mix, args.label_density).generate()
+    input_text = f"{rng.randint(-100, 100)}\n"
+    stdout, _, exit_code = reference_run(program, input_text)
+
+    base = os.path.join(args.outdir, f"gen_{idx:04d}")
+    with open(base + ".src", "w") as src_file:
+      src_file.write(to_xml(program))
+    with open(base + ".in", "w") as in_file:
+      in_file.write(input_text)
+    with open(base + ".out", "w") as out_file:
+      out_file.write(stdout)
+    with open(base + ".rc", "w") as rc_file:
+      rc_file.write(f"{exit_code}\n")
+
+if __name__ == "__main__":
+  main()
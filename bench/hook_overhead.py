@@ -0,0 +1,77 @@
+## @package hook_overhead
+#  Overhead of hook API when no hooks are registered.
+#
+#  Compares Interpreter.execute without hooks to plain
+#  instruction loop, and to execution with coverage hook.
+#
+#  Usage: python -m bench.hook_overhead [ITERATIONS]
+
+from bench.programs import batch_program, to_text
+from interpret.core import Interpreter
+from interpret.hooks import CoverageHook
+from interpret.instruction import Instruction
+from parse.parse_text import parse_text
+
+import io
+import sys
+import time
+
+## Number of repetitions, best time is reported.
+REPEAT = 10
+
+## Plain instruction loop (execute without hook check).
+#  @param interpreter Interpreter with loaded instructions.
+def plain_loop(interpreter):
+  while interpreter._counter < len(interpreter._instr_list):
+    interpreter._instr_list[interpreter._counter].do()
+    interpreter._counter += 1
+  interpreter.reset_state()
+
+## Measure best times of runs.
+#  @details Runs are interleaved, so noise affects all of them alike.
+#  @param interpreter Interpreter with loaded instructions.
+#  @param runs        Functions running the interpreter.
+#  @return List of best times in seconds.
+def measure(interpreter, runs):
+  best = [None] * len(runs)
+  for _ in range(REPEAT):
+    for idx, run in enumerate(runs):
+      interpreter.input_stream = io.StringIO("3\n")
+      start = time.perf_counter()
+      run(interpreter)
+      elapsed = time.perf_counter() - start
+      best[idx] = elapsed if best[idx] is None else min(best[idx], elapsed)
+  return best
+
+## Run interpreter with coverage hook.
+#  @param interpreter Interpreter with loaded instructions.
+def coverage_run(interpreter):
+  hook = CoverageHook()
+  hook.register(interpreter)
+  interpreter.execute()
+  interpreter.remove_hook("instruction", hook)
+
+## Entrypoint of a benchmark.
+def main():
+  iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+  interpreter = Interpreter()
+  parse_text(io.StringIO(to_text(batch_program(iterations))), interpreter)
+  interpreter.instr_sort()
+  interpreter.find_labels()
+  Instruction.switch_interpreter(interpreter)
+
+  output = io.StringIO()
+  stdout = sys.stdout
+  sys.stdout = output
+  try:
+    plain, no_hooks, coverage = measure(interpreter,
+                                        (plain_loop, Interpreter.execute, coverage_run))
+  finally:
+    sys.stdout = stdout
+
+  print(f"plain loop:     {plain:.3f} s")
+  print(f"no hooks:       {no_hooks:.3f} s ({(no_hooks / plain - 1) * 100:+.1f} %)")
+  print(f"coverage hook:  {coverage:.3f} s ({(coverage / plain - 1) * 100:+.1f} %)")
+
+if __name__ == "__main__":
+  main()
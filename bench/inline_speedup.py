@@ -0,0 +1,102 @@
+## @package inline_speedup
+#  Execution time of loop calling small subroutines without
+#  and with inlining of subroutines into CALL sites.
+#
+#  Usage: python -m bench.inline_speedup [LOOP_ITERATIONS]
+
+from bench.programs import to_text
+from interpret.core import Interpreter
+from interpret.inline import inline_calls
+from interpret.instruction import Instruction
+from parse.parse_text import parse_text
+
+import io
+import sys
+import time
+
+## Number of repetitions, best time is reported.
+REPEAT = 5
+
+## Generate loop calling small subroutines.
+#  @param iterations Number of loop iterations.
+#  @return List of instructions.
+def call_program(iterations):
+  program = [("DEFVAR", [("var", "GF@i")]),
+             ("MOVE", [("var", "GF@i"), ("int", "0")]),
+             ("DEFVAR", [("var", "GF@sum")]),
+             ("MOVE", [("var", "GF@sum"), ("int", "0")]),
+             ("LABEL", [("label", "loop")]),
+             ("CALL", [("label", "inc")]),
+             ("PUSHS", [("var", "GF@i")]),
+             ("CALL", [("label", "double")]),
+             ("POPS", [("var", "GF@sum")]),
+             ("CALL", [("label", "local")]),
+             ("JUMPIFNEQ", [("label", "loop"), ("var", "GF@i"), ("int", str(iterations))]),
+             ("WRITE", [("var", "GF@sum")]),
+             ("EXIT", [("int", "0")]),
+             ("LABEL", [("label", "inc")]),
+             ("ADD", [("var", "GF@i"), ("var", "GF@i"), ("int", "1")]),
+             ("RETURN", []),
+             ("LABEL", [("label", "double")]),
+             ("PUSHS", [("int", "2")]),
+             ("MULS", []),
+             ("RETURN", []),
+             ("LABEL", [("label", "local")]),
+             ("CREATEFRAME", []),
+             ("PUSHFRAME", []),
+             ("DEFVAR", [("var", "LF@x")]),
+             ("MOVE", [("var", "LF@x"), ("var", "GF@sum")]),
+             ("POPFRAME", []),
+             ("RETURN", [])]
+  return program
+
+## Load program to new interpreter.
+#  @param source IPPcode22 source code.
+#  @param inline Whether subroutines are inlined.
+#  @return Interpreter with loaded instructions and number of inlined calls.
+def load(source, inline):
+  interpreter = Interpreter()
+  parse_text(io.StringIO(source), interpreter)
+  interpreter.instr_sort()
+  interpreter.find_labels()
+  inlined = inline_calls(interpreter) if inline else 0
+  return interpreter, inlined
+
+## Measure best execution time.
+#  @param interpreter Interpreter with loaded instructions.
+#  @return Best time in seconds and output of last run.
+def measure(interpreter):
+  Instruction.switch_interpreter(interpreter)
+  best = None
+  stdout = sys.stdout
+  for _ in range(REPEAT):
+    interpreter.reset_state()
+    sys.stdout = output = io.StringIO()
+    start = time.perf_counter()
+    try:
+      interpreter.execute()
+    except SystemExit:
+      pass
+    finally:
+      sys.stdout = stdout
+    elapsed = time.perf_counter() - start
+    best = elapsed if best is None else min(best, elapsed)
+  return best, output.getvalue()
+
+## Entrypoint of a benchmark.
+def main():
+  iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+  source = to_text(call_program(iterations))
+
+  interpreter, _ = load(source, False)
+  plain_time, plain_output = measure(interpreter)
+  interpreter, inlined = load(source, True)
+  inline_time, inline_output = measure(interpreter)
+
+  print(f"instructions: {len(interpreter._instr_list)}, inlined calls: {inlined}")
+  print(f"plain:   {plain_time:.3f} s")
+  print(f"inlined: {inline_time:.3f} s ({plain_time / inline_time:.2f}x)")
+  print(f"same output: {plain_output == inline_output}")
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,50 @@
+## @package introspect_overhead
+#  Overhead of live introspection.
+#
+#  Compares Interpreter.execute to execution counted for introspection
+#  with sampling of hottest labels running.
+#
+#  Usage: python -m bench.introspect_overhead [ITERATIONS]
+
+from bench.hook_overhead import measure
+from bench.programs import batch_program, to_text
+from interpret.core import Interpreter
+from interpret.instruction import Instruction
+from interpret.introspect import Introspector
+from parse.parse_text import parse_text
+
+import io
+import sys
+
+## Run interpreter with introspection.
+#  @param interpreter Interpreter with loaded instructions.
+def introspected_run(interpreter):
+  introspector = Introspector(interpreter)
+  introspector.start()
+  try:
+    interpreter.execute_introspected(introspector)
+  finally:
+    introspector.stop()
+
+## Entrypoint of a benchmark.
+def main():
+  iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+  interpreter = Interpreter()
+  parse_text(io.StringIO(to_text(batch_program(iterations))), interpreter)
+  interpreter.instr_sort()
+  interpreter.find_labels()
+  Instruction.switch_interpreter(interpreter)
+
+  output = io.StringIO()
+  stdout = sys.stdout
+  sys.stdout = output
+  try:
+    plain, introspected = measure(interpreter, (Interpreter.execute, introspected_run))
+  finally:
+    sys.stdout = stdout
+
+  print(f"execute:       {plain:.3f} s")
+  print(f"introspection: {introspected:.3f} s ({(introspected / plain - 1) * 100:+.1f} %)")
+
+if __name__ == "__main__":
+  main()
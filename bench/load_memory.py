@@ -0,0 +1,38 @@
+## @package load_memory
+#  Memory per loaded instruction with and without argument interning.
+#
+#  Usage: python -m bench.load_memory [INSTR_COUNT]
+
+from bench.programs import large_program_xml
+from interpret.core import Interpreter
+from interpret.structs import ArgumentTable
+from parse.parse_xml import parse_xml
+
+import sys
+import tracemalloc
+import xml.etree.ElementTree as ET
+
+## Measure memory held by loaded instructions.
+#  @param root_node XML root element.
+#  @param intern    Whether arguments are interned.
+#  @return Bytes per instruction.
+def measure(root_node, intern):
+  tracemalloc.start()
+  interpreter = Interpreter()
+  parse_xml(root_node, interpreter, ArgumentTable(intern))
+  size = tracemalloc.get_traced_memory()[0]
+  tracemalloc.stop()
+  return size / len(interpreter._instr_list)
+
+## Entrypoint of a benchmark.
+def main():
+  instr_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+  root_node = ET.fromstring(large_program_xml(instr_count))
+  before = measure(root_node, False)
+  after = measure(root_node, True)
+  print(f"instructions:             {instr_count}")
+  print(f"bytes/instr (no interning): {before:.1f}")
+  print(f"bytes/instr (interning):    {after:.1f}")
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,54 @@
+## @package load_time
+#  Load time of XML representation and IPPcode22 source code.
+#
+#  Usage: python -m bench.load_time [INSTR_COUNT]
+
+from bench.programs import large_program, to_text, to_xml
+from interpret.core import Interpreter
+from parse.parse_text import get_text_instructions
+from parse.parse_xml import get_instructions
+
+from argparse import Namespace
+import os
+import sys
+import tempfile
+import time
+
+## Number of repetitions, best time is reported.
+REPEAT = 3
+
+## Measure time of loading source file.
+#  @param load Loader function taking CLI arguments and interpreter.
+#  @param path Path of source file.
+#  @return Best load time in seconds.
+def measure(load, path):
+  best = None
+  for _ in range(REPEAT):
+    interpreter = Interpreter()
+    start = time.perf_counter()
+    load(Namespace(source=path), interpreter)
+    elapsed = time.perf_counter() - start
+    best = elapsed if best is None else min(best, elapsed)
+  return best
+
+## Entrypoint of a benchmark.
+def main():
+  instr_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+  program = large_program(instr_count)
+  with tempfile.TemporaryDirectory() as tmp_dir:
+    xml_path = os.path.join(tmp_dir, "program.xml")
+    text_path = os.path.join(tmp_dir, "program.IPPcode22")
+    with open(xml_path, "w") as xml_file:
+      xml_file.write(to_xml(program))
+    with open(text_path, "w") as text_file:
+      text_file.write(to_text(program))
+
+    xml_time = measure(get_instructions, xml_path)
+    text_time = measure(get_text_instructions, text_path)
+    print(f"instructions: {instr_count}")
+    print(f"xml:  {os.path.getsize(xml_path):>10} bytes  {xml_time:.3f} s")
+    print(f"text: {os.path.getsize(text_path):>10} bytes  {text_time:.3f} s")
+    print(f"speedup: {xml_time / text_time:.2f}x")
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,53 @@
+## @package metrics_overhead
+#  Overhead of metrics updated in batches of instructions.
+#
+#  Usage: python -m bench.metrics_overhead [ITERATIONS]
+
+from bench.programs import batch_program, to_text
+from interpret.core import Interpreter
+from interpret.instruction import Instruction
+from interpret.metrics import Metrics
+from parse.parse_text import parse_text
+
+import io
+import os
+import sys
+import tempfile
+import time
+
+## Number of repetitions, best time is reported.
+REPEAT = 10
+
+## Entrypoint of a benchmark.
+def main():
+  iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+  interpreter = Interpreter()
+  parse_text(io.StringIO(to_text(batch_program(iterations))), interpreter)
+  interpreter.instr_sort()
+  interpreter.find_labels()
+  Instruction.switch_interpreter(interpreter)
+
+  with tempfile.TemporaryDirectory() as tmp_dir:
+    metrics = Metrics(os.path.join(tmp_dir, "metrics.prom"))
+    runs = (("plain", interpreter.execute),
+            ("metrics", lambda: interpreter.execute_metrics(metrics)))
+    best = {}
+    stdout = sys.stdout
+    sys.stdout = io.StringIO()
+    try:
+      metrics.start(sys.stdout, io.StringIO())
+      for _ in range(REPEAT):
+        for name, run in runs:
+          interpreter.input_stream = io.StringIO("3\n")
+          start = time.perf_counter()
+          run()
+          elapsed = time.perf_counter() - start
+          best[name] = min(best.get(name, elapsed), elapsed)
+    finally:
+      sys.stdout = stdout
+
+  print(f"plain:   {best['plain']:.3f} s")
+  print(f"metrics: {best['metrics']:.3f} s ({(best['metrics'] / best['plain'] - 1) * 100:+.1f} %)")
+
+if __name__ == "__main__":
+  main()
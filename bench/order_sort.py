@@ -0,0 +1,54 @@
+## @package order_sort
+#  Time of ordering instructions by Interpreter.instr_sort
+#  compared to plain sort, for ascending, shuffled dense
+#  and shuffled sparse orders.
+#
+#  Usage: python -m bench.order_sort [INSTR_COUNT]
+
+from interpret.core import Interpreter
+from interpret.instruction import CreateframeInstr
+
+import random
+import sys
+import time
+
+## Number of repetitions, best time is reported.
+REPEAT = 5
+
+## Measure time of ordering instructions.
+#  @param orders List of instruction orders.
+#  @param order  Function ordering instructions of interpreter.
+#  @return Best time in seconds.
+def measure(orders, order):
+  best = None
+  for _ in range(REPEAT):
+    interpreter = Interpreter()
+    interpreter._instr_list = [CreateframeInstr(order) for order in orders]
+    start = time.perf_counter()
+    order(interpreter)
+    elapsed = time.perf_counter() - start
+    best = elapsed if best is None else min(best, elapsed)
+  return best
+
+## Order instructions by plain sort.
+#  @param interpreter Interpreter with instructions.
+def plain_sort(interpreter):
+  interpreter._instr_list.sort(key = lambda x: x.order)
+
+## Entrypoint of a benchmark.
+def main():
+  instr_count = int(sys.argv[1]) if len(sys.argv) > 1 else 500000
+  rng = random.Random(0)
+  dense = list(range(1, instr_count + 1))
+  shuffled = dense[:]
+  rng.shuffle(shuffled)
+  sparse = rng.sample(range(instr_count * 100), instr_count)
+
+  print(f"instructions: {instr_count}")
+  for name, orders in (("ascending", dense), ("dense", shuffled), ("sparse", sparse)):
+    sort_time = measure(orders, plain_sort)
+    instr_sort_time = measure(orders, Interpreter.instr_sort)
+    print(f"{name:<10} sort: {sort_time:.3f} s  instr_sort: {instr_sort_time:.3f} s")
+
+if __name__ == "__main__":
+  main()
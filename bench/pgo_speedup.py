@@ -0,0 +1,77 @@
+## @package pgo_speedup
+#  Execution time of generated program without and with
+#  profile-guided specialization.
+#
+#  Usage: python -m bench.pgo_speedup [LOOP_ITERATIONS]
+
+from bench.generator import ProgramGenerator
+from bench.programs import to_text
+from interpret.core import Interpreter
+from interpret.instruction import Instruction
+from interpret.pgo import ProfileHook, specialize
+from parse.parse_text import parse_text
+
+import io
+import random
+import sys
+import time
+
+## Number of repetitions, best time is reported.
+REPEAT = 5
+
+## Load program to new interpreter.
+#  @param source IPPcode22 source code.
+#  @return Interpreter with loaded instructions.
+def load(source):
+  interpreter = Interpreter()
+  parse_text(io.StringIO(source), interpreter)
+  interpreter.instr_sort()
+  interpreter.find_labels()
+  return interpreter
+
+## Measure best execution time.
+#  @param interpreter Interpreter with loaded instructions.
+#  @return Best time in seconds and output of last run.
+def measure(interpreter):
+  Instruction.switch_interpreter(interpreter)
+  best = None
+  stdout = sys.stdout
+  for _ in range(REPEAT):
+    interpreter.reset_state()
+    interpreter.input_stream = io.StringIO("7\n")
+    sys.stdout = output = io.StringIO()
+    start = time.perf_counter()
+    try:
+      interpreter.execute()
+    except SystemExit:
+      pass
+    finally:
+      sys.stdout = stdout
+    elapsed = time.perf_counter() - start
+    best = elapsed if best is None else min(best, elapsed)
+  return best, output.getvalue()
+
+## Entrypoint of a benchmark.
+def main():
+  iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+  program = ProgramGenerator(random.Random(1), 300, loop_depth = 3,
+                             loop_iterations = iterations, recursion_depth = 50).generate()
+  source = to_text(program)
+
+  interpreter = load(source)
+  hook = ProfileHook(len(interpreter._instr_list))
+  hook.register(interpreter)
+  measure(interpreter)
+
+  plain_time, plain_output = measure(load(source))
+  interpreter = load(source)
+  specialized = specialize(interpreter, hook.profile)
+  pgo_time, pgo_output = measure(interpreter)
+
+  print(f"instructions: {len(interpreter._instr_list)}, specialized: {specialized}")
+  print(f"plain:       {plain_time:.3f} s")
+  print(f"specialized: {pgo_time:.3f} s ({plain_time / pgo_time:.2f}x)")
+  print(f"same output: {plain_output == pgo_output}")
+
+if __name__ == "__main__":
+  main()
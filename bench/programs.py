@@ -0,0 +1,89 @@
+## @package programs
+#  Large programs for benchmarks.
+#
+#  Program is a list of instructions, each being a tuple of opcode
+#  and list of arguments as (type, text) tuples. It can be rendered
+#  to XML representation or IPPcode22 source code.
+
+from xml.sax.saxutils import escape
+
+## Generate large program.
+#  @details Program is a straight sequence of arithmetic,
+#           string and stack instructions with repeated operands,
+#           as is typical for generated code.
+#  @param instr_count Number of instructions.
+#  @return List of instructions.
+def large_program(instr_count):
+  program = [("DEFVAR", [("var", "GF@i")]),
+             ("MOVE", [("var", "GF@i"), ("int", "0")]),
+             ("DEFVAR", [("var", "GF@s")]),
+             ("MOVE", [("var", "GF@s"), ("string", "")])]
+  for order in range(5, instr_count + 1):
+    kind = order % 4
+    if kind == 0:
+      program.append(("ADD", [("var", "GF@i"), ("var", "GF@i"), ("int", "1")]))
+    elif kind == 1:
+      program.append(("CONCAT", [("var", "GF@s"), ("string", "a\\032b"), ("string", "")]))
+    elif kind == 2:
+      program.append(("PUSHS", [("string", "x\\010y")]))
+    else:
+      program.append(("CLEARS", []))
+  return program
+
+## Render program to XML representation.
+#  @param program List of instructions.
+#  @return XML document string.
+def to_xml(program):
+  lines = ['<?xml version="1.0" encoding="UTF-8"?>',
+           '<program language="IPPcode22">']
+  for order, (opcode, args) in enumerate(program, 1):
+    arg_nodes = "".join(f'<arg{idx} type="{type}">{escape(text)}</arg{idx}>'
+                        for idx, (type, text) in enumerate(args, 1))
+    lines.append(f'<instruction order="{order}" opcode="{opcode}">{arg_nodes}</instruction>')
+  lines.append("</program>")
+  return "\n".join(lines) + "\n"
+
+## Render program to IPPcode22 source code.
+#  @param program List of instructions.
+#  @return Source code string.
+def to_text(program):
+  lines = [".IPPcode22"]
+  for opcode, args in program:
+    tokens = [opcode]
+    for type, text in args:
+      tokens.append(text if type in ("var", "label", "type") else f"{type}@{text}")
+    lines.append(" ".join(tokens))
+  return "\n".join(lines) + "\n"
+
+## Generate large XML program.
+#  @param instr_count Number of instructions.
+#  @return XML document string.
+def large_program_xml(instr_count):
+  return to_xml(large_program(instr_count))
+
+## Generate program for batch execution.
+#  @details Program reads integer and runs arithmetic loop (modular
+#           multiplication) with fixed number of iterations, so all inputs
+#           follow the same control path.
+#  @param iterations Number of loop iterations.
+#  @return List of instructions.
+def batch_program(iterations):
+  return [("DEFVAR", [("var", "GF@n")]),
+          ("READ", [("var", "GF@n"), ("type", "int")]),
+          ("DEFVAR", [("var", "GF@i")]),
+          ("DEFVAR", [("var", "GF@acc")]),
+          ("DEFVAR", [("var", "GF@tmp")]),
+          ("MOVE", [("var", "GF@i"), ("int", "0")]),
+          ("MOVE", [("var", "GF@acc"), ("int", "1")]),
+          ("LABEL", [("label", "loop")]),
+          ("JUMPIFEQ", [("label", "end"), ("var", "GF@i"), ("int", str(iterations))]),
+          ("MUL", [("var", "GF@tmp"), ("var", "GF@acc"), ("var", "GF@n")]),
+          ("ADD", [("var", "GF@tmp"), ("var", "GF@tmp"), ("var", "GF@i")]),
+          ("IDIV", [("var", "GF@acc"), ("var", "GF@tmp"), ("int", "1000003")]),
+          ("MUL", [("var", "GF@acc"), ("var", "GF@acc"), ("int", "1000003")]),
+          ("SUB", [("var", "GF@acc"), ("var", "GF@tmp"), ("var", "GF@acc")]),
+          ("ADD", [("var", "GF@i"), ("var", "GF@i"), ("int", "1")]),
+          ("JUMP", [("label", "loop")]),
+          ("LABEL", [("label", "end")]),
+          ("WRITE", [("var", "GF@acc")]),
+          ("WRITE", [("string", "\\010")])]
@@ -0,0 +1,75 @@
+## @package stack_lowering
+#  Execution time of stack-heavy generated program without
+#  and with lowering of stack instructions to register form.
+#
+#  Usage: python -m bench.stack_lowering [LOOP_ITERATIONS]
+
+from bench.generator import ProgramGenerator
+from bench.programs import to_text
+from interpret.core import Interpreter
+from interpret.instruction import Instruction
+from interpret.lowering import lower_stack
+from parse.parse_text import parse_text
+
+import io
+import random
+import sys
+import time
+
+## Number of repetitions, best time is reported.
+REPEAT = 5
+
+## Load program to new interpreter.
+#  @param source IPPcode22 source code.
+#  @param lower  Whether stack instructions are lowered.
+#  @return Interpreter with loaded instructions.
+def load(source, lower):
+  interpreter = Interpreter()
+  parse_text(io.StringIO(source), interpreter)
+  interpreter.instr_sort()
+  interpreter.find_labels()
+  if lower:
+    lower_stack(interpreter)
+  return interpreter
+
+## Measure best execution time.
+#  @param interpreter Interpreter with loaded instructions.
+#  @return Best time in seconds and output of last run.
+def measure(interpreter):
+  Instruction.switch_interpreter(interpreter)
+  best = None
+  stdout = sys.stdout
+  for _ in range(REPEAT):
+    interpreter.reset_state()
+    interpreter.input_stream = io.StringIO("7\n")
+    sys.stdout = output = io.StringIO()
+    start = time.perf_counter()
+    try:
+      interpreter.execute()
+    except SystemExit:
+      pass
+    finally:
+      sys.stdout = stdout
+    elapsed = time.perf_counter() - start
+    best = elapsed if best is None else min(best, elapsed)
+  return best, output.getvalue()
+
+## Entrypoint of a benchmark.
+def main():
+  iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+  program = ProgramGenerator(random.Random(1), 300, loop_depth = 3, loop_iterations = iterations,
+                             recursion_depth = 50, mix = (0, 0, 1)).generate()
+  source = to_text(program)
+
+  plain = load(source, False)
+  lowered = load(source, True)
+  plain_time, plain_output = measure(plain)
+  lowered_time, lowered_output = measure(lowered)
+
+  print(f"instructions: {len(plain._instr_list)} -> {len(lowered._instr_list)}")
+  print(f"stack:    {plain_time:.3f} s")
+  print(f"register: {lowered_time:.3f} s ({plain_time / lowered_time:.2f}x)")
+  print(f"same output: {plain_output == lowered_output}")
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,87 @@
+## @package stack_spill
+#  Peak memory and execution time of program pushing many values
+#  to data stack, without and with spilling of data stack to disk.
+#
+#  Each run is done in child process, which reports its peak RSS.
+#
+#  Usage: python -m bench.stack_spill [VALUE_COUNT] [THRESHOLD]
+
+from bench.programs import to_text
+from interpret.core import Interpreter
+from interpret.instruction import Instruction
+from parse.parse_text import parse_text
+
+import io
+import resource
+import subprocess
+import sys
+import time
+
+## Create program pushing values and popping them back.
+#  @param count Number of pushed values.
+#  @return List of instructions (see bench.programs).
+def push_program(count):
+  return [("DEFVAR", [("var", "GF@i")]),
+          ("DEFVAR", [("var", "GF@x")]),
+          ("MOVE", [("var", "GF@i"), ("int", "0")]),
+          ("LABEL", [("label", "push")]),
+          ("PUSHS", [("var", "GF@i")]),
+          ("PUSHS", [("string", "value")]),
+          ("ADD", [("var", "GF@i"), ("var", "GF@i"), ("int", "1")]),
+          ("JUMPIFNEQ", [("label", "push"), ("var", "GF@i"), ("int", str(count // 2))]),
+          ("LABEL", [("label", "pop")]),
+          ("POPS", [("var", "GF@x")]),
+          ("POPS", [("var", "GF@x")]),
+          ("SUB", [("var", "GF@i"), ("var", "GF@i"), ("int", "1")]),
+          ("JUMPIFNEQ", [("label", "pop"), ("var", "GF@i"), ("int", "0")]),
+          ("WRITE", [("var", "GF@x")])]
+
+## Run program in this process and print peak RSS and time.
+#  @param count     Number of pushed values.
+#  @param threshold Spill threshold (0 for in-memory data stack).
+def child(count, threshold):
+  interpreter = Interpreter()
+  if threshold:
+    interpreter.set_stack_spill(threshold)
+  parse_text(io.StringIO(to_text(push_program(count))), interpreter)
+  interpreter.instr_sort()
+  interpreter.find_labels()
+  Instruction.switch_interpreter(interpreter)
+
+  stdout = sys.stdout
+  sys.stdout = io.StringIO()
+  start = time.perf_counter()
+  try:
+    interpreter.execute()
+  finally:
+    sys.stdout = stdout
+  elapsed = time.perf_counter() - start
+  print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, elapsed)
+
+## Run child process.
+#  @param count     Number of pushed values.
+#  @param threshold Spill threshold (0 for in-memory data stack).
+#  @return Tuple of peak RSS in MiB and time in seconds.
+def run_child(count, threshold):
+  output = subprocess.run([sys.executable, "-m", "bench.stack_spill", "--child",
+                           str(count), str(threshold)],
+                          capture_output = True, text = True, check = True).stdout
+  rss, elapsed = output.split()
+  return int(rss) / 1024, float(elapsed)
+
+## Entrypoint of a benchmark.
+def main():
+  if sys.argv[1:2] == ["--child"]:
+    child(int(sys.argv[2]), int(sys.argv[3]))
+    return
+
+  count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000000
+  threshold = int(sys.argv[2]) if len(sys.argv) > 2 else 100000
+  memory_rss, memory_time = run_child(count, 0)
+  spill_rss, spill_time = run_child(count, threshold)
+  print(f"pushed values: {count}, threshold: {threshold}")
+  print(f"in memory: peak RSS {memory_rss:.1f} MiB, {memory_time:.3f} s")
+  print(f"spilling:  peak RSS {spill_rss:.1f} MiB, {spill_time:.3f} s")
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,86 @@
+## @package store_memory
+#  Memory per instruction and execution time of instruction
+#  objects and of memory-mapped program store.
+#
+#  Usage: python -m bench.store_memory [INSTR_COUNT]
+
+from bench.programs import large_program, to_text
+from interpret.core import Interpreter
+from interpret.instruction import Instruction
+from interpret.store import ProgramStore
+from parse.parse_text import parse_text
+
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+## Load program as instruction objects.
+#  @param source IPPcode22 source code.
+#  @return Interpreter with loaded instructions.
+def load_objects(source):
+  interpreter = Interpreter()
+  parse_text(io.StringIO(source), interpreter)
+  interpreter.instr_sort()
+  interpreter.find_labels()
+  return interpreter
+
+## Load program from store file.
+#  @param path Path of store file.
+#  @return Interpreter running program from store.
+def load_store(path):
+  interpreter = Interpreter()
+  interpreter.load_store(ProgramStore.load(path))
+  return interpreter
+
+## Measure memory held by loaded program.
+#  @param load Function returning interpreter.
+#  @param arg  Argument of function.
+#  @return Interpreter and allocated bytes.
+def measure_memory(load, arg):
+  tracemalloc.start()
+  before = tracemalloc.get_traced_memory()[0]
+  interpreter = load(arg)
+  size = tracemalloc.get_traced_memory()[0] - before
+  tracemalloc.stop()
+  return interpreter, size
+
+## Measure execution time.
+#  @param interpreter Interpreter with loaded program.
+#  @return Time in seconds.
+def measure_time(interpreter):
+  Instruction.switch_interpreter(interpreter)
+  stdout = sys.stdout
+  sys.stdout = io.StringIO()
+  start = time.perf_counter()
+  try:
+    interpreter.execute()
+  finally:
+    sys.stdout = stdout
+  return time.perf_counter() - start
+
+## Entrypoint of a benchmark.
+def main():
+  instr_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+  source = to_text(large_program(instr_count))
+  objects, objects_size = measure_memory(load_objects, source)
+
+  with tempfile.TemporaryDirectory() as directory:
+    path = os.path.join(directory, "program.store")
+    ProgramStore.from_instrs(objects._instr_list).save(path)
+    store, store_size = measure_memory(load_store, path)
+    file_size = os.path.getsize(path)
+    objects_time = measure_time(objects)
+    store_time = measure_time(store)
+
+  print(f"instructions:               {instr_count}")
+  print(f"bytes/instr (objects):      {objects_size / instr_count:.1f}")
+  print(f"bytes/instr (store, heap):  {store_size / instr_count:.1f}")
+  print(f"bytes/instr (store, file):  {file_size / instr_count:.1f}")
+  print(f"execution (objects):        {objects_time:.3f} s")
+  print(f"execution (store):          {store_time:.3f} s")
+
+if __name__ == "__main__":
+  main()
@@ -1,33 +1,252 @@
 from interpret.core import Interpreter
+from interpret.flight import FlightRecorder
+from interpret.hooks import CoverageHook
+from interpret.inline import inline_calls
+from interpret.introspect import Introspector
 from interpret.instruction import Instruction
-from parse.cli import get_args
+from interpret.lowering import lower_stack
+from interpret.memo import Memoizer, find_pure_functions
+from interpret.memstats import MemoryStats
+from interpret.metrics import Metrics
+from interpret.pgo import ProfileHook, load_profile, program_hash, save_profile, specialize
+from interpret.record import IORecorder, IOReplayer, find_source
+from interpret.sampler import SamplingProfiler
+from interpret.store import ProgramStore
+from parse.cli import check_source_format, get_args
+from parse.parallel_xml import get_instructions_parallel
+from parse.parse_text import get_text_instructions
 from parse.parse_xml import get_instructions
 import utils.error as error
 
+import sys
 from sys import stdin
+import time
 
 ## Parse XML and execute intructions.
 #  @param args CLI arguments object.
 def interpret(args):
+  load_start = time.perf_counter()
   interpreter = Interpreter()
+  if args.stack_spill_threshold:
+    interpreter.set_stack_spill(args.stack_spill_threshold)
+
+  if args.replay and not args.source:
+    args.source, args.source_format = find_source(args.replay)
+    check_source_format(args)
 
   input_file = stdin
   try:
-    if args.input:
+    if args.input and not args.replay:
       input_file = open(args.input, "r")
   except EnvironmentError as e:
     error.error_exit(error.FILE_ERROR, f"Cannot access file {e.filename}")
   Interpreter.input_stream = input_file
   Instruction.set_interpeter(interpreter)
 
-  get_instructions(args, interpreter)
-  interpreter.instr_sort()
-  interpreter.find_labels()
-  interpreter.execute()
+  parse_start = time.perf_counter()
+  if args.source_format == "store":
+    interpreter.load_store(ProgramStore.load(args.source))
+  else:
+    if args.source_format == "text":
+      get_text_instructions(args, interpreter)
+    elif args.jobs > 1:
+      get_instructions_parallel(args, interpreter, args.jobs)
+    else:
+      get_instructions(args, interpreter)
+    interpreter.instr_sort()
+    interpreter.find_labels()
+  parse_time = time.perf_counter() - parse_start
+  if args.store_out:
+    ProgramStore.from_instrs(interpreter._instr_list).save(args.store_out)
+  if args.lower_stack:
+    lower_stack(interpreter)
+  if args.inline:
+    inline_calls(interpreter, args.inline_size, marks = bool(args.coverage))
+  if args.cfg_dot:
+    write_cfg_dot(args.cfg_dot, interpreter)
+  if args.memoize:
+    pure = find_pure_functions(interpreter.get_cfg(), interpreter._labels)
+    interpreter.set_memoizer(Memoizer(pure, args.memo_size))
+
+  digest = program_hash(interpreter._instr_list) \
+           if args.profile_in or args.profile_out else None
+  if args.profile_in:
+    profile = load_profile(args.profile_in, digest, len(interpreter._instr_list))
+    if profile is not None:
+      specialize(interpreter, profile)
+  profile_hook = None
+  if args.profile_out:
+    profile_hook = ProfileHook(len(interpreter._instr_list))
+    profile_hook.register(interpreter)
+
+  coverage = None
+  if args.coverage:
+    coverage_file = open_output(args.coverage)
+    coverage = CoverageHook()
+    coverage.register(interpreter)
+
+  io_hook = None
+  if args.record:
+    io_hook = IORecorder(input_file, sys.stdout)
+  elif args.replay:
+    io_hook = IOReplayer(args.replay, sys.stdout)
+  if io_hook is not None:
+    io_hook.register(interpreter)
+    Interpreter.input_stream = io_hook
+    sys.stdout = io_hook
+
+  metrics = None
+  output_stream = sys.stdout
+  if args.metrics:
+    metrics = Metrics(args.metrics, args.metrics_interval)
+    metrics.loaded(parse_time, time.perf_counter() - load_start)
+    sys.stdout, Interpreter.input_stream = metrics.start(sys.stdout, Interpreter.input_stream)
+
+  recorder = None
+  if args.flight_recorder:
+    recorder = FlightRecorder(args.flight_recorder, args.flight_recorder_types,
+                              args.flight_recorder_file)
+    recorder.start(interpreter._instr_list)
+  introspector = None
+  if args.introspect:
+    introspector = Introspector(interpreter, args.introspect)
+    introspector.start()
 
-  if args.input:
+  try:
+    if args.sample_profile:
+      execute_sampled(args, interpreter, metrics, recorder, introspector)
+    else:
+      execute(args, interpreter, metrics, recorder, introspector)
+  except BaseException as e:
+    if recorder is not None:
+      recorder.dump(interpreter, e)
+    raise
+  finally:
+    if recorder is not None:
+      recorder.stop()
+    if introspector is not None:
+      introspector.stop()
+    sys.stdout = output_stream
+    if io_hook is not None:
+      sys.stdout = io_hook.output_stream
+    if profile_hook is not None:
+      save_profile(args.profile_out, digest, profile_hook.profile)
+    if coverage is not None:
+      with coverage_file:
+        coverage.write(interpreter._instr_list, coverage_file)
+    if args.record:
+      io_hook.save(args.record, args.source, args.source_format)
+    elif args.replay:
+      check_replay(io_hook)
+
+  if args.input and not args.replay:
     input_file.close()
 
+## Report result of replay.
+#  @details Exits with error if replayed run differs from recording.
+#  @param replayer IOReplayer used for the run.
+def check_replay(replayer):
+  if replayer.count_diff is not None:
+    sys.stderr.write(f"Replay: {replayer.count_diff}\n")
+  if replayer.mismatch is not None:
+    error.error_exit(error.REPLAY_ERROR, f"Replay mismatch: {replayer.mismatch}")
+
+## Open output file of report.
+#  @details Exits if file cannot be opened.
+#  @param path Path of file.
+#  @return Opened file.
+def open_output(path):
+  try:
+    return open(path, "w")
+  except EnvironmentError as e:
+    error.error_exit(error.FILE_ERROR, f"Cannot access file {e.filename}")
+
+## Execute instructions with selected engine.
+#  @param args         CLI arguments object.
+#  @param interpreter  Interpreter with loaded instructions.
+#  @param metrics      Metrics object to update (optional).
+#  @param recorder     FlightRecorder of run instructions (optional).
+#  @param introspector Introspector of running program (optional).
+def execute(args, interpreter, metrics = None, recorder = None, introspector = None):
+  if introspector is not None and (metrics is not None or recorder is not None):
+    introspector.register(interpreter)
+  if args.mem_stats:
+    execute_mem_stats(args, interpreter)
+  elif metrics is not None:
+    if recorder is not None:
+      recorder.register(interpreter)
+    execute_metrics(interpreter, metrics)
+  elif recorder is not None:
+    interpreter.execute_flight(recorder)
+  elif introspector is not None:
+    interpreter.execute_introspected(introspector)
+  elif args.engine == "blocks":
+    interpreter.execute_blocks()
+  else:
+    interpreter.execute()
+
+## Execute instructions and track memory statistics.
+#  @details Statistics are written also when program exits
+#           with EXIT instruction or error.
+#  @param args        CLI arguments object.
+#  @param interpreter Interpreter with loaded instructions.
+def execute_mem_stats(args, interpreter):
+  stats_file = sys.stderr
+  if args.mem_stats != "-":
+    stats_file = open_output(args.mem_stats)
+
+  stats = MemoryStats(args.mem_stats_interval, args.mem_stats_tracemalloc)
+  stats.start()
+  try:
+    interpreter.execute_mem_stats(stats)
+  finally:
+    stats.stop()
+    stats.write(stats_file)
+    if stats_file is not sys.stderr:
+      stats_file.close()
+
+## Execute instructions and update metrics.
+#  @details Metrics are written also when program exits
+#           with EXIT instruction or error.
+#  @param interpreter Interpreter with loaded instructions.
+#  @param metrics     Metrics object to update.
+def execute_metrics(interpreter, metrics):
+  code = 0
+  try:
+    interpreter.execute_metrics(metrics)
+  except SystemExit as e:
+    code = e.code if e.code is not None else 0
+    raise
+  finally:
+    metrics.finish(interpreter, code)
+
+## Execute instructions with sampling profiler.
+#  @details Profile is written also when program exits
+#           with EXIT instruction or error.
+#  @param args         CLI arguments object.
+#  @param interpreter  Interpreter with loaded instructions.
+#  @param metrics      Metrics object to update (optional).
+#  @param recorder     FlightRecorder of run instructions (optional).
+#  @param introspector Introspector of running program (optional).
+def execute_sampled(args, interpreter, metrics = None, recorder = None, introspector = None):
+  profile_file = open_output(args.sample_profile)
+
+  profiler = SamplingProfiler(interpreter, args.sample_interval / 1000)
+  profiler.start()
+  try:
+    execute(args, interpreter, metrics, recorder, introspector)
+  finally:
+    profiler.stop()
+    with profile_file:
+      profiler.write(profile_file)
+
+## Write control-flow graph of program to file.
+#  @param path        Path of DOT file.
+#  @param interpreter Interpreter with loaded instructions.
+def write_cfg_dot(path, interpreter):
+  with open_output(path) as dot_file:
+    dot_file.write(interpreter.get_cfg().to_dot())
+
 ## Entrypoint of a program.
 def main():
   args = get_args()
@@ -0,0 +1,396 @@
+## @package batch
+#  Lockstep execution of one program over many inputs.
+#
+#  Lanes (one per input) which follow the same control path are run
+#  together as a batch. Global frame variables are held as NumPy columns
+#  and arithmetic, relational and logical instructions are run
+#  as vectorized operations. When conditional jump diverges, batch
+#  is split by mask into two batches.
+#
+#  Lanes that hit an error, and whole batches that hit
+#  an instruction which cannot be vectorized (string operations,
+#  frames, calls, data stack, etc.), are run again from the start
+#  by scalar Interpreter, so their results are exactly the same.
+#
+#  Requires NumPy.
+
+from interpret.instruction import *
+from interpret.runner import run_program
+
+import io
+
+try:
+  import numpy as np
+except ImportError:
+  np = None
+
+## Smallest representable integer.
+_INT_MIN = -2 ** 63
+## Largest representable integer.
+_INT_MAX = 2 ** 63 - 1
+
+## Raised when batch cannot continue vectorized.
+class _Fallback(Exception):
+  pass
+
+## Lanes run together in lockstep.
+class _SubBatch:
+  ## Sub-batch constructor.
+  #  @param pc       Instruction counter.
+  #  @param lanes    Array of lane numbers.
+  #  @param vars     Global frame variables as (type, column) by name.
+  #  @param read_pos Number of lines read by each lane.
+  def __init__(self, pc, lanes, vars, read_pos):
+    self.pc = pc             ## Instruction counter.
+    self.lanes = lanes       ## Array of lane numbers.
+    self.vars = vars         ## Variables as (type, column) by name.
+    self.read_pos = read_pos ## Number of lines read by each lane.
+
+  ## Create sub-batch of selected lanes.
+  #  @param mask Boolean array selecting lanes.
+  #  @return New sub-batch with the same state.
+  def select(self, mask):
+    vars = {name: (type, column if column is None else column[mask])
+            for name, (type, column) in self.vars.items()}
+    return _SubBatch(self.pc, self.lanes[mask], vars, self.read_pos)
+
+## Result of program run for one input.
+class LaneResult:
+  ## Lane result constructor.
+  #  @param stdout     Standard output.
+  #  @param stderr     Standard error output.
+  #  @param exit_code  Exit code of program.
+  #  @param vectorized Whether lane was run vectorized to the end.
+  def __init__(self, stdout, stderr, exit_code, vectorized):
+    self.stdout = stdout         ## Standard output.
+    self.stderr = stderr         ## Standard error output.
+    self.exit_code = exit_code   ## Exit code of program.
+    self.vectorized = vectorized ## Whether lane was run vectorized.
+
+## Lockstep batch engine.
+class BatchEngine:
+  ## Batch engine constructor.
+  #  @param instr_list Sorted list of instructions.
+  #  @param inputs     List of input texts, one per lane.
+  def __init__(self, instr_list, inputs):
+    if np is None:
+      raise ImportError("batch execution requires NumPy")
+
+    self._instr_list = instr_list ## Sorted list of instructions.
+    self._inputs = inputs         ## Input texts.
+    self._lines = [[line.rstrip("\n") for line in io.StringIO(text)]
+                   for text in inputs] ## Input lines of lanes.
+    self._labels = {}             ## Labels and their position in code.
+    self._valid = True            ## Whether labels are unique.
+    for idx, instr in enumerate(instr_list):
+      if isinstance(instr, LabelInstr):
+        if instr.arg1.value in self._labels:
+          self._valid = False
+        self._labels[instr.arg1.value] = idx
+    self._outputs = [[] for _ in inputs] ## Output chunks of lanes.
+    self._exit_codes = [None] * len(inputs) ## Exit codes of lanes.
+    self._fallback = set()        ## Lanes to be run by scalar interpreter.
+    self._handlers = {            ## Vectorized instructions.
+      LabelInstr:       self._label,
+      DefvarInstr:      self._defvar,
+      MoveInstr:        self._move,
+      AddInstr:         self._arith,
+      SubInstr:         self._arith,
+      MulInstr:         self._arith,
+      IdivInstr:        self._arith,
+      LesserThanInstr:  self._relation,
+      GreaterThanInstr: self._relation,
+      EqualsInstr:      self._relation,
+      AndInstr:         self._logic,
+      OrInstr:          self._logic,
+      NotInstr:         self._not,
+      ReadInstr:        self._read,
+      WriteInstr:       self._write,
+      JumpInstr:        self._jump,
+      JumpIfEqInstr:    self._jump_if,
+      JumpIfNeqInstr:   self._jump_if,
+      ExitInstr:        self._exit,
+    }
+
+  ## Run program for all inputs.
+  #  @return List of LaneResult objects, one per input.
+  def run(self):
+    work = [_SubBatch(0, np.arange(len(self._inputs)), {}, 0)]
+    if not self._valid:
+      # error is reported by scalar interpreter before execution
+      self._fallback.update(range(len(self._inputs)))
+      work = []
+    while work:
+      self._run_batch(work.pop(), work)
+
+    results = []
+    for lane in range(len(self._inputs)):
+      if lane in self._fallback:
+        results.append(self._run_scalar(lane))
+      else:
+        results.append(LaneResult("".join(self._outputs[lane]), "",
+                                  self._exit_codes[lane], True))
+    return results
+
+  ## Run sub-batch until it finishes or is sent to scalar interpreter.
+  #  @param batch Sub-batch to run.
+  #  @param work  List of sub-batches to run, split batches are added.
+  def _run_batch(self, batch, work):
+    instr_count = len(self._instr_list)
+    with np.errstate(all = "ignore"):
+      while batch.pc < instr_count:
+        if not len(batch.lanes):
+          return
+        instr = self._instr_list[batch.pc]
+        handler = self._handlers.get(type(instr))
+        try:
+          if handler is None:
+            raise _Fallback()
+          if handler(batch, instr, work):
+            return
+        except _Fallback:
+          self._fallback.update(batch.lanes.tolist())
+          return
+        batch.pc += 1
+
+    for lane in batch.lanes.tolist():
+      self._exit_codes[lane] = 0
+
+  ## Run program for one lane by scalar interpreter.
+  #  @param lane Lane number.
+  #  @return LaneResult object.
+  def _run_scalar(self, lane):
+    stdout, stderr, exit_code = run_program(self._instr_list, self._inputs[lane])
+    return LaneResult(stdout, stderr, exit_code, False)
+
+  ## Send selected lanes of batch to scalar interpreter.
+  #  @param batch Sub-batch.
+  #  @param mask  Boolean array of lanes to remove from batch.
+  def _drop(self, batch, mask):
+    if mask.any():
+      self._fallback.update(batch.lanes[mask].tolist())
+      rest = batch.select(~mask)
+      batch.lanes = rest.lanes
+      batch.vars = rest.vars
+
+  ## Get operand as type and column (or scalar for constants).
+  #  @param batch Sub-batch.
+  #  @param arg   Instruction argument.
+  #  @return Tuple of type and value.
+  def _operand(self, batch, arg):
+    if arg.type == "var":
+      if arg.frame != "GF" or arg.value not in batch.vars:
+        raise _Fallback()
+      type, column = batch.vars[arg.value]
+      if type is None:
+        raise _Fallback()
+      return (type, column)
+    if arg.type == "int" and _INT_MIN <= arg.value <= _INT_MAX:
+      return ("int", np.int64(arg.value))
+    if arg.type == "bool":
+      return ("bool", np.bool_(arg.value))
+    raise _Fallback()
+
+  ## Store column to global frame variable.
+  #  @param batch  Sub-batch.
+  #  @param arg    Instruction argument of variable.
+  #  @param type   Type of value.
+  #  @param column Column or scalar value.
+  def _store(self, batch, arg, type, column):
+    if arg.frame != "GF" or arg.value not in batch.vars:
+      raise _Fallback()
+    column = np.broadcast_to(column, (len(batch.lanes),))
+    batch.vars[arg.value] = (type, column)
+
+  ## LABEL instruction.
+  def _label(self, batch, instr, work):
+    pass
+
+  ## DEFVAR instruction.
+  def _defvar(self, batch, instr, work):
+    if instr.arg1.frame != "GF" or instr.arg1.value in batch.vars:
+      raise _Fallback()
+    batch.vars[instr.arg1.value] = (None, None)
+
+  ## MOVE instruction.
+  def _move(self, batch, instr, work):
+    type, value = self._operand(batch, instr.arg2)
+    self._store(batch, instr.arg1, type, value)
+
+  ## ADD, SUB, MUL and IDIV instructions.
+  #  @details Lanes with overflow of 64-bit integer or zero division
+  #           are sent to scalar interpreter.
+  def _arith(self, batch, instr, work):
+    type1, a = self._operand(batch, instr.arg2)
+    type2, b = self._operand(batch, instr.arg3)
+    if type1 != "int" or type2 != "int":
+      raise _Fallback()
+
+    a = np.broadcast_to(a, (len(batch.lanes),))
+    b = np.broadcast_to(b, (len(batch.lanes),))
+    if isinstance(instr, AddInstr):
+      result = a + b
+      bad = ((a ^ result) & (b ^ result)) < 0
+    elif isinstance(instr, SubInstr):
+      result = a - b
+      bad = ((a ^ b) & (a ^ result)) < 0
+    elif isinstance(instr, MulInstr):
+      result = a * b
+      nonzero = np.where(a == 0, 1, a)
+      bad = ((a != 0) & (result // nonzero != b)) \
+            | ((a == -1) & (b == _INT_MIN)) | ((b == -1) & (a == _INT_MIN))
+    else:
+      bad = (b == 0) | ((a == _INT_MIN) & (b == -1))
+      result = a // np.where(bad, 1, b)
+
+    self._store(batch, instr.arg1, "int", result)
+    self._drop(batch, bad)
+
+  ## LT, GT and EQ instructions.
+  def _relation(self, batch, instr, work):
+    type1, a = self._operand(batch, instr.arg2)
+    type2, b = self._operand(batch, instr.arg3)
+    if type1 != type2:
+      raise _Fallback()
+
+    if isinstance(instr, LesserThanInstr):
+      result = a < b
+    elif isinstance(instr, GreaterThanInstr):
+      result = a > b
+    else:
+      result = a == b
+    self._store(batch, instr.arg1, "bool", result)
+
+  ## AND and OR instructions.
+  def _logic(self, batch, instr, work):
+    type1, a = self._operand(batch, instr.arg2)
+    type2, b = self._operand(batch, instr.arg3)
+    if type1 != "bool" or type2 != "bool":
+      raise _Fallback()
+
+    result = (a & b) if isinstance(instr, AndInstr) else (a | b)
+    self._store(batch, instr.arg1, "bool", result)
+
+  ## NOT instruction.
+  def _not(self, batch, instr, work):
+    type, a = self._operand(batch, instr.arg2)
+    if type != "bool":
+      raise _Fallback()
+    self._store(batch, instr.arg1, "bool", ~a)
+
+  ## READ instruction.
+  #  @details Only int and bool types are vectorized. Lanes which
+  #           would read nil (invalid int or end of input) are sent
+  #           to scalar interpreter.
+  def _read(self, batch, instr, work):
+    type = instr.arg2.value
+    if type not in ("int", "bool"):
+      raise _Fallback()
+
+    pos = batch.read_pos
+    lines = [self._lines[lane][pos] if pos < len(self._lines[lane]) else ""
+             for lane in batch.lanes.tolist()]
+    batch.read_pos += 1
+    if type == "bool":
+      column = np.array([line.lower() == "true" for line in lines], dtype = np.bool_)
+      self._store(batch, instr.arg1, "bool", column)
+      return
+
+    values = []
+    bad = []
+    for line in lines:
+      try:
+        value = int(line)
+      except ValueError:
+        value = None
+      if value is None or not _INT_MIN <= value <= _INT_MAX:
+        values.append(0)
+        bad.append(True)
+      else:
+        values.append(value)
+        bad.append(False)
+    self._store(batch, instr.arg1, "int", np.array(values, dtype = np.int64))
+    self._drop(batch, np.array(bad, dtype = np.bool_))
+
+  ## WRITE instruction.
+  #  @details Output is collected for each lane.
+  def _write(self, batch, instr, work):
+    arg = instr.arg1
+    if arg.type == "string":
+      text = arg.value
+    elif arg.type == "nil":
+      text = ""
+    else:
+      type, value = self._operand(batch, arg)
+      if np.ndim(value):
+        if type == "bool":
+          texts = ["true" if item else "false" for item in value.tolist()]
+        else:
+          texts = [str(item) for item in value.tolist()]
+        for lane, text in zip(batch.lanes.tolist(), texts):
+          self._outputs[lane].append(text)
+        return
+      if type == "bool":
+        text = "true" if value else "false"
+      else:
+        text = str(int(value))
+
+    for lane in batch.lanes.tolist():
+      self._outputs[lane].append(text)
+
+  ## Get label position.
+  #  @param label_name Name of label.
+  #  @return Label position in code.
+  def _label_pos(self, label_name):
+    if label_name not in self._labels:
+      raise _Fallback()
+    return self._labels[label_name]
+
+  ## JUMP instruction.
+  def _jump(self, batch, instr, work):
+    batch.pc = self._label_pos(instr.arg1.value)
+
+  ## JUMPIFEQ and JUMPIFNEQ instructions.
+  #  @details If lanes diverge, lanes which jump are split
+  #           into new sub-batch.
+  def _jump_if(self, batch, instr, work):
+    pos = self._label_pos(instr.arg1.value)
+    type1, a = self._operand(batch, instr.arg2)
+    type2, b = self._operand(batch, instr.arg3)
+    if type1 != type2:
+      raise _Fallback()
+
+    taken = np.broadcast_to(a == b, (len(batch.lanes),))
+    if isinstance(instr, JumpIfNeqInstr):
+      taken = ~taken
+    if taken.all():
+      batch.pc = pos
+    elif taken.any():
+      jumped = batch.select(taken)
+      jumped.pc = pos + 1
+      work.append(jumped)
+      rest = batch.select(~taken)
+      batch.lanes = rest.lanes
+      batch.vars = rest.vars
+
+  ## EXIT instruction.
+  #  @details Lanes with exit code out of range are sent
+  #           to scalar interpreter.
+  def _exit(self, batch, instr, work):
+    type, value = self._operand(batch, instr.arg1)
+    if type != "int":
+      raise _Fallback()
+
+    value = np.broadcast_to(value, (len(batch.lanes),))
+    bad = (value < 0) | (value > 49)
+    for lane, code in zip(batch.lanes[~bad].tolist(), value[~bad].tolist()):
+      self._exit_codes[lane] = code
+    self._drop(batch, bad)
+    return True
+
+## Run program for many inputs in lockstep.
+#  @param instr_list Sorted list of instructions.
+#  @param inputs     List of input texts.
+#  @return List of LaneResult objects, one per input.
+def run_batch(instr_list, inputs):
+  return BatchEngine(instr_list, inputs).run()
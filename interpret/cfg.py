@@ -0,0 +1,172 @@
+## @package cfg
+#  Control-flow graph of basic blocks.
+
+from interpret.factory import InstrFactory
+from interpret.instruction import *
+
+## Instructions which may change instruction counter.
+#  @details Block is ended after each of them.
+BRANCH_INSTRS = (JumpInstr, JumpIfEqInstr, JumpIfNeqInstr,
+                 JumpIfEqStackInstr, JumpIfNotEqStackInstr)
+## Instructions which end basic block.
+#  @details BREAK also ends block, so it prints exact code position.
+END_INSTRS = BRANCH_INSTRS + (CallInstr, ReturnInstr, ExitInstr, BreakInstr)
+
+## Basic block.
+#
+#  Sequence of instructions with single entry (first instruction)
+#  and single exit (last instruction).
+class BasicBlock:
+  ## Basic block constructor.
+  #  @param idx    Number of block in graph.
+  #  @param start  Position of first instruction in code.
+  #  @param end    Position of last instruction in code.
+  #  @param instrs Instructions of the block.
+  def __init__(self, idx, start, end, instrs):
+    self.idx = idx       ## Number of block in graph.
+    self.start = start   ## Position of first instruction.
+    self.end = end       ## Position of last instruction.
+    self.instrs = instrs ## Instructions of the block.
+    self.label = None    ## Name of label starting the block.
+    self.succs = []      ## Successor blocks.
+    self.preds = []      ## Predecessor blocks.
+    self.calls = []      ## Blocks called by CALL instruction.
+    self.callers = []    ## Blocks calling this block.
+
+  ## Last instruction of the block.
+  #  @return Instruction ending the block.
+  def last(self):
+    return self.instrs[-1]
+
+## Control-flow graph.
+#
+#  Splits sorted instructions into basic blocks
+#  at labels and after control transfer instructions.
+class ControlFlowGraph:
+  ## Control-flow graph constructor.
+  #  @param instr_list Sorted list of instructions.
+  #  @param labels     Labels and their position in code.
+  def __init__(self, instr_list, labels):
+    self.blocks = []    ## All basic blocks ordered by position.
+    self._block_at = {} ## Blocks by position of their first instruction.
+    self._split(instr_list)
+    self._connect(labels)
+
+  ## Split instructions into basic blocks.
+  #  @param instr_list Sorted list of instructions.
+  def _split(self, instr_list):
+    start = 0
+    for idx, instr in enumerate(instr_list):
+      if isinstance(instr, LabelInstr) and idx != start:
+        self._add_block(start, idx - 1, instr_list)
+        start = idx
+      if isinstance(instr, END_INSTRS):
+        self._add_block(start, idx, instr_list)
+        start = idx + 1
+    if start < len(instr_list):
+      self._add_block(start, len(instr_list) - 1, instr_list)
+
+  ## Create block and add it to graph.
+  #  @param start      Position of first instruction.
+  #  @param end        Position of last instruction.
+  #  @param instr_list Sorted list of instructions.
+  def _add_block(self, start, end, instr_list):
+    block = BasicBlock(len(self.blocks), start, end,
+                       tuple(instr_list[start:end + 1]))
+    if isinstance(block.instrs[0], LabelInstr):
+      block.label = block.instrs[0].arg1.value
+    self.blocks.append(block)
+    self._block_at[start] = block
+
+  ## Create edges between blocks.
+  #  @details Jump to undefined label has no edge,
+  #           error is reported at runtime.
+  #  @param labels Labels and their position in code.
+  def _connect(self, labels):
+    for block in self.blocks:
+      last = block.last()
+      next_block = self._block_at.get(block.end + 1)
+      targets = []
+      if isinstance(last, BRANCH_INSTRS) and last.arg1.value in labels:
+        targets.append(self._block_at[labels[last.arg1.value]])
+      if not isinstance(last, (JumpInstr, ReturnInstr, ExitInstr)) \
+         and next_block is not None:
+        targets.append(next_block)
+      for target in targets:
+        if target not in block.succs:
+          block.succs.append(target)
+          target.preds.append(block)
+
+      if isinstance(last, CallInstr) and last.arg1.value in labels:
+        callee = self._block_at[labels[last.arg1.value]]
+        block.calls.append(callee)
+        callee.callers.append(block)
+
+  ## Get block starting at position.
+  #  @param pos Position of first instruction.
+  #  @return Block or None if no block starts there.
+  def block_at(self, pos):
+    return self._block_at.get(pos)
+
+  ## Get block entry points for block-at-a-time execution.
+  #  @details Entry is at first instruction of each block and also
+  #           right after label, where jumps continue execution.
+  #  @return Dictionary of position to tuple of instructions before
+  #          the last one, last instruction and its position.
+  def entries(self):
+    entries = {}
+    for block in self.blocks:
+      entries[block.start] = (block.instrs[:-1], block.last(), block.end)
+      if block.label is not None and block.start != block.end:
+        entries[block.start + 1] = (block.instrs[1:-1], block.last(), block.end)
+    return entries
+
+  ## Get call graph of labels.
+  #  @details Code which is not under any called label
+  #           is reported as None (main body).
+  #  @return Dictionary of caller label to set of called labels.
+  def call_graph(self):
+    graph = {}
+    for func, blocks in self.functions().items():
+      graph[func] = {callee.label for block in blocks for callee in block.calls}
+    return graph
+
+  ## Get blocks reachable from each CALL target (and main body).
+  #  @details Reachability does not follow CALL edges.
+  #  @return Dictionary of label (None for main body) to list of blocks.
+  def functions(self):
+    entries = [None] + sorted({callee.label for block in self.blocks
+                               for callee in block.calls})
+    funcs = {}
+    for entry in entries:
+      if entry is None:
+        first = self.blocks[:1]
+      else:
+        first = [block for block in self.blocks if block.label == entry]
+      seen = set()
+      stack = list(first)
+      while stack:
+        block = stack.pop()
+        if block.idx in seen:
+          continue
+        seen.add(block.idx)
+        stack.extend(block.succs)
+      funcs[entry] = [self.blocks[idx] for idx in sorted(seen)]
+    return funcs
+
+  ## Export graph in DOT format.
+  #  @details Solid edges are control flow, dashed edges are calls.
+  #  @return DOT source string.
+  def to_dot(self):
+    lines = ["digraph cfg {", "  node [shape=box, fontname=monospace];"]
+    for block in self.blocks:
+      text = "\\l".join(f"{instr.order}: {InstrFactory.get_opcode(instr)}"
+                        for instr in block.instrs)
+      lines.append(f"  b{block.idx} [label=\"{text}\\l\"];")
+    for block in self.blocks:
+      for succ in block.succs:
+        lines.append(f"  b{block.idx} -> b{succ.idx};")
+      for callee in block.calls:
+        lines.append(f"  b{block.idx} -> b{callee.idx} [style=dashed];")
+    lines.append("}")
+    return "\n".join(lines) + "\n"
@@ -2,10 +2,14 @@
 #  Interpreter data structure and access methods
 #  implementation.
 
-from interpret.instruction import LabelInstr
+from interpret.cfg import ControlFlowGraph
+from interpret.instruction import *
+from interpret.spill import SpillingStack
 from interpret.structs import Value
 import utils.error as error
 
+from itertools import compress, islice
+from operator import attrgetter, eq, lt, ne
 import sys
 
 ## Interpreter and its state.
@@ -15,26 +19,99 @@ import sys
 class Interpreter:
   ## Input stream for read instruction.
   input_stream = None
+  ## Orders spanning less than factor times number of instructions
+  #  are placed to buckets instead of sorting.
+  DENSE_ORDER_FACTOR = 4
+  ## Names of hook events.
+  HOOK_EVENTS = ("instruction", "call", "return", "jump", "error", "exit")
+  ## Instructions which cause call, return and jump events.
+  _HOOK_TRANSFERS = {
+    CallInstr:             "call",
+    ReturnInstr:           "return",
+    JumpInstr:             "jump",
+    JumpIfEqInstr:         "jump",
+    JumpIfNeqInstr:        "jump",
+    JumpIfEqStackInstr:    "jump",
+    JumpIfNotEqStackInstr: "jump",
+  }
 
   ## Interpreter constructor.
   def __init__(self):
-    self._counter = 0     ## Instruction counter.
-    self._instr_list = [] ## All instructions list.
-    self._labels = {}     ## Labels and their position in code.
-    self._globframe = {}  ## Global frame.
-    self._locframes = []  ## Local frame stack.
-    self._tmpframe = None ## Temporary frame.
-    self._callstack = []  ## Call stack.
-    self._datastack = []  ## Data stack.
+    self._counter = 0         ## Instruction counter.
+    self._instr_list = []     ## All instructions list.
+    self._labels = {}         ## Labels and their position in code.
+    self._globframe = {}      ## Global frame.
+    self._locframes = []      ## Local frame stack.
+    self._tmpframe = None     ## Temporary frame.
+    self._callstack = []      ## Call stack.
+    self._datastack = []      ## Data stack.
+    self._cfg = None          ## Control-flow graph (built on demand).
+    self._memo = None         ## Memoizer of pure subroutines (optional).
+    self._hooks = {}          ## Registered hooks by event.
+    self._registers = 0       ## Number of registers (see lowering).
+    self._regframe = {}       ## Frame of registers.
 
   ## Append instruction to instruction list.
   #  @param instr Instruction to append.
   def append_instr(self, instr):
     self._instr_list.append(instr)
+    self._cfg = None
 
   ## Sorts instructions list by their order.
+  #  @details Already ascending list is only checked, dense orders
+  #           are placed to buckets directly, only sparse orders
+  #           are sorted. Duplicate order is XML structure error.
   def instr_sort(self):
-    self._instr_list.sort(key = lambda x: x.order)
+    instr_list = self._instr_list
+    orders = list(map(attrgetter("order"), instr_list))
+    if not all(map(lt, orders, islice(orders, 1, None))):
+      low = min(orders)
+      high = max(orders)
+      if high - low < self.DENSE_ORDER_FACTOR * len(orders):
+        buckets = [None] * (high - low + 1)
+        for order, instr in zip(orders, instr_list):
+          if buckets[order - low] is not None:
+            self._duplicate_order(order)
+          buckets[order - low] = instr
+        instr_list[:] = filter(None, buckets)
+      else:
+        orders.sort()
+        if not all(map(ne, orders, islice(orders, 1, None))):
+          self._duplicate_order(next(compress(orders, map(eq, orders, islice(orders, 1, None)))))
+        instr_list.sort(key = attrgetter("order"))
+
+    self._cfg = None
+
+  ## Exit with error of duplicate instruction order.
+  #  @param order Duplicate order.
+  def _duplicate_order(self, order):
+    error.error_exit(error.XMLSTRUCT_ERROR, f"Duplicate instruction order {order}")
+
+  ## Replace instructions list by transformed one.
+  #  @details Labels are found again. Instructions keep orders
+  #           of the original ones, so equal and not ascending
+  #           orders are allowed (e.g. for copies of instructions).
+  #  @param instr_list New instructions list.
+  def set_instrs(self, instr_list):
+    self._instr_list = instr_list
+    self._labels = {}
+    self.find_labels()
+    self._cfg = None
+
+  ## Use program store as instructions list.
+  #  @details Instructions are run directly from store
+  #           (see ProgramStore), labels are found in store.
+  #  @param store ProgramStore with sorted instructions.
+  def load_store(self, store):
+    self._instr_list = store
+    self._labels = store.labels()
+    self._cfg = None
+
+  ## Set number of registers used by lowered instructions.
+  #  @param count Number of registers.
+  def set_registers(self, count):
+    self._registers = count
+    self._regframe = {str(idx): Value() for idx in range(count)}
 
   ## Loops through instructions and saves label positions.
   def find_labels(self):
@@ -46,28 +123,256 @@ class Interpreter:
 
         self._labels[label_name] = idx
 
+  ## Return control-flow graph of instructions.
+  #  @details Graph is built on first use.
+  #           Labels must be found before.
+  #  @return ControlFlowGraph object.
+  def get_cfg(self):
+    if self._cfg is None:
+      self._cfg = ControlFlowGraph(self._instr_list, self._labels)
+    return self._cfg
+
+  ## Set memoizer of pure subroutine calls.
+  #  @param memo Memoizer object or None to disable memoization.
+  def set_memoizer(self, memo):
+    self._memo = memo
+
+  ## Register hook called on event during execution.
+  #  @details Events are "instruction" (before instruction is run),
+  #           "call", "return", "jump" (after control transfer),
+  #           "error" and "exit". Hooks are called with instruction,
+  #           its order and interpreter, error and exit hooks also
+  #           with exit code (instruction and order are None
+  #           when program ends after last instruction).
+  #           Instruction is valid only during the call of hook
+  #           (see ProgramStore), hooks keep positions or orders.
+  #           When any hook is registered, instrumented loop is used.
+  #  @param event Name of event.
+  #  @param hook  Callable to register.
+  def add_hook(self, event, hook):
+    if event not in self.HOOK_EVENTS:
+      raise ValueError(f"unknown hook event '{event}'")
+    self._hooks.setdefault(event, []).append(hook)
+
+  ## Unregister hook.
+  #  @param event Name of event.
+  #  @param hook  Registered callable.
+  def remove_hook(self, event, hook):
+    hooks = self._hooks.get(event, [])
+    if hook in hooks:
+      hooks.remove(hook)
+    if not hooks:
+      self._hooks.pop(event, None)
+
   ## Runs interpeter's instructions.
   #  @details After each instruction is run, counter is incremented by one.
   #           If counter was modified by jump, call or ret function,
   #           counter is still incremented.
   #           After the execution, state is reseted.
+  #           If hooks are registered, instrumented loop is run instead.
   def execute(self):
+    if self._hooks:
+      self._execute_hooked()
+      return
+
     while self._counter < len(self._instr_list):
       self._instr_list[self._counter].do()
       self._counter += 1
 
     self.reset_state()
 
+  ## Runs interpreter's instructions and calls registered hooks.
+  def _execute_hooked(self):
+    on_instruction = self._hooks.get("instruction", [])
+    transfers = self._HOOK_TRANSFERS
+    while self._counter < len(self._instr_list):
+      instr = self._instr_list[self._counter]
+      for hook in on_instruction:
+        hook(instr, instr.order, self)
+
+      prev_counter = self._counter
+      try:
+        instr.do()
+      except SystemExit as e:
+        code = e.code if e.code is not None else 0
+        event = "exit" if isinstance(instr, ExitInstr) else "error"
+        for hook in self._hooks.get(event, []):
+          hook(instr, instr.order, self, code)
+        raise
+
+      event = transfers.get(type(instr))
+      if event is not None and self._counter != prev_counter:
+        for hook in self._hooks.get(event, []):
+          hook(instr, instr.order, self)
+      self._counter += 1
+
+    for hook in self._hooks.get("exit", []):
+      hook(None, None, self, 0)
+    self.reset_state()
+
+  ## Runs interpreter's instructions and tracks memory statistics.
+  #  @details Same as execute, but statistics are updated
+  #           after each instruction.
+  #  @param stats MemoryStats object to update.
+  def execute_mem_stats(self, stats):
+    while self._counter < len(self._instr_list):
+      instr = self._instr_list[self._counter]
+      instr.do()
+      stats.update(self, instr)
+      self._counter += 1
+
+    self.reset_state()
+
+  ## Runs interpreter's instructions and updates metrics.
+  #  @details Metrics are updated after each batch of instructions,
+  #           so there is no cost per instruction. With registered
+  #           hooks, metrics are updated by hook.
+  #  @param metrics Metrics object to update.
+  def execute_metrics(self, metrics):
+    if self._hooks:
+      metrics.register(self)
+      self._execute_hooked()
+      return
+
+    instr_list = self._instr_list
+    instr_count = len(instr_list)
+    batch = metrics.batch
+    while self._counter < instr_count:
+      try:
+        for executed in range(batch):
+          if self._counter >= instr_count:
+            break
+          instr_list[self._counter].do()
+          self._counter += 1
+        else:
+          executed = batch
+      except SystemExit:
+        metrics.update(self, executed + 1)
+        raise
+      metrics.update(self, executed)
+
+    self.reset_state()
+
+  ## Runs interpreter's instructions and records them by flight recorder.
+  #  @details Position of each instruction is written to ring buffer
+  #           of recorder before it is run. With registered hooks,
+  #           instructions are recorded by hook.
+  #  @param recorder FlightRecorder object.
+  def execute_flight(self, recorder):
+    if self._hooks:
+      recorder.register(self)
+      self._execute_hooked()
+      return
+
+    instr_list = self._instr_list
+    positions = recorder.positions
+    size = len(positions)
+    slot = recorder.pos
+    try:
+      if recorder.types is None:
+        while self._counter < len(instr_list):
+          positions[slot] = self._counter
+          slot += 1
+          if slot == size:
+            slot = 0
+          instr_list[self._counter].do()
+          self._counter += 1
+      else:
+        while self._counter < len(instr_list):
+          positions[slot] = self._counter
+          recorder.record_types(self, slot, self._counter)
+          slot += 1
+          if slot == size:
+            slot = 0
+          instr_list[self._counter].do()
+          self._counter += 1
+    finally:
+      recorder.pos = slot
+
+    self.reset_state()
+
+  ## Runs interpreter's instructions and counts them for introspection.
+  #  @details Count of executed instructions is updated after each
+  #           batch of instructions, so there is no cost per instruction.
+  #           With registered hooks, instructions are counted by hook.
+  #  @param introspector Introspector object.
+  def execute_introspected(self, introspector):
+    if self._hooks:
+      introspector.register(self)
+      self._execute_hooked()
+      return
+
+    instr_list = self._instr_list
+    instr_count = len(instr_list)
+    batch = introspector.batch
+    while self._counter < instr_count:
+      for executed in range(batch):
+        if self._counter >= instr_count:
+          break
+        instr_list[self._counter].do()
+        self._counter += 1
+      else:
+        executed = batch
+      introspector.executed += executed
+
+    self.reset_state()
+
+  ## Runs at most given number of interpreter's instructions.
+  #  @details Execution can be resumed by calling step again.
+  #           Unlike execute, state is not reseted after the last instruction.
+  #           If instruction raises exception, counter stays on
+  #           that instruction, so it is run again on next step.
+  #  @param count Maximal number of instructions to run.
+  #  @return True if all instructions were run, False otherwise.
+  def step(self, count):
+    instr_list = self._instr_list
+    instr_count = len(instr_list)
+    for _ in range(count):
+      if self._counter >= instr_count:
+        return True
+      instr_list[self._counter].do()
+      self._counter += 1
+
+    return self._counter >= instr_count
+
+  ## Runs interpreter's instructions block by block.
+  #  @details Same as execute, but instructions inside basic block
+  #           are run without looking up the next instruction. Counter
+  #           is set to position of each run instruction, so samplers
+  #           and errors see the running instruction.
+  #           If hooks are registered, instrumented loop is run instead.
+  def execute_blocks(self):
+    if self._hooks:
+      self._execute_hooked()
+      return
+
+    entries = self.get_cfg().entries()
+    instr_count = len(self._instr_list)
+    while self._counter < instr_count:
+      body, last, end = entries[self._counter]
+      for self._counter, instr in enumerate(body, self._counter):
+        instr.do()
+      self._counter = end
+      last.do()
+      self._counter += 1
+
+    self.reset_state()
+
   ## Resets interpeter state.
   ## @details Resets to state state as if no instructions were run.
   ##          Insturction list and dictionary of labels is kept.
+  ##          Spill file of data stack (if any) is released.
   def reset_state(self):
     self._counter = 0
     self._globframe = {}
     self._locframes = []
     self._tmpframe = None
     self._callstack = []
-    self._datastack = []
+    if isinstance(self._datastack, SpillingStack):
+      self._datastack.close()
+    else:
+      self._datastack.clear()
+    self._regframe = {str(idx): Value() for idx in range(self._registers)}
 
   ## Return frame by name.
   #  @details If frame is local frame,
@@ -85,6 +390,8 @@ class Interpreter:
       if self._tmpframe is None:
         error.error_exit(error.NOFRAME_ERROR, "Frame does not exist")
       return self._tmpframe
+    elif frame_name == "RF":
+      return self._regframe
 
   ## Create temporary frame.
   def create_tmpframe(self):
@@ -139,6 +446,21 @@ class Interpreter:
 
     return var
 
+  ## Return type of variable without checking it exists.
+  #  @param arg Argument of variable.
+  #  @return Type or None if variable does not exist or is not initialized.
+  def peek_type(self, arg):
+    if arg.frame == "GF":
+      frame = self._globframe
+    elif arg.frame == "LF":
+      frame = self._locframes[-1] if self._locframes else None
+    elif arg.frame == "RF":
+      frame = self._regframe
+    else:
+      frame = self._tmpframe
+    var = frame.get(arg.value) if frame is not None else None
+    return var.type if var is not None else None
+
   ## Returns symbol from argument.
   #  @details Variable must be initialized.
   #  @param arg Argument of instruction.
@@ -168,8 +490,12 @@ class Interpreter:
   ## Jump to position in code and save previous one on call stack.
   #  @details Next instruction to be interpreted is pos + 1.
   #           Saves previous position so ret function can be called.
+  #           If memoizer has cached result of the call,
+  #           it is used instead.
   #  @param pos Position where to jump.
   def call(self, pos):
+    if self._memo is not None and self._memo.enter(self, pos):
+      return
     self._callstack.append(self._counter)
     self.jump(pos)
 
@@ -181,6 +507,8 @@ class Interpreter:
     if not self._callstack:
       error.error_exit(error.NOVALUE_ERROR, "Empty callstack")
 
+    if self._memo is not None:
+      self._memo.leave(self)
     self._counter = self._callstack.pop()
 
   ## Push value on data stack.
@@ -199,7 +527,14 @@ class Interpreter:
 
   ## Deletes contents of datastack.
   def datastack_clear(self):
-    self._datastack = []
+    self._datastack.clear()
+
+  ## Use data stack spilling to disk.
+  #  @details Values over threshold are spilled to temporary file
+  #           (see SpillingStack). Data stack must be empty.
+  #  @param threshold Maximal number of values held in memory.
+  def set_stack_spill(self, threshold):
+    self._datastack = SpillingStack(threshold)
 
   ## Prints frame variables to STDERR.
   #  @param frame Frame to print.
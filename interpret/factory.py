@@ -63,6 +63,9 @@ class InstrFactory:
     "JUMPIFNEQS":  JumpIfNotEqStackInstr
   }
 
+  ## Map of classes to opcodes.
+  _classes = {instr_class: opcode for opcode, instr_class in _opcodes.items()}
+
   ## Create instruction object of given opcode.
   #  @param opcode Opcode of instruction.
   #  @param order Order of instruction.
@@ -73,3 +76,13 @@ class InstrFactory:
       return cls._opcodes[opcode](order)
     except KeyError:
       error.error_exit(error.XMLSTRUCT_ERROR, "Invalid opcode")
+
+  ## Get opcode name of instruction object.
+  #  @details Instructions not created by factory (e.g. marks
+  #           of inlined instructions) can have opcode attribute.
+  #  @param instr Instruction object.
+  #  @return Opcode string of instruction.
+  @classmethod
+  def get_opcode(cls, instr):
+    opcode = cls._classes.get(type(instr))
+    return opcode if opcode is not None else getattr(instr, "opcode", None)
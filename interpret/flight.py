@@ -0,0 +1,171 @@
+## @package flight
+#  Flight recorder of recently run instructions.
+#
+#  Fixed-size ring buffer holds positions of the last run instructions
+#  (and optionally types of their variable operands). It is dumped when
+#  program ends by error, by EXIT instruction with non-zero code,
+#  by exception of interpreter or by SIGTERM, together with order
+#  and opcode of the failing instruction, types of its operands and of
+#  values on top of data stack and call stack of labels.
+
+from interpret.factory import InstrFactory
+from interpret.instruction import ExitInstr
+
+import signal
+import sys
+
+## Number of data stack values whose types are dumped.
+STACK_TOP = 4
+
+## Raised by signal handler to end interpretation.
+#
+#  Exit code is 128 + signal number, as reported by shells.
+class SignalExit(SystemExit):
+  ## Signal exit constructor.
+  #  @param signum Number of received signal.
+  def __init__(self, signum):
+    super().__init__(128 + signum)
+    self.signum = signum ## Number of received signal.
+
+## Text of instruction argument.
+#  @param arg Argument of instruction.
+#  @return Argument in IPPcode22 notation.
+def _format_arg(arg):
+  if arg.type == "var":
+    return f"{arg.frame}@{arg.value}"
+  if arg.type in ("label", "type"):
+    return str(arg.value)
+  if arg.type == "bool":
+    return f"bool@{str(arg.value).lower()}"
+  if arg.type == "nil":
+    return "nil@nil"
+  return f"{arg.type}@{arg.value}"
+
+## Text of instruction.
+#  @param instr Instruction.
+#  @return Order, opcode and arguments of instruction.
+def _format_instr(instr):
+  args = [_format_arg(arg) for arg in (instr.arg1, instr.arg2, instr.arg3) if arg is not None]
+  return " ".join([str(instr.order), InstrFactory.get_opcode(instr)] + args)
+
+## Flight recorder.
+#
+#  Positions are recorded by Interpreter.execute_flight
+#  (or by hook when other hooks are registered).
+class FlightRecorder:
+  ## Flight recorder constructor.
+  #  @param size  Number of recorded instructions.
+  #  @param types Whether types of variable operands are recorded.
+  #  @param path  Path of dump file (STDERR if not given).
+  def __init__(self, size = 256, types = False, path = None):
+    self.positions = [-1] * size             ## Ring of instruction positions.
+    self.types = [None] * size if types else None ## Ring of operand types (optional).
+    self.pos = 0                             ## Next slot of ring.
+    self._path = path                        ## Path of dump file.
+    self._variables = None                   ## Variable operands by instruction position.
+    self._prev_handler = None                ## Replaced SIGTERM handler.
+
+  ## Prepare recording of program.
+  #  @details SIGTERM ends interpretation by SignalExit.
+  #  @param instr_list Instructions of the program.
+  def start(self, instr_list):
+    if self.types is not None:
+      self._variables = [tuple(arg for arg in (instr.arg1, instr.arg2, instr.arg3)
+                               if arg is not None and arg.type == "var")
+                         for instr in instr_list]
+    self._prev_handler = signal.signal(signal.SIGTERM, self._on_signal)
+
+  ## Restore SIGTERM handler.
+  def stop(self):
+    signal.signal(signal.SIGTERM, self._prev_handler)
+
+  ## End interpretation (SIGTERM handler).
+  def _on_signal(self, signum, frame):
+    raise SignalExit(signum)
+
+  ## Record types of variable operands.
+  #  @param interpreter Interpreter running the instruction.
+  #  @param slot        Slot of ring.
+  #  @param position    Position of instruction.
+  def record_types(self, interpreter, slot, position):
+    self.types[slot] = [interpreter.peek_type(arg) for arg in self._variables[position]]
+
+  ## Record instruction (used as hook).
+  #  @param instr       Instruction to be run.
+  #  @param order       Order of instruction.
+  #  @param interpreter Interpreter running the instruction.
+  def __call__(self, instr, order, interpreter):
+    self.positions[self.pos] = interpreter._counter
+    if self.types is not None:
+      self.record_types(interpreter, self.pos, interpreter._counter)
+    self.pos = (self.pos + 1) % len(self.positions)
+
+  ## Register hook on interpreter.
+  #  @param interpreter Interpreter to register on.
+  def register(self, interpreter):
+    interpreter.add_hook("instruction", self)
+
+  ## Describe end of program.
+  #  @param interpreter Interpreter running the program.
+  #  @param exception   Exception which ended the program.
+  #  @return Description or None if program ended normally.
+  def _reason(self, interpreter, exception):
+    if isinstance(exception, SignalExit):
+      return f"signal {signal.Signals(exception.signum).name}"
+    if isinstance(exception, SystemExit):
+      if not exception.code:
+        return None
+      instr_list = interpreter._instr_list
+      if interpreter._counter < len(instr_list) and \
+         isinstance(instr_list[interpreter._counter], ExitInstr):
+        return f"EXIT with code {exception.code}"
+      return f"error {exception.code}"
+    return f"exception {type(exception).__name__}: {exception}"
+
+  ## Dump recorded instructions.
+  #  @details Nothing is dumped if program ended normally.
+  #  @param interpreter Interpreter running the program.
+  #  @param exception   Exception which ended the program.
+  def dump(self, interpreter, exception):
+    reason = self._reason(interpreter, exception)
+    if reason is None:
+      return
+
+    instr_list = interpreter._instr_list
+    lines = [f"Flight recorder: {reason}"]
+    if interpreter._counter < len(instr_list):
+      instr = instr_list[interpreter._counter]
+      operand_types = [arg.type if arg.type != "var" else interpreter.peek_type(arg) or "-"
+                       for arg in (instr.arg1, instr.arg2, instr.arg3)
+                       if arg is not None and arg.type not in ("label", "type")]
+      lines.append(f"Instruction: {_format_instr(instr)}")
+      if operand_types:
+        lines.append(f"Operand types: {' '.join(operand_types)}")
+    if interpreter._datastack:
+      top = [value.type for value in interpreter._datastack[-STACK_TOP:]]
+      lines.append(f"Data stack top: {' '.join(top)}")
+    stack = ["main"] + [instr_list[pos].arg1.value for pos in interpreter._callstack]
+    lines.append(f"Call stack: {' > '.join(stack)}")
+
+    size = len(self.positions)
+    slots = [slot % size for slot in range(self.pos, self.pos + size)
+             if self.positions[slot % size] >= 0]
+    lines.append(f"Last {len(slots)} instructions (oldest first):")
+    for slot in slots:
+      line = f"  {_format_instr(instr_list[self.positions[slot]])}"
+      if self.types is not None:
+        line += f"  [{' '.join(type or '-' for type in self.types[slot])}]"
+      lines.append(line)
+    self._write("\n".join(lines) + "\n")
+
+  ## Write dump to file or STDERR.
+  #  @param text Text of dump.
+  def _write(self, text):
+    if self._path is None:
+      sys.stderr.write(text)
+      return
+    try:
+      with open(self._path, "w") as dump_file:
+        dump_file.write(text)
+    except EnvironmentError as e:
+      sys.stderr.write(f"ERROR: Cannot access file {e.filename}\n")
@@ -0,0 +1,42 @@
+## @package hooks
+#  Built-in execution hooks.
+
+from interpret.factory import InstrFactory
+
+from collections import Counter
+
+## Coverage of instructions by order.
+#
+#  Registered as "instruction" hook, counts executions
+#  of each instruction.
+class CoverageHook:
+  ## Coverage hook constructor.
+  def __init__(self):
+    self.counts = Counter() ## Number of executions by order.
+
+  ## Record execution of instruction.
+  #  @param instr       Instruction to be run.
+  #  @param order       Order of instruction.
+  #  @param interpreter Interpreter running the instruction.
+  def __call__(self, instr, order, interpreter):
+    self.counts[order] += 1
+
+  ## Register hook on interpreter.
+  #  @param interpreter Interpreter to register on.
+  def register(self, interpreter):
+    interpreter.add_hook("instruction", self)
+
+  ## Write coverage report.
+  #  @details Each order is listed once (copies of inlined
+  #           instructions share it) with opcode and number of executions.
+  #  @param instr_list Instructions of the program.
+  #  @param out_file   File to write to.
+  def write(self, instr_list, out_file):
+    instrs = {}
+    for instr in instr_list:
+      instrs.setdefault(instr.order, instr)
+    covered = sum(1 for order in instrs if self.counts[order])
+    out_file.write(f"Covered: {covered}/{len(instrs)}\n")
+    for order in sorted(instrs):
+      out_file.write(f"{order} {InstrFactory.get_opcode(instrs[order])} "
+                     f"{self.counts[order]}\n")
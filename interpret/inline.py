@@ -0,0 +1,102 @@
+## @package inline
+#  Inlining of small subroutines into CALL sites.
+#
+#  Subroutine can be inlined when its body (instructions after its
+#  label up to the first RETURN) is short, has no labels, jumps
+#  or BREAK (which prints code position), does not call itself and
+#  has balanced PUSHFRAME / POPFRAME (local frame stack is never
+#  popped below its level at the call). CALL of such subroutine is
+#  replaced by copies of its body without RETURN. Copies keep orders
+#  of the original instructions, so errors, coverage etc. are reported
+#  by orders of the subroutine. Subroutine itself is kept in code.
+#
+#  Optionally, CALL and RETURN are replaced by marks, which do nothing,
+#  but are seen by hooks, so e.g. coverage counts them as run.
+
+from interpret.factory import InstrFactory
+from interpret.instruction import *
+
+import copy
+
+## Instructions which prevent inlining of subroutine.
+NOT_INLINED = (LabelInstr, JumpInstr, JumpIfEqInstr, JumpIfNeqInstr,
+               JumpIfEqStackInstr, JumpIfNotEqStackInstr, BreakInstr)
+
+## Mark of inlined CALL or RETURN instruction.
+#
+#  Is run as no-op, has order, opcode (see InstrFactory.get_opcode)
+#  and label of the inlined instruction.
+class InlineMarkInstr(Instruction):
+  ## Inline mark constructor.
+  #  @param instr Inlined CALL or RETURN instruction.
+  def __init__(self, instr):
+    super().__init__(instr.order)
+    self.arg1 = instr.arg1                       ## Label of CALL (None for RETURN).
+    self.opcode = InstrFactory.get_opcode(instr) ## Opcode of inlined instruction.
+
+## Return body of subroutine if it can be inlined.
+#  @param instr_list Instructions of the program.
+#  @param label      Name of label of subroutine.
+#  @param pos        Position of label.
+#  @param max_body   Maximal number of instructions of body.
+#  @return List of body instructions (without RETURN) or None.
+def inline_body(instr_list, label, pos, max_body):
+  body = []
+  level = 0
+  for instr in instr_list[pos + 1:pos + max_body + 2]:
+    if isinstance(instr, ReturnInstr):
+      return body if level == 0 else None
+    if isinstance(instr, NOT_INLINED):
+      return None
+    if isinstance(instr, CallInstr) and instr.arg1.value == label:
+      return None
+    if isinstance(instr, PushframeInstr):
+      level += 1
+    elif isinstance(instr, PopframeInstr):
+      level -= 1
+      if level < 0:
+        return None
+    body.append(instr)
+  return None
+
+## Inline small subroutines of interpreter into CALL sites.
+#  @details Labels must be found before, they are found again
+#           after inlining.
+#  @param interpreter Interpreter with loaded instructions.
+#  @param max_body    Maximal number of instructions of inlined body.
+#  @param budget      Maximal number of added instructions
+#                     (number of instructions of program if not given).
+#  @param marks       Whether CALL and RETURN are replaced by marks
+#                     (InlineMarkInstr) instead of being removed.
+#  @return Number of inlined calls.
+def inline_calls(interpreter, max_body = 16, budget = None, marks = False):
+  instr_list = interpreter._instr_list
+  if budget is None:
+    budget = len(instr_list)
+  bodies = {}
+  for label, pos in interpreter._labels.items():
+    body = inline_body(instr_list, label, pos, max_body)
+    if body is not None:
+      bodies[label] = (body, instr_list[pos + len(body) + 1])
+
+  inlined = []
+  count = 0
+  for instr in instr_list:
+    subroutine = bodies.get(instr.arg1.value) if isinstance(instr, CallInstr) else None
+    if subroutine is not None:
+      body, ret = subroutine
+      added = len(body) + 1 if marks else len(body) - 1
+    if subroutine is None or added > budget:
+      inlined.append(instr)
+      continue
+    if marks:
+      inlined.append(InlineMarkInstr(instr))
+    inlined.extend(copy.copy(body_instr) for body_instr in body)
+    if marks:
+      inlined.append(InlineMarkInstr(ret))
+    budget -= added
+    count += 1
+
+  if count:
+    interpreter.set_instrs(inlined)
+  return count
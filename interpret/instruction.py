@@ -21,6 +21,13 @@ class Instruction:
     if cls._interpreter is None:
       cls._interpreter = interpeter
 
+  ## Switches interpreter for all instructions.
+  #  @details Unlike set_interpeter, interpreter is always changed.
+  #           Used to run several interpreters in one process.
+  @classmethod
+  def switch_interpreter(cls, interpreter):
+    cls._interpreter = interpreter
+
   ## Instruction constructor.
   #  @param order Order of instruction.
   def __init__(self, order):
@@ -0,0 +1,136 @@
+## @package introspect
+#  Live introspection of running program.
+#
+#  On SIGUSR1, snapshot of interpretation is written and execution
+#  continues. Snapshot contains position of instruction counter,
+#  number of executed instructions, speed since last snapshot, the
+#  hottest labels and depths of call stack, local frame stack and data
+#  stack. Hottest labels are found by sampling instruction counter
+#  every SAMPLE_INTERVAL seconds of CPU time (SIGVTALRM), each sample
+#  is counted to the nearest label before the counter.
+
+from interpret.factory import InstrFactory
+
+from bisect import bisect_right
+from collections import Counter
+import signal
+import sys
+import time
+
+## Number of instructions between updates of executed count.
+BATCH = 10000
+## Sampling interval of hottest labels in seconds of CPU time.
+SAMPLE_INTERVAL = 0.01
+## Number of reported hottest labels.
+TOP_LABELS = 5
+
+## Live introspection of interpreter.
+#
+#  Executed instructions are counted by Interpreter.execute_introspected
+#  (or by hook when other hooks are registered).
+class Introspector:
+  ## Introspector constructor.
+  #  @param interpreter Interpreter running the program.
+  #  @param path        Path of snapshot file ("-" for STDERR).
+  #  @param batch       Number of instructions between count updates.
+  def __init__(self, interpreter, path = "-", batch = BATCH):
+    self._interpreter = interpreter ## Interpreter running the program.
+    self._path = path               ## Path of snapshot file.
+    self.batch = batch              ## Instructions between count updates.
+    self.executed = 0               ## Number of executed instructions.
+    self._samples = Counter()       ## Samples of counter since last snapshot.
+    self._start = None              ## Start time of execution.
+    self._last = None               ## Time and executed count of last snapshot.
+    self._labels = []               ## Sorted label positions and names.
+    self._prev_handlers = {}        ## Replaced signal handlers.
+
+  ## Install signal handlers and start sampling.
+  def start(self):
+    self._labels = sorted((pos, name) for name, pos in self._interpreter._labels.items())
+    self._start = time.monotonic()
+    self._last = (self._start, 0)
+    self._prev_handlers[signal.SIGUSR1] = signal.signal(signal.SIGUSR1, self._on_snapshot)
+    self._prev_handlers[signal.SIGVTALRM] = signal.signal(signal.SIGVTALRM, self._sample)
+    signal.setitimer(signal.ITIMER_VIRTUAL, SAMPLE_INTERVAL, SAMPLE_INTERVAL)
+
+  ## Stop sampling and restore signal handlers.
+  def stop(self):
+    signal.setitimer(signal.ITIMER_VIRTUAL, 0, 0)
+    for signum, handler in self._prev_handlers.items():
+      signal.signal(signum, handler)
+
+  ## Count instruction (used as hook).
+  #  @param instr       Instruction to be run.
+  #  @param order       Order of instruction.
+  #  @param interpreter Interpreter running the instruction.
+  def __call__(self, instr, order, interpreter):
+    self.executed += 1
+
+  ## Register hook on interpreter.
+  #  @param interpreter Interpreter to register on.
+  def register(self, interpreter):
+    interpreter.add_hook("instruction", self)
+
+  ## Record sample of instruction counter (SIGVTALRM handler).
+  def _sample(self, signum, frame):
+    self._samples[self._interpreter._counter] += 1
+
+  ## Write snapshot (SIGUSR1 handler).
+  def _on_snapshot(self, signum, frame):
+    self.write_snapshot()
+
+  ## Name of label before position.
+  #  @param pos Position of instruction.
+  #  @return Label name or "main" if there is no label before.
+  def _label_of(self, pos):
+    idx = bisect_right(self._labels, (pos, chr(0x10ffff)))
+    return self._labels[idx - 1][1] if idx else "main"
+
+  ## Hottest labels since last snapshot.
+  #  @return List of (label, share of samples) tuples.
+  def hot_labels(self):
+    labels = Counter()
+    for pos, count in self._samples.items():
+      labels[self._label_of(pos)] += count
+    total = sum(labels.values())
+    return [(label, count / total) for label, count in labels.most_common(TOP_LABELS)]
+
+  ## Create snapshot text.
+  #  @return Lines of snapshot.
+  def snapshot(self):
+    interpreter = self._interpreter
+    now = time.monotonic()
+    last_time, last_executed = self._last
+    speed = (self.executed - last_executed) / (now - last_time) if now > last_time else 0
+    lines = [f"Snapshot at {now - self._start:.3f} s:"]
+
+    instr_list = interpreter._instr_list
+    if interpreter._counter < len(instr_list):
+      instr = instr_list[interpreter._counter]
+      lines.append(f"  Position: {interpreter._counter} "
+                   f"(order {instr.order}, {InstrFactory.get_opcode(instr)})")
+    lines.append(f"  Instructions executed: {self.executed}")
+    lines.append(f"  Instructions per second: {speed:.0f}")
+    hot = ", ".join(f"{label} {share * 100:.1f} %" for label, share in self.hot_labels())
+    lines.append(f"  Hottest labels: {hot or '-'}")
+    lines.append(f"  Call stack depth: {len(interpreter._callstack)}")
+    lines.append(f"  Local frames depth: {len(interpreter._locframes)}")
+    lines.append(f"  Data stack depth: {len(interpreter._datastack)}")
+
+    self._last = (now, self.executed)
+    self._samples = Counter()
+    return lines
+
+  ## Write snapshot to file or STDERR.
+  #  @details Snapshots are appended to file.
+  def write_snapshot(self):
+    text = "\n".join(self.snapshot()) + "\n"
+    if self._path == "-":
+      sys.stderr.write(text)
+      sys.stderr.flush()
+      return
+    try:
+      with open(self._path, "a") as snapshot_file:
+        snapshot_file.write(text)
+    except EnvironmentError as e:
+      sys.stderr.write(f"ERROR: Cannot access file {e.filename}\n")
@@ -0,0 +1,210 @@
+## @package lowering
+#  Lowering of STACK extension code to register form.
+#
+#  Runs of consecutive stack instructions (PUSHS, POPS, stack
+#  operations and conditional stack jumps) are simulated on abstract
+#  data stack and rewritten to three-address instructions, whose
+#  intermediate results are stored in registers (variables of RF
+#  frame of interpreter). Values left on abstract stack at the end
+#  of run are pushed to data stack, values which the run takes from
+#  data stack are popped to registers, so a run never holds values
+#  across basic blocks.
+#
+#  Variables pushed to abstract stack are read by the lowered
+#  instruction which uses them. Before any other check is done
+#  (and before the variable is written), variables still on abstract
+#  stack are copied to registers, so errors are reported in the same
+#  order and with the same codes as in the original code.
+
+from interpret.instruction import *
+from interpret.structs import Argument
+
+## Stack operations and their register form.
+#  @details IDIVS is not lowered, because unlike IDIV it does not
+#           check zero division.
+LOWERED_OPS = {
+  AddStackInstr:         AddInstr,
+  SubStackInstr:         SubInstr,
+  MulStackInstr:         MulInstr,
+  LesserThanStackInstr:  LesserThanInstr,
+  GreaterThanStackInstr: GreaterThanInstr,
+  EqualsStackInstr:      EqualsInstr,
+  AndStackInstr:         AndInstr,
+  OrStackInstr:          OrInstr,
+  NotStackInstr:         NotInstr,
+  IntToCharStackInstr:   IntToCharInstr,
+  StringToIntStackInstr: StringToIntInstr,
+}
+
+## Unary stack operations.
+UNARY_OPS = (NotStackInstr, IntToCharStackInstr)
+
+## Register operations whose result can be stored directly to popped variable.
+#  @details INT2CHAR gets its variable before the codepoint is checked,
+#           so its result is moved from register to keep error order
+#           of INT2CHARS and POPS.
+RETARGETED_OPS = tuple(op for op in LOWERED_OPS.values() if op is not IntToCharInstr)
+
+## Conditional stack jumps and their register form.
+LOWERED_JUMPS = {
+  JumpIfEqStackInstr:    JumpIfEqInstr,
+  JumpIfNotEqStackInstr: JumpIfNeqInstr,
+}
+
+## Frame of registers.
+REGISTER_FRAME = "RF"
+
+## Create instruction with arguments.
+#  @param instr_class Class of instruction.
+#  @param order       Order of instruction.
+#  @param args        Arguments of instruction.
+#  @return Created instruction.
+def _new_instr(instr_class, order, *args):
+  instr = instr_class(order)
+  for idx, arg in enumerate(args):
+    setattr(instr, f"arg{idx + 1}", arg)
+  return instr
+
+## Whether argument is variable of the program (not register).
+#  @param arg Argument.
+#  @return True if argument is unread variable.
+def _is_variable(arg):
+  return arg.type == "var" and arg.frame != REGISTER_FRAME
+
+## Lowering of one run of stack instructions.
+class _RunLowering:
+  ## Run lowering constructor.
+  #  @param registers List of register arguments (extended when needed).
+  #  @param labels    Labels and their position in code.
+  def __init__(self, registers, labels):
+    self._registers = registers ## Register arguments.
+    self._labels = labels       ## Labels of the program.
+    self._used = 0              ## Number of registers used by run.
+    self._stack = []            ## Abstract data stack.
+    self.out = []               ## Lowered instructions.
+
+  ## Return new register.
+  #  @return Argument of register variable.
+  def _new_register(self):
+    if self._used == len(self._registers):
+      self._registers.append(Argument("var", str(self._used), REGISTER_FRAME))
+    self._used += 1
+    return self._registers[self._used - 1]
+
+  ## Copy variables on abstract stack to registers.
+  #  @param order Order of instruction causing the copy.
+  def _materialize(self, order):
+    for idx, arg in enumerate(self._stack):
+      if _is_variable(arg):
+        register = self._new_register()
+        self.out.append(_new_instr(MoveInstr, order, register, arg))
+        self._stack[idx] = register
+
+  ## Take operands from abstract stack.
+  #  @details Missing operands are popped from data stack to registers.
+  #  @param count Number of operands.
+  #  @param order Order of instruction taking operands.
+  #  @return List of operands (bottom first).
+  def _take(self, count, order):
+    missing = count - len(self._stack)
+    if missing > 0:
+      self._materialize(order)
+      popped = []
+      for _ in range(missing):
+        register = self._new_register()
+        self.out.append(_new_instr(PopsInstr, order, register))
+        popped.insert(0, register)
+      self._stack[:0] = popped
+    operands = self._stack[len(self._stack) - count:]
+    del self._stack[len(self._stack) - count:]
+    self._materialize(order)
+    return operands
+
+  ## Push values left on abstract stack to data stack.
+  #  @param order Order of the last instruction of run.
+  def spill(self, order):
+    for arg in self._stack:
+      self.out.append(_new_instr(PushsInstr, order, arg))
+    self._stack = []
+
+  ## Lower one instruction of run.
+  #  @param instr Stack instruction.
+  #  @return False if instruction cannot be lowered (run ends before it).
+  def lower(self, instr):
+    instr_type = type(instr)
+    if instr_type is PushsInstr:
+      self._stack.append(instr.arg1)
+    elif instr_type is PopsInstr:
+      if not self._stack:
+        self.out.append(instr)
+        return True
+      arg = self._stack.pop()
+      self._materialize(instr.order)
+      last = self.out[-1] if self.out else None
+      if arg.frame == REGISTER_FRAME and last is not None and last.arg1 is arg \
+         and type(last) in RETARGETED_OPS:
+        last.arg1 = instr.arg1
+      else:
+        self.out.append(_new_instr(MoveInstr, instr.order, instr.arg1, arg))
+    elif instr_type in LOWERED_OPS:
+      operands = self._take(1 if instr_type in UNARY_OPS else 2, instr.order)
+      register = self._new_register()
+      self.out.append(_new_instr(LOWERED_OPS[instr_type], instr.order, register, *operands))
+      self._stack.append(register)
+    elif instr_type in LOWERED_JUMPS and instr.arg1.value in self._labels:
+      operands = self._take(2, instr.order)
+      self.spill(instr.order)
+      self.out.append(_new_instr(LOWERED_JUMPS[instr_type], instr.order, instr.arg1, *operands))
+    else:
+      return False
+    return True
+
+## Whether instruction can be part of run of stack instructions.
+#  @param instr Instruction.
+#  @return True for PUSHS, POPS, lowered operations and jumps.
+def _in_run(instr):
+  instr_type = type(instr)
+  return instr_type in (PushsInstr, PopsInstr) or instr_type in LOWERED_OPS \
+         or instr_type in LOWERED_JUMPS
+
+## Lower stack instructions of interpreter to register form.
+#  @details Labels must be found before, they are found again
+#           after lowering. Run is replaced only if it gets shorter.
+#  @param interpreter Interpreter with loaded instructions.
+#  @return Number of removed instructions.
+def lower_stack(interpreter):
+  instr_list = interpreter._instr_list
+  registers = []
+  lowered = []
+  idx = 0
+  while idx < len(instr_list):
+    if not _in_run(instr_list[idx]):
+      lowered.append(instr_list[idx])
+      idx += 1
+      continue
+
+    start = idx
+    run = _RunLowering(registers, interpreter._labels)
+    while idx < len(instr_list) and _in_run(instr_list[idx]):
+      instr = instr_list[idx]
+      if not run.lower(instr):
+        break
+      idx += 1
+      if type(instr) in LOWERED_JUMPS:
+        break
+    if idx == start:
+      # conditional jump to unknown label, left as it is
+      lowered.append(instr_list[idx])
+      idx += 1
+      continue
+    run.spill(instr_list[idx - 1].order)
+
+    if len(run.out) < idx - start:
+      lowered.extend(run.out)
+    else:
+      lowered.extend(instr_list[start:idx])
+
+  removed = len(instr_list) - len(lowered)
+  interpreter.set_registers(len(registers))
+  interpreter.set_instrs(lowered)
+  return removed
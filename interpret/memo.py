@@ -0,0 +1,280 @@
+## @package memo
+#  Memoization of pure subroutines called by CALL instruction.
+#
+#  Analysis finds pure CALL targets: subroutines which do no input or
+#  output, do not touch global frame or frames of the caller, leave local
+#  frame stack balanced and have fixed data stack signature (number
+#  of popped arguments and pushed results). Results of calls of pure
+#  subroutines are cached, keyed on argument values (and temporary frame
+#  if subroutine reads it before creating its own).
+
+from interpret.instruction import *
+from interpret.structs import Value
+
+from collections import OrderedDict
+
+## Instructions with side effects, subroutine using them is not pure.
+IMPURE_INSTRS = (ReadInstr, WriteInstr, DprintInstr, BreakInstr, ExitInstr, ClearsInstr)
+
+## Data stack effect of instructions as (popped, pushed) values.
+STACK_EFFECTS = {
+  PushsInstr:            (0, 1),
+  PopsInstr:             (1, 0),
+  AddStackInstr:         (2, 1),
+  SubStackInstr:         (2, 1),
+  MulStackInstr:         (2, 1),
+  IdivStackInstr:        (2, 1),
+  LesserThanStackInstr:  (2, 1),
+  GreaterThanStackInstr: (2, 1),
+  EqualsStackInstr:      (2, 1),
+  AndStackInstr:         (2, 1),
+  OrStackInstr:          (2, 1),
+  NotStackInstr:         (1, 1),
+  IntToCharStackInstr:   (1, 1),
+  StringToIntStackInstr: (2, 1),
+  JumpIfEqStackInstr:    (2, 0),
+  JumpIfNotEqStackInstr: (2, 0),
+}
+
+## Raised when subroutine is found not to be pure.
+class _Impure(Exception):
+  pass
+
+## Signature of pure subroutine.
+class Signature:
+  ## Signature constructor.
+  #  @param args    Number of values popped from data stack.
+  #  @param results Number of values pushed to data stack.
+  #  @param uses_tf Whether temporary frame of caller is read.
+  def __init__(self, args, results, uses_tf):
+    self.args = args       ## Number of arguments.
+    self.results = results ## Number of results.
+    self.uses_tf = uses_tf ## Whether caller's temporary frame is read.
+
+  ## Compare signatures.
+  def __eq__(self, other):
+    return isinstance(other, Signature) and \
+      (self.args, self.results, self.uses_tf) == (other.args, other.results, other.uses_tf)
+
+## Find pure CALL targets.
+#  @param cfg    ControlFlowGraph of program.
+#  @param labels Labels and their position in code.
+#  @return Dictionary of label position to Signature.
+def find_pure_functions(cfg, labels):
+  funcs = {label: blocks for label, blocks in cfg.functions().items()
+           if label is not None}
+  sigs = {}
+  changed = True
+  while changed:
+    changed = False
+    for label, blocks in funcs.items():
+      try:
+        sig = _analyze(label, blocks, sigs, partial = True)
+      except _Impure:
+        sig = None
+      if sig != sigs.get(label):
+        sigs[label] = sig
+        changed = True
+
+  pure = {}
+  for label, blocks in funcs.items():
+    try:
+      sig = _analyze(label, blocks, sigs, partial = False)
+    except _Impure:
+      continue
+    if sig is not None and sig == sigs[label]:
+      pure[labels[label]] = sig
+  return pure
+
+## Analyze subroutine by abstract interpretation of data stack
+#  depth and frames.
+#  @details Raises _Impure if subroutine is not pure.
+#  @param label   Label of subroutine.
+#  @param blocks  Basic blocks of subroutine.
+#  @param sigs    Known signatures of subroutines by label.
+#  @param partial If true, paths calling subroutine with unknown
+#                 signature are ignored, otherwise they are impure.
+#  @return Signature or None if no path returns.
+def _analyze(label, blocks, sigs, partial):
+  members = {block.idx for block in blocks}
+  entry = next(block for block in blocks if block.label == label)
+  # state: (stack depth, local frame level, temporary frame created)
+  states = {entry.idx: (0, 0, False)}
+  work = [entry]
+  min_depth = 0
+  uses_tf = False
+  ret_depth = None
+
+  while work:
+    block = work.pop()
+    depth, level, tf_created = states[block.idx]
+    stopped = False
+    for instr in block.instrs:
+      if isinstance(instr, IMPURE_INSTRS):
+        raise _Impure()
+      for arg in (instr.arg1, instr.arg2, instr.arg3):
+        if arg is None or arg.type != "var":
+          continue
+        if arg.frame == "GF" or (arg.frame == "LF" and level <= 0):
+          raise _Impure()
+        if arg.frame == "TF" and not tf_created:
+          # caller's temporary frame can be read, but not written
+          if arg is instr.arg1 and not isinstance(instr, PushsInstr):
+            raise _Impure()
+          uses_tf = True
+
+      if isinstance(instr, CreateframeInstr):
+        tf_created = True
+      elif isinstance(instr, PushframeInstr):
+        if not tf_created:
+          uses_tf = True
+        level += 1
+        tf_created = False
+      elif isinstance(instr, PopframeInstr):
+        level -= 1
+        if level < 0:
+          raise _Impure()
+        tf_created = True
+      elif isinstance(instr, CallInstr):
+        sig = sigs.get(instr.arg1.value)
+        if sig is None:
+          if partial:
+            stopped = True
+            break
+          raise _Impure()
+        depth -= sig.args
+        min_depth = min(min_depth, depth)
+        depth += sig.results
+        if sig.uses_tf and not tf_created:
+          uses_tf = True
+      elif isinstance(instr, ReturnInstr):
+        if level != 0 or (ret_depth is not None and ret_depth != depth):
+          raise _Impure()
+        ret_depth = depth
+      elif type(instr) in STACK_EFFECTS:
+        popped, pushed = STACK_EFFECTS[type(instr)]
+        depth -= popped
+        min_depth = min(min_depth, depth)
+        depth += pushed
+
+    if stopped:
+      continue
+    for succ in block.succs:
+      if succ.idx not in members:
+        raise _Impure()
+      state = (depth, level, tf_created)
+      prev = states.get(succ.idx)
+      if prev is None:
+        states[succ.idx] = state
+        work.append(succ)
+      elif prev[:2] != state[:2]:
+        raise _Impure()
+      elif prev[2] and not tf_created:
+        states[succ.idx] = state
+        work.append(succ)
+
+  if ret_depth is None:
+    return None
+  return Signature(-min_depth, ret_depth - min_depth, uses_tf)
+
+## Marker of cached call which did not use temporary frame of the caller.
+_KEEP_FRAME = "keep"
+
+## Snapshot of frame contents.
+#  @param frame Frame dictionary or None.
+#  @return Tuple of variables as (name, type, value) or None.
+def _frame_key(frame):
+  if frame is None:
+    return None
+  return tuple(sorted((name, var.type, var.value) for name, var in frame.items()))
+
+## Create new value.
+#  @param type  Type of value.
+#  @param value Value.
+#  @return Value object.
+def _new_value(type, value):
+  result = Value()
+  result.type = type
+  result.value = value
+  return result
+
+## Result cache of pure subroutines.
+#
+#  Used by Interpreter call and ret methods.
+class Memoizer:
+  ## Memoizer constructor.
+  #  @param pure    Dictionary of label position to Signature.
+  #  @param maxsize Maximal number of cached results (LRU).
+  def __init__(self, pure, maxsize = 10000):
+    self._pure = pure           ## Signatures of pure subroutines by position.
+    self._maxsize = maxsize     ## Maximal number of cached results.
+    self._cache = OrderedDict() ## Cached results by call key.
+    self._pending = []          ## Running memoized calls.
+    self._disabled = set()      ## Subroutines with inconsistent run.
+    self.hits = 0               ## Number of cache hits.
+    self.misses = 0             ## Number of cache misses.
+
+  ## Handle call of subroutine.
+  #  @details On cache hit, arguments are popped, results pushed
+  #           and temporary frame set as after the call
+  #           (unless the call did not use temporary frame of the caller).
+  #  @param interpreter Interpreter doing the call.
+  #  @param pos         Position of called label.
+  #  @return True if call was replaced by cached result.
+  def enter(self, interpreter, pos):
+    sig = self._pure.get(pos)
+    if sig is None or pos in self._disabled:
+      return False
+    datastack = interpreter._datastack
+    if len(datastack) < sig.args:
+      return False
+
+    args = datastack[len(datastack) - sig.args:]
+    key = (pos, tuple((value.type, value.value) for value in args),
+           _frame_key(interpreter._tmpframe) if sig.uses_tf else None)
+    cached = self._cache.get(key)
+    if cached is None:
+      self.misses += 1
+      self._pending.append((len(interpreter._callstack), key, sig,
+                            len(datastack) - sig.args, len(interpreter._locframes),
+                            interpreter._tmpframe))
+      return False
+
+    self.hits += 1
+    self._cache.move_to_end(key)
+    results, tmpframe = cached
+    del datastack[len(datastack) - sig.args:]
+    datastack.extend(_new_value(type, value) for type, value in results)
+    if tmpframe is _KEEP_FRAME:
+      pass
+    elif tmpframe is None:
+      interpreter._tmpframe = None
+    else:
+      interpreter._tmpframe = {name: _new_value(type, value)
+                               for name, type, value in tmpframe}
+    return True
+
+  ## Handle return from subroutine.
+  #  @details Is called before position is popped from call stack.
+  #           Result of memoized call is stored to cache.
+  #  @param interpreter Interpreter doing the return.
+  def leave(self, interpreter):
+    if not self._pending or self._pending[-1][0] != len(interpreter._callstack) - 1:
+      return
+
+    _, key, sig, base, frames, entry_tmpframe = self._pending.pop()
+    datastack = interpreter._datastack
+    if len(datastack) != base + sig.results or len(interpreter._locframes) != frames:
+      self._disabled.add(key[0])
+      return
+
+    results = tuple((value.type, value.value) for value in datastack[base:])
+    if interpreter._tmpframe is entry_tmpframe and not sig.uses_tf:
+      # caller's temporary frame was not touched (it can be pushed
+      # and changed as local frame only if it is used, see _analyze)
+      tmpframe = _KEEP_FRAME
+    else:
+      tmpframe = _frame_key(interpreter._tmpframe)
+    self._cache[key] = (results, tmpframe)
+    if len(self._cache) > self._maxsize:
+      self._cache.popitem(last = False)
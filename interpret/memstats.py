@@ -0,0 +1,99 @@
+## @package memstats
+#  Memory accounting of interpreted program.
+#
+#  Tracks number of live variables in frames, depths of stacks
+#  and bytes held in string values, each with the order
+#  of instruction at which its peak occurred.
+
+import sys
+import tracemalloc
+
+## Memory statistics of interpretation.
+#
+#  Updated after instructions by Interpreter.execute_mem_stats,
+#  normal execution does not use it.
+class MemoryStats:
+  ## Memory statistics constructor.
+  #  @param interval         Full scan (variables, strings) is done
+  #                          after every interval-th instruction.
+  #  @param use_tracemalloc  Whether to track Python allocations too.
+  def __init__(self, interval = 1, use_tracemalloc = False):
+    self._interval = interval               ## Instructions between scans.
+    self._use_tracemalloc = use_tracemalloc ## Whether tracemalloc is used.
+    self._until_scan = 0                    ## Instructions until next scan.
+    self.executed = 0                       ## Number of run instructions.
+    self.peaks = {}                         ## Peak value and its order by name.
+    self.snapshot = None                    ## tracemalloc snapshot at the end.
+
+  ## Record value and remember order if it is new peak.
+  #  @param name  Name of tracked quantity.
+  #  @param value Current value.
+  #  @param order Order of run instruction.
+  def _record(self, name, value, order):
+    peak = self.peaks.get(name)
+    if peak is None or value > peak[0]:
+      self.peaks[name] = (value, order)
+
+  ## Start tracking.
+  def start(self):
+    if self._use_tracemalloc:
+      tracemalloc.start()
+
+  ## Stop tracking.
+  def stop(self):
+    if self._use_tracemalloc and tracemalloc.is_tracing():
+      self.snapshot = tracemalloc.take_snapshot()
+      tracemalloc.stop()
+
+  ## Update statistics after instruction was run.
+  #  @param interpreter Interpreter running the instruction.
+  #  @param instr       Run instruction.
+  def update(self, interpreter, instr):
+    self.executed += 1
+    order = instr.order
+    self._record("locframes_depth", len(interpreter._locframes), order)
+    self._record("callstack_depth", len(interpreter._callstack), order)
+    self._record("datastack_depth", len(interpreter._datastack), order)
+
+    self._until_scan -= 1
+    if self._until_scan > 0:
+      return
+    self._until_scan = self._interval
+    self._scan(interpreter, order)
+
+  ## Count variables and string bytes of all frames and data stack.
+  #  @param interpreter Interpreter to scan.
+  #  @param order       Order of run instruction.
+  def _scan(self, interpreter, order):
+    frames = {"GF": [interpreter._globframe],
+              "LF": interpreter._locframes,
+              "TF": [interpreter._tmpframe] if interpreter._tmpframe is not None else []}
+    strings = {}
+    for frame_name, frame_list in frames.items():
+      var_count = 0
+      for frame in frame_list:
+        var_count += len(frame)
+        for var in frame.values():
+          if var.type == "string":
+            strings[id(var.value)] = var.value
+      self._record(f"{frame_name}_vars", var_count, order)
+    for value in interpreter._datastack:
+      if value.type == "string":
+        strings[id(value.value)] = value.value
+
+    self._record("string_bytes",
+                 sum(sys.getsizeof(string) for string in strings.values()), order)
+    if self._use_tracemalloc:
+      self._record("traced_bytes", tracemalloc.get_traced_memory()[0], order)
+
+  ## Write report of statistics.
+  #  @param out_file File to write to.
+  def write(self, out_file):
+    out_file.write(f"Instructions executed: {self.executed}\n")
+    out_file.write("Peaks (value at order):\n")
+    for name, (value, order) in sorted(self.peaks.items()):
+      out_file.write(f"  {name}: {value} at {order}\n")
+    if self.snapshot is not None:
+      out_file.write("Top allocations:\n")
+      for stat in self.snapshot.statistics("lineno")[:10]:
+        out_file.write(f"  {stat}\n")
@@ -0,0 +1,169 @@
+## @package metrics
+#  Interpreter metrics in Prometheus text exposition format.
+#
+#  Metrics are written to file periodically during execution
+#  and at exit. File is replaced atomically, so it can be read
+#  by textfile collector of node exporter at any time.
+
+import utils.error as error
+
+import os
+import time
+
+## Number of instructions between updates of metrics.
+BATCH = 10000
+
+## Description and type of exported metrics.
+METRICS = {
+  "ippcode_instructions_executed_total": ("Number of executed instructions.", "counter"),
+  "ippcode_instructions_per_second":     ("Average execution speed.", "gauge"),
+  "ippcode_load_seconds":                ("Time of loading program including parsing.", "gauge"),
+  "ippcode_parse_seconds":               ("Time of parsing source code.", "gauge"),
+  "ippcode_execution_seconds":           ("Time of execution.", "gauge"),
+  "ippcode_datastack_depth":             ("Depth of data stack.", "gauge"),
+  "ippcode_datastack_depth_max":         ("Maximal observed depth of data stack.", "gauge"),
+  "ippcode_callstack_depth":             ("Depth of call stack.", "gauge"),
+  "ippcode_callstack_depth_max":         ("Maximal observed depth of call stack.", "gauge"),
+  "ippcode_locframes_depth":             ("Depth of local frame stack.", "gauge"),
+  "ippcode_locframes_depth_max":         ("Maximal observed depth of local frame stack.", "gauge"),
+  "ippcode_output_bytes_total":          ("Number of bytes written to standard output.", "counter"),
+  "ippcode_reads_total":                 ("Number of read input lines.", "counter"),
+  "ippcode_exit_code":                   ("Exit code of the program (-1 while running).", "gauge"),
+}
+
+## Standard output counting written bytes.
+class CountingOutput:
+  ## Counting output constructor.
+  #  @param stream Stream to which output is written.
+  def __init__(self, stream):
+    self.stream = stream ## Original standard output.
+    self.bytes = 0       ## Number of written bytes.
+
+  ## Write text and count its bytes.
+  #  @param text Text to write.
+  def write(self, text):
+    self.bytes += len(text.encode())
+    self.stream.write(text)
+
+  ## Flush standard output.
+  def flush(self):
+    self.stream.flush()
+
+## Input stream counting read lines.
+class CountingInput:
+  ## Counting input constructor.
+  #  @param stream Stream from which input is read.
+  def __init__(self, stream):
+    self.stream = stream ## Original input stream.
+    self.lines = 0       ## Number of read lines.
+
+  ## Read line and count it.
+  #  @return Read line.
+  def readline(self):
+    self.lines += 1
+    return self.stream.readline()
+
+## Metrics of interpretation.
+#
+#  Updated by Interpreter.execute_metrics after each batch
+#  of instructions (or by hook when other hooks are registered).
+class Metrics:
+  ## Metrics constructor.
+  #  @param path     Path of metrics file.
+  #  @param interval Seconds between writes of metrics file.
+  #  @param batch    Number of instructions between updates.
+  def __init__(self, path, interval = 10.0, batch = BATCH):
+    self._path = path          ## Path of metrics file.
+    self._interval = interval  ## Seconds between writes.
+    self.batch = batch         ## Instructions between updates.
+    self._next_write = None    ## Time of next write.
+    self._start = None         ## Start time of execution.
+    self._pending = 0          ## Instructions counted by hook since last update.
+    self.output = None         ## CountingOutput of standard output.
+    self.input = None          ## CountingInput of READ instruction.
+    self.values = dict.fromkeys(METRICS, 0) ## Current values by name.
+    self.values["ippcode_exit_code"] = -1
+
+  ## Record time of loading.
+  #  @param parse_time Time of parsing source code.
+  #  @param load_time  Time of whole loading.
+  def loaded(self, parse_time, load_time):
+    self.values["ippcode_parse_seconds"] = parse_time
+    self.values["ippcode_load_seconds"] = load_time
+
+  ## Start execution.
+  #  @details Standard output and input stream are wrapped
+  #           to count written bytes and read lines.
+  #  @param output_stream Standard output.
+  #  @param input_stream  Input stream of READ instruction.
+  #  @return Tuple of wrapped output and input stream.
+  def start(self, output_stream, input_stream):
+    self._start = time.monotonic()
+    self._next_write = self._start + self._interval
+    self.output = CountingOutput(output_stream)
+    self.input = CountingInput(input_stream)
+    return self.output, self.input
+
+  ## Update metrics after batch of instructions.
+  #  @param interpreter Interpreter running the program.
+  #  @param executed    Number of instructions run since last update.
+  def update(self, interpreter, executed):
+    values = self.values
+    values["ippcode_instructions_executed_total"] += executed
+    for name, stack in (("datastack", interpreter._datastack),
+                        ("callstack", interpreter._callstack),
+                        ("locframes", interpreter._locframes)):
+      values[f"ippcode_{name}_depth"] = len(stack)
+      values[f"ippcode_{name}_depth_max"] = max(values[f"ippcode_{name}_depth_max"], len(stack))
+
+    now = time.monotonic()
+    if now >= self._next_write:
+      self._next_write = now + self._interval
+      self.write(now)
+
+  ## Count instruction (used as hook).
+  #  @param instr       Instruction to be run.
+  #  @param order       Order of instruction.
+  #  @param interpreter Interpreter running the instruction.
+  def __call__(self, instr, order, interpreter):
+    self._pending += 1
+    if self._pending >= self.batch:
+      self.update(interpreter, self._pending)
+      self._pending = 0
+
+  ## Register hook on interpreter.
+  #  @param interpreter Interpreter to register on.
+  def register(self, interpreter):
+    interpreter.add_hook("instruction", self)
+
+  ## Finish execution and write metrics.
+  #  @param interpreter Interpreter running the program.
+  #  @param code        Exit code of the program.
+  def finish(self, interpreter, code):
+    if self._pending:
+      self.update(interpreter, self._pending)
+      self._pending = 0
+    self.values["ippcode_exit_code"] = code
+    self.write(time.monotonic())
+
+  ## Write metrics file.
+  #  @details Exits if file cannot be written.
+  #  @param now Current monotonic time.
+  def write(self, now):
+    values = self.values
+    elapsed = now - self._start
+    values["ippcode_execution_seconds"] = elapsed
+    if elapsed > 0:
+      values["ippcode_instructions_per_second"] = \
+        values["ippcode_instructions_executed_total"] / elapsed
+    values["ippcode_output_bytes_total"] = self.output.bytes
+    values["ippcode_reads_total"] = self.input.lines
+
+    tmp_path = f"{self._path}.tmp"
+    try:
+      with open(tmp_path, "w") as metrics_file:
+        for name, (help, type) in METRICS.items():
+          metrics_file.write(f"# HELP {name} {help}\n# TYPE {name} {type}\n{name} {values[name]}\n")
+      os.replace(tmp_path, self._path)
+    except EnvironmentError as e:
+      error.error_exit(error.FILE_ERROR, f"Cannot access file {e.filename}")
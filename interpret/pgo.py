@@ -0,0 +1,370 @@
+## @package pgo
+#  Profile-guided specialization of instructions.
+#
+#  Profile of a run (execution counts, observed operand types,
+#  branch bias of conditional jumps and call counts of labels) is
+#  stored in profile directory under hash of the program. When program
+#  is loaded with a profile, hot instructions whose operands had single
+#  type are given specialized do method, which reads operands directly
+#  from frames and falls back to the original method when its guard
+#  (existing variables, expected types) does not hold.
+
+from interpret.factory import InstrFactory
+from interpret.instruction import *
+import utils.error as error
+
+import hashlib
+import json
+import operator
+import os
+
+## Minimal execution count of specialized instruction.
+HOT_COUNT = 100
+
+## Conditional jumps with recorded branch bias.
+CONDITIONAL_JUMPS = (JumpIfEqInstr, JumpIfNeqInstr, JumpIfEqStackInstr, JumpIfNotEqStackInstr)
+
+## Hash of the program.
+#  @details Hash does not depend on instruction orders, so the same
+#           program in XML and text representation has the same hash.
+#  @param instr_list Sorted instructions of the program.
+#  @return Hexadecimal digest.
+def program_hash(instr_list):
+  digest = hashlib.sha256()
+  for instr in instr_list:
+    args = [(arg.type, arg.frame, arg.value) for arg in (instr.arg1, instr.arg2, instr.arg3)
+            if arg is not None]
+    digest.update(f"{InstrFactory.get_opcode(instr)} {args!r}\n".encode())
+  return digest.hexdigest()
+
+## Runtime profile of the program.
+#
+#  Instructions are identified by their position in sorted
+#  instruction list.
+class Profile:
+  ## Profile constructor.
+  #  @param size Number of instructions of the program.
+  def __init__(self, size):
+    self.counts = [0] * size ## Execution counts by position.
+    self.types = {}          ## Observed types of arguments by position.
+    self.taken = {}          ## Taken conditional jumps by position.
+    self.calls = {}          ## Call counts by label.
+
+  ## Record observed type of argument.
+  #  @param pos  Position of instruction.
+  #  @param idx  Index of argument (0 to 2).
+  #  @param type Observed type.
+  def add_type(self, pos, idx, type):
+    types = self.types.get(pos)
+    if types is None:
+      types = self.types[pos] = (set(), set(), set())
+    types[idx].add(type)
+
+  ## Return single observed type of argument.
+  #  @param pos Position of instruction.
+  #  @param idx Index of argument (0 to 2).
+  #  @return Type or None if argument had none or several types.
+  def single_type(self, pos, idx):
+    types = self.types.get(pos)
+    if types is None or len(types[idx]) != 1:
+      return None
+    return next(iter(types[idx]))
+
+  ## Return branch bias of conditional jump.
+  #  @param pos Position of instruction.
+  #  @return Fraction of taken jumps or None if jump was not run.
+  def bias(self, pos):
+    if not self.counts[pos]:
+      return None
+    return self.taken.get(pos, 0) / self.counts[pos]
+
+  ## Add another profile of the same program.
+  #  @param other Profile to add.
+  def merge(self, other):
+    self.counts = [count + other_count for count, other_count in zip(self.counts, other.counts)]
+    for pos, types in other.types.items():
+      for idx in range(3):
+        for type in types[idx]:
+          self.add_type(pos, idx, type)
+    for pos, taken in other.taken.items():
+      self.taken[pos] = self.taken.get(pos, 0) + taken
+    for label, calls in other.calls.items():
+      self.calls[label] = self.calls.get(label, 0) + calls
+
+  ## Convert profile to JSON object.
+  #  @return Dictionary.
+  def to_json(self):
+    return {
+      "counts": self.counts,
+      "types":  {pos: ["|".join(sorted(arg_types)) for arg_types in types]
+                 for pos, types in self.types.items()},
+      "taken":  self.taken,
+      "calls":  self.calls,
+    }
+
+  ## Create profile from JSON object.
+  #  @param data Dictionary made by to_json method.
+  #  @return Profile.
+  @classmethod
+  def from_json(cls, data):
+    profile = cls(0)
+    profile.counts = data["counts"]
+    profile.types = {int(pos): tuple(set(arg_types.split("|")) if arg_types else set()
+                                     for arg_types in types)
+                     for pos, types in data["types"].items()}
+    profile.taken = {int(pos): taken for pos, taken in data["taken"].items()}
+    profile.calls = data["calls"]
+    return profile
+
+## Path of profile of the program in profile directory.
+#  @param directory Profile directory.
+#  @param digest    Hash of the program.
+#  @return Path of profile file.
+def profile_path(directory, digest):
+  return os.path.join(directory, f"{digest}.json")
+
+## Load profile of the program.
+#  @details Exits if profile exists but cannot be read.
+#  @param directory Profile directory.
+#  @param digest    Hash of the program.
+#  @param size      Number of instructions of the program.
+#  @return Profile or None if there is no profile of the program.
+def load_profile(directory, digest, size):
+  path = profile_path(directory, digest)
+  if not os.path.isfile(path):
+    return None
+  try:
+    with open(path) as profile_file:
+      profile = Profile.from_json(json.load(profile_file))
+  except EnvironmentError as e:
+    error.error_exit(error.FILE_ERROR, f"Cannot access file {e.filename}")
+  except (ValueError, KeyError, AttributeError):
+    error.error_exit(error.FILE_ERROR, f"Invalid profile {path}")
+  if len(profile.counts) != size:
+    error.error_exit(error.FILE_ERROR, f"Invalid profile {path}")
+  return profile
+
+## Save profile of the program.
+#  @details Profile is merged with already stored one.
+#           Exits if profile cannot be written.
+#  @param directory Profile directory.
+#  @param digest    Hash of the program.
+#  @param profile   Profile to save.
+def save_profile(directory, digest, profile):
+  stored = load_profile(directory, digest, len(profile.counts))
+  if stored is not None:
+    stored.merge(profile)
+    profile = stored
+  try:
+    os.makedirs(directory, exist_ok=True)
+    with open(profile_path(directory, digest), "w") as profile_file:
+      json.dump(profile.to_json(), profile_file, separators=(",", ":"))
+  except EnvironmentError as e:
+    error.error_exit(error.FILE_ERROR, f"Cannot access file {e.filename}")
+
+## Hook collecting runtime profile.
+class ProfileHook:
+  ## Profile hook constructor.
+  #  @param size Number of instructions of the program.
+  def __init__(self, size):
+    self.profile = Profile(size) ## Collected profile.
+    self._pos = None             ## Position of last run instruction.
+
+  ## Count instruction and record types of its variables.
+  #  @param instr       Instruction to be run.
+  #  @param order       Order of instruction.
+  #  @param interpreter Interpreter running the instruction.
+  def __call__(self, instr, order, interpreter):
+    pos = self._pos = interpreter._counter
+    self.profile.counts[pos] += 1
+    for idx, arg in enumerate((instr.arg1, instr.arg2, instr.arg3)):
+      if arg is not None and arg.type == "var":
+        type = interpreter.peek_type(arg)
+        if type is not None:
+          self.profile.add_type(pos, idx, type)
+
+  ## Count taken conditional jump.
+  #  @param instr       Run instruction.
+  #  @param order       Order of instruction.
+  #  @param interpreter Interpreter running the instruction.
+  def _on_jump(self, instr, order, interpreter):
+    if isinstance(instr, CONDITIONAL_JUMPS):
+      self.profile.taken[self._pos] = self.profile.taken.get(self._pos, 0) + 1
+
+  ## Count call of label.
+  #  @param instr       Run instruction.
+  #  @param order       Order of instruction.
+  #  @param interpreter Interpreter running the instruction.
+  def _on_call(self, instr, order, interpreter):
+    label = instr.arg1.value
+    self.profile.calls[label] = self.profile.calls.get(label, 0) + 1
+
+  ## Register hook on interpreter.
+  #  @param interpreter Interpreter to register on.
+  def register(self, interpreter):
+    interpreter.add_hook("instruction", self)
+    interpreter.add_hook("jump", self._on_jump)
+    interpreter.add_hook("call", self._on_call)
+
+## Create function returning variable or constant of argument.
+#  @details Returned function raises LookupError or TypeError
+#           if frame or variable does not exist.
+#  @param arg Argument.
+#  @return Function taking interpreter.
+def _getter(arg):
+  name = arg.value
+  if arg.type != "var":
+    return lambda interpreter: arg
+  elif arg.frame == "GF":
+    return lambda interpreter: interpreter._globframe[name]
+  elif arg.frame == "LF":
+    return lambda interpreter: interpreter._locframes[-1][name]
+  elif arg.frame == "RF":
+    return lambda interpreter: interpreter._regframe[name]
+  return lambda interpreter: interpreter._tmpframe[name]
+
+## Type of argument known at load time or observed in profile.
+#  @param instr   Instruction.
+#  @param pos     Position of instruction.
+#  @param idx     Index of argument (0 to 2).
+#  @param profile Profile of the program.
+#  @return Type or None if it is not single.
+def _arg_type(instr, pos, idx, profile):
+  arg = (instr.arg1, instr.arg2, instr.arg3)[idx]
+  if arg.type != "var":
+    return arg.type
+  return profile.single_type(pos, idx)
+
+## Specialize instruction with two integer operands and result.
+#  @param instr   Instruction (ADD, SUB, MUL, IDIV, LT, GT, EQ).
+#  @param op      Operation on values.
+#  @param type    Type of result.
+#  @return Specialized do method.
+def _binary_do(instr, op, type):
+  generic = instr.do
+  get_var = _getter(instr.arg1)
+  get_symb1 = _getter(instr.arg2)
+  get_symb2 = _getter(instr.arg3)
+
+  def do():
+    interpreter = Instruction._interpreter
+    try:
+      symb1 = get_symb1(interpreter)
+      symb2 = get_symb2(interpreter)
+      var = get_var(interpreter)
+    except (LookupError, TypeError):
+      return generic()
+    if symb1.type != "int" or symb2.type != "int":
+      return generic()
+    try:
+      var.value = op(symb1.value, symb2.value)
+    except ZeroDivisionError:
+      return generic()
+    var.type = type
+  return do
+
+## Specialize MOVE instruction.
+#  @param instr MOVE instruction.
+#  @return Specialized do method.
+def _move_do(instr):
+  generic = instr.do
+  get_var = _getter(instr.arg1)
+  get_symb = _getter(instr.arg2)
+
+  def do():
+    interpreter = Instruction._interpreter
+    try:
+      symb = get_symb(interpreter)
+      var = get_var(interpreter)
+    except (LookupError, TypeError):
+      return generic()
+    if symb.type is None:
+      return generic()
+    var.value = symb.value
+    var.type = symb.type
+  return do
+
+## Specialize JUMPIFEQ and JUMPIFNEQ instruction.
+#  @param instr  Conditional jump instruction.
+#  @param pos    Position of target label.
+#  @param equal  Whether jump is taken on equal operands.
+#  @return Specialized do method.
+def _cond_jump_do(instr, pos, equal):
+  generic = instr.do
+  get_symb1 = _getter(instr.arg2)
+  get_symb2 = _getter(instr.arg3)
+
+  def do():
+    interpreter = Instruction._interpreter
+    try:
+      symb1 = get_symb1(interpreter)
+      symb2 = get_symb2(interpreter)
+    except (LookupError, TypeError):
+      return generic()
+    if symb1.type != symb2.type or symb1.type is None:
+      return generic()
+    if (symb1.value == symb2.value) == equal:
+      interpreter.jump(pos)
+  return do
+
+## Specialize JUMP and CALL instruction with resolved label.
+#  @param pos  Position of target label.
+#  @param call Whether instruction is CALL.
+#  @return Specialized do method.
+def _transfer_do(pos, call):
+  if call:
+    return lambda: Instruction._interpreter.call(pos)
+  return lambda: Instruction._interpreter.jump(pos)
+
+## Binary instructions and their operation and type of result.
+_BINARY_OPS = {
+  AddInstr:         (operator.add,      "int"),
+  SubInstr:         (operator.sub,      "int"),
+  MulInstr:         (operator.mul,      "int"),
+  IdivInstr:        (operator.floordiv, "int"),
+  LesserThanInstr:  (operator.lt,       "bool"),
+  GreaterThanInstr: (operator.gt,       "bool"),
+  EqualsInstr:      (operator.eq,       "bool"),
+}
+
+## Create specialized do method of instruction.
+#  @param instr   Instruction.
+#  @param pos     Position of instruction.
+#  @param profile Profile of the program.
+#  @param labels  Labels and their position in code.
+#  @return Specialized do method or None.
+def _specialized_do(instr, pos, profile, labels):
+  instr_type = type(instr)
+  if instr_type in _BINARY_OPS:
+    if _arg_type(instr, pos, 1, profile) == "int" and _arg_type(instr, pos, 2, profile) == "int":
+      return _binary_do(instr, *_BINARY_OPS[instr_type])
+  elif instr_type is MoveInstr:
+    if _arg_type(instr, pos, 1, profile) is not None:
+      return _move_do(instr)
+  elif instr_type in (JumpIfEqInstr, JumpIfNeqInstr):
+    type1 = _arg_type(instr, pos, 1, profile)
+    if instr.arg1.value in labels and type1 not in (None, "nil") \
+       and type1 == _arg_type(instr, pos, 2, profile):
+      return _cond_jump_do(instr, labels[instr.arg1.value], instr_type is JumpIfEqInstr)
+  elif instr_type in (JumpInstr, CallInstr):
+    if instr.arg1.value in labels and \
+       (instr_type is JumpInstr or profile.calls.get(instr.arg1.value, 0) >= HOT_COUNT):
+      return _transfer_do(labels[instr.arg1.value], instr_type is CallInstr)
+  return None
+
+## Specialize hot instructions by profile.
+#  @details Labels must be found before.
+#  @param interpreter Interpreter with loaded instructions.
+#  @param profile     Profile of the program.
+#  @param hot_count   Minimal execution count of specialized instruction.
+#  @return Number of specialized instructions.
+def specialize(interpreter, profile, hot_count = HOT_COUNT):
+  specialized = 0
+  for pos, instr in enumerate(interpreter._instr_list):
+    if profile.counts[pos] < hot_count:
+      continue
+    do = _specialized_do(instr, pos, profile, interpreter._labels)
+    if do is not None:
+      instr.do = do
+      specialized += 1
+  return specialized
@@ -0,0 +1,217 @@
+## @package record
+#  Recording and replay of program input and output.
+#
+#  Recording directory contains copy of source code (source.xml,
+#  source.txt or source.store by source format), input lines consumed
+#  by READ instructions (input), written output (output) and log of I/O
+#  events (log). Each line of log is kind of event (R for read line,
+#  W for output chunk, X for end of program), number of instructions
+#  run before the event and length of line / chunk or exit code.
+
+import utils.error as error
+
+import os
+import shutil
+
+## Names of files in recording directory.
+INPUT_FILE = "input"
+OUTPUT_FILE = "output"
+LOG_FILE = "log"
+SOURCE_FILES = {"xml": "source.xml", "text": "source.txt", "store": "source.store"}
+
+## Base of recorder and replayer.
+#
+#  Registered as hook, counts run instructions. Object is used
+#  as input stream of READ instruction and as standard output.
+class IOHook:
+  ## I/O hook constructor.
+  #  @param output_stream Stream to which output is written.
+  def __init__(self, output_stream):
+    self.output_stream = output_stream ## Original standard output.
+    self.count = 0                     ## Number of run instructions.
+
+  ## Count run instruction.
+  #  @param instr       Instruction to be run.
+  #  @param order       Order of instruction.
+  #  @param interpreter Interpreter running the instruction.
+  def __call__(self, instr, order, interpreter):
+    self.count += 1
+
+  ## Register hooks on interpreter.
+  #  @param interpreter Interpreter to register on.
+  def register(self, interpreter):
+    interpreter.add_hook("instruction", self)
+    interpreter.add_hook("exit", self._on_exit)
+    interpreter.add_hook("error", self._on_exit)
+
+  ## Handle end of program.
+  #  @param instr       Instruction which ended program (or None).
+  #  @param order       Order of instruction (or None).
+  #  @param interpreter Interpreter running the program.
+  #  @param code        Exit code.
+  def _on_exit(self, instr, order, interpreter, code):
+    self.finish(code)
+
+  ## Flush standard output.
+  def flush(self):
+    self.output_stream.flush()
+
+## Recorder of program I/O.
+class IORecorder(IOHook):
+  ## I/O recorder constructor.
+  #  @param input_stream  Stream from which input is read.
+  #  @param output_stream Stream to which output is written.
+  def __init__(self, input_stream, output_stream):
+    super().__init__(output_stream)
+    self._input_stream = input_stream ## Original input stream.
+    self._input = []                  ## Consumed input lines.
+    self._output = []                 ## Output chunks.
+    self._log = []                    ## I/O events as (kind, count, number).
+
+  ## Read line of input and record it.
+  #  @return Read line.
+  def readline(self):
+    line = self._input_stream.readline()
+    self._input.append(line)
+    self._log.append(("R", self.count, len(line)))
+    return line
+
+  ## Write output chunk and record it.
+  #  @param text Output chunk.
+  def write(self, text):
+    if text:
+      self.output_stream.write(text)
+      self._output.append(text)
+      self._log.append(("W", self.count, len(text)))
+
+  ## Record end of program.
+  #  @param code Exit code.
+  def finish(self, code):
+    self._log.append(("X", self.count, code))
+
+  ## Save recording to directory.
+  #  @details Exits if directory cannot be written.
+  #  @param directory     Path of recording directory.
+  #  @param source        Path of source code.
+  #  @param source_format Format of source code.
+  def save(self, directory, source, source_format):
+    try:
+      os.makedirs(directory, exist_ok=True)
+      shutil.copyfile(source, os.path.join(directory, SOURCE_FILES[source_format]))
+      with open(os.path.join(directory, INPUT_FILE), "w", newline="") as input_file:
+        input_file.write("".join(self._input))
+      with open(os.path.join(directory, OUTPUT_FILE), "w", newline="") as output_file:
+        output_file.write("".join(self._output))
+      with open(os.path.join(directory, LOG_FILE), "w") as log_file:
+        for kind, count, number in self._log:
+          log_file.write(f"{kind} {count} {number}\n")
+    except EnvironmentError as e:
+      error.error_exit(error.FILE_ERROR, f"Cannot access file {e.filename}")
+
+## Replayer of recorded program I/O.
+#
+#  READ instructions get recorded input, output is compared
+#  with recorded one. Difference in input, output or exit code
+#  is mismatch, difference in instruction counts is only reported.
+class IOReplayer(IOHook):
+  ## I/O replayer constructor.
+  #  @details Exits if recording cannot be read.
+  #  @param directory     Path of recording directory.
+  #  @param output_stream Stream to which output is written.
+  def __init__(self, directory, output_stream):
+    super().__init__(output_stream)
+    self._reads = []       ## Recorded input lines with instruction counts.
+    self._writes = []      ## Recorded output chunks with instruction counts.
+    self._end = None       ## Recorded exit code with instruction count.
+    self.mismatch = None   ## Description of first mismatch.
+    self.count_diff = None ## Description of first instruction count difference.
+    self._load(directory)
+
+  ## Load recording.
+  #  @param directory Path of recording directory.
+  def _load(self, directory):
+    try:
+      with open(os.path.join(directory, INPUT_FILE), newline="") as input_file:
+        input_text = input_file.read()
+      with open(os.path.join(directory, OUTPUT_FILE), newline="") as output_file:
+        output_text = output_file.read()
+      with open(os.path.join(directory, LOG_FILE)) as log_file:
+        log = [line.split() for line in log_file]
+    except EnvironmentError as e:
+      error.error_exit(error.FILE_ERROR, f"Cannot access file {e.filename}")
+
+    input_pos = output_pos = 0
+    for kind, count, number in log:
+      count = int(count)
+      number = int(number)
+      if kind == "R":
+        self._reads.append((count, input_text[input_pos:input_pos + number]))
+        input_pos += number
+      elif kind == "W":
+        self._writes.append((count, output_text[output_pos:output_pos + number]))
+        output_pos += number
+      else:
+        self._end = (count, number)
+    self._reads.reverse()
+    self._writes.reverse()
+
+  ## Remember first mismatch.
+  #  @param message Description of mismatch.
+  def _mismatch(self, message):
+    if self.mismatch is None:
+      self.mismatch = f"{message} (instruction {self.count})"
+
+  ## Compare instruction count of event with recorded one.
+  #  @param event Name of event.
+  #  @param count Recorded instruction count.
+  def _check_count(self, event, count):
+    if count != self.count and self.count_diff is None:
+      self.count_diff = f"{event} after {self.count} instructions, recorded after {count}"
+
+  ## Return recorded input line.
+  #  @return Recorded line or empty string if no more input was recorded.
+  def readline(self):
+    if not self._reads:
+      self._mismatch("READ of input that was not recorded")
+      return ""
+    count, line = self._reads.pop()
+    self._check_count("READ", count)
+    return line
+
+  ## Write output chunk and compare it with recorded one.
+  #  @param text Output chunk.
+  def write(self, text):
+    if not text:
+      return
+    self.output_stream.write(text)
+    if not self._writes:
+      self._mismatch("Output that was not recorded")
+      return
+    count, chunk = self._writes.pop()
+    self._check_count("Output", count)
+    if chunk != text:
+      self._mismatch(f"Output {text!r} differs from recorded {chunk!r}")
+
+  ## Compare end of program with recorded one.
+  #  @param code Exit code.
+  def finish(self, code):
+    if self._reads:
+      self._mismatch("Recorded input was not read")
+    if self._writes:
+      self._mismatch("Recorded output was not written")
+    if self._end is not None:
+      count, recorded_code = self._end
+      self._check_count("End", count)
+      if recorded_code != code:
+        self._mismatch(f"Exit code {code} differs from recorded {recorded_code}")
+
+## Find source code in recording directory.
+#  @details Exits if there is no source code.
+#  @param directory Path of recording directory.
+#  @return Tuple of path and format of source code.
+def find_source(directory):
+  for source_format, name in SOURCE_FILES.items():
+    path = os.path.join(directory, name)
+    if os.path.isfile(path):
+      return path, source_format
+  error.error_exit(error.FILE_ERROR, f"No source code in recording {directory}")
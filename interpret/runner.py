@@ -0,0 +1,69 @@
+## @package runner
+#  Run loaded program in current process.
+
+from interpret.core import Interpreter
+from interpret.instruction import Instruction
+from parse.parse_text import parse_text
+from parse.parse_xml import parse_xml
+import utils.error as error
+
+import contextlib
+import io
+import xml.etree.ElementTree as ET
+
+## Run program with given input and collect its output.
+#  @details Errors and EXIT instruction do not exit the process,
+#           their code is returned. Interpreter of instructions
+#           is restored afterwards.
+#  @param instr_list Sorted list of instructions.
+#  @param input_text Text of standard input.
+#  @param registers  Number of registers used by lowered instructions.
+#  @return Tuple of standard output, standard error output and exit code.
+def run_program(instr_list, input_text, registers = 0):
+  interpreter = Interpreter()
+  interpreter.set_registers(registers)
+  for instr in instr_list:
+    interpreter.append_instr(instr)
+  interpreter.input_stream = io.StringIO(input_text)
+  stdout = io.StringIO()
+  stderr = io.StringIO()
+  prev_interpreter = Instruction._interpreter
+  Instruction.switch_interpreter(interpreter)
+  exit_code = 0
+  try:
+    with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+      interpreter.find_labels()
+      interpreter.execute()
+  except SystemExit as e:
+    exit_code = e.code if e.code is not None else 0
+  finally:
+    Instruction.switch_interpreter(prev_interpreter)
+  return (stdout.getvalue(), stderr.getvalue(), exit_code)
+
+## Load program from file and run it with given input.
+#  @details Errors of loading are returned as errors of the run.
+#  @param source        Path of source code.
+#  @param input_text    Text of standard input.
+#  @param source_format Format of source code ("xml" or "text").
+#  @return Tuple of standard output, standard error output and exit code.
+def run_source(source, input_text, source_format = "xml"):
+  interpreter = Interpreter()
+  stderr = io.StringIO()
+  try:
+    with contextlib.redirect_stderr(stderr):
+      try:
+        if source_format == "text":
+          with open(source, "r") as src_file:
+            parse_text(src_file, interpreter)
+        else:
+          try:
+            root_node = ET.parse(source).getroot()
+          except ET.ParseError:
+            error.error_exit(error.XMLFORMAT_ERROR, "XML not well-formed")
+          parse_xml(root_node, interpreter)
+      except EnvironmentError as e:
+        error.error_exit(error.FILE_ERROR, f"Cannot access file {e.filename}")
+      interpreter.instr_sort()
+  except SystemExit as e:
+    return ("", stderr.getvalue(), e.code if e.code is not None else 0)
+  return run_program(interpreter._instr_list, input_text)
@@ -0,0 +1,64 @@
+## @package sampler
+#  Sampling profiler of interpreted program.
+#
+#  Timer signal periodically records instruction counter and
+#  call stack of interpreter. Samples are written in collapsed-stack
+#  format (one stack per line, frames separated by semicolons,
+#  followed by number of samples), which is accepted by flamegraph tools.
+
+from interpret.factory import InstrFactory
+
+from collections import Counter
+import signal
+
+## Sampling profiler.
+#
+#  Samples are recorded by SIGPROF handler, so cost of profiling
+#  depends only on sampling interval, not on number of instructions.
+class SamplingProfiler:
+  ## Sampling profiler constructor.
+  #  @param interpreter Interpreter to be sampled.
+  #  @param interval    Sampling interval in seconds (of CPU time).
+  def __init__(self, interpreter, interval = 0.001):
+    self._interpreter = interpreter ## Sampled interpreter.
+    self._interval = interval       ## Sampling interval.
+    self._samples = Counter()       ## Samples by call stack and counter.
+    self._prev_handler = None       ## Replaced signal handler.
+
+  ## Signal handler recording one sample.
+  def _sample(self, signum, frame):
+    interpreter = self._interpreter
+    self._samples[(tuple(interpreter._callstack), interpreter._counter)] += 1
+
+  ## Start sampling.
+  def start(self):
+    self._prev_handler = signal.signal(signal.SIGPROF, self._sample)
+    signal.setitimer(signal.ITIMER_PROF, self._interval, self._interval)
+
+  ## Stop sampling.
+  def stop(self):
+    signal.setitimer(signal.ITIMER_PROF, 0, 0)
+    signal.signal(signal.SIGPROF, self._prev_handler)
+
+  ## Return samples as collapsed stacks.
+  #  @details Stack starts with "main", followed by labels of CALL
+  #           targets and ends with order and opcode of sampled
+  #           instruction.
+  #  @return Counter of collapsed stack strings.
+  def collapsed(self):
+    instr_list = self._interpreter._instr_list
+    stacks = Counter()
+    for (callstack, counter), count in self._samples.items():
+      frames = ["main"]
+      frames += [instr_list[pos].arg1.value for pos in callstack]
+      if counter < len(instr_list):
+        instr = instr_list[counter]
+        frames.append(f"{instr.order}:{InstrFactory.get_opcode(instr)}")
+      stacks[";".join(frames)] += count
+    return stacks
+
+  ## Write collapsed stacks to file.
+  #  @param out_file File to write to.
+  def write(self, out_file):
+    for stack, count in sorted(self.collapsed().items()):
+      out_file.write(f"{stack} {count}\n")
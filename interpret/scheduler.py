@@ -0,0 +1,153 @@
+## @package scheduler
+#  Cooperative scheduler of several programs in one process.
+#
+#  Each program has its own interpreter and runs for a quantum
+#  of instructions, then another program is chosen. Program which
+#  would block on READ instruction is parked until input line
+#  is delivered by its asyncio stream.
+
+from interpret.instruction import Instruction
+
+import asyncio
+import contextlib
+import io
+
+## Raised by program input when line is not available yet.
+class InputBlocked(Exception):
+  pass
+
+## Input of scheduled program.
+#
+#  Has same interface as input stream of interpreter.
+#  Lines are delivered from asyncio stream by scheduler.
+class ProgramInput:
+  ## Program input constructor.
+  #  @param reader asyncio.StreamReader with input or None for empty input.
+  def __init__(self, reader):
+    self._reader = reader      ## Stream of input.
+    self._lines = []           ## Delivered lines not read yet.
+    self._eof = reader is None ## Whether stream was read to the end.
+    self._pending = None       ## Task reading next line.
+
+  ## Return next line of input.
+  #  @details Raises InputBlocked if line was not delivered yet.
+  #  @return Line or empty string at the end of input.
+  def readline(self):
+    if self._lines:
+      return self._lines.pop(0)
+    if self._eof:
+      return ""
+    raise InputBlocked()
+
+  ## Start reading of next line from stream.
+  #  @return Task reading the line.
+  def request_line(self):
+    if self._pending is None:
+      self._pending = asyncio.ensure_future(self._reader.readline())
+    return self._pending
+
+  ## Store line read by finished task.
+  def deliver(self):
+    line = self._pending.result()
+    self._pending = None
+    if line:
+      self._lines.append(line.decode())
+    else:
+      self._eof = True
+
+## Program run by scheduler.
+class Program:
+  ## Program constructor.
+  #  @param interpreter Interpreter with loaded instructions.
+  #  @param reader      asyncio.StreamReader with input or None.
+  #  @param priority    Priority of program, higher runs first.
+  def __init__(self, interpreter, reader, priority):
+    self.interpreter = interpreter     ## Interpreter of program.
+    self.input = ProgramInput(reader)  ## Input of program.
+    self.priority = priority           ## Priority of program.
+    self.stdout = io.StringIO()        ## Collected standard output.
+    self.stderr = io.StringIO()        ## Collected standard error output.
+    self.exit_code = None              ## Exit code, None while running.
+    self.blocked = False               ## Whether program waits for input.
+    self.last_run = 0                  ## Scheduler tick of last quantum.
+
+    interpreter.input_stream = self.input
+
+  ## Whether program finished.
+  #  @return True if program has exit code.
+  def finished(self):
+    return self.exit_code is not None
+
+## Cooperative scheduler of programs.
+class Scheduler:
+  ## Scheduler constructor.
+  #  @param quantum Number of instructions run at once.
+  #  @param policy  "round-robin" or "priority".
+  def __init__(self, quantum = 1000, policy = "round-robin"):
+    self.quantum = quantum ## Number of instructions run at once.
+    self.policy = policy   ## Scheduling policy.
+    self.programs = []     ## All programs.
+    self._tick = 0         ## Number of run quanta.
+
+  ## Add program to scheduler.
+  #  @param interpreter Interpreter with loaded instructions
+  #                     (sorted, with labels found).
+  #  @param reader      asyncio.StreamReader with input or None.
+  #  @param priority    Priority of program, higher runs first.
+  #  @return Program object.
+  def add(self, interpreter, reader = None, priority = 0):
+    program = Program(interpreter, reader, priority)
+    self.programs.append(program)
+    return program
+
+  ## Choose next program to run.
+  #  @param runnable List of programs which can run.
+  #  @return Chosen program.
+  def _choose(self, runnable):
+    if self.policy == "priority":
+      return min(runnable, key = lambda p: (-p.priority, p.last_run))
+    return min(runnable, key = lambda p: p.last_run)
+
+  ## Run quantum of instructions of program.
+  #  @details Output is collected in program, errors and EXIT
+  #           instruction finish the program.
+  #  @param program Program to run.
+  def _run_quantum(self, program):
+    self._tick += 1
+    program.last_run = self._tick
+    Instruction.switch_interpreter(program.interpreter)
+    with contextlib.redirect_stdout(program.stdout), \
+         contextlib.redirect_stderr(program.stderr):
+      try:
+        if program.interpreter.step(self.quantum):
+          program.exit_code = 0
+      except InputBlocked:
+        program.blocked = True
+      except SystemExit as e:
+        program.exit_code = e.code if e.code is not None else 0
+
+  ## Run all programs until they finish.
+  #  @return List of exit codes of programs.
+  async def run(self):
+    while True:
+      alive = [p for p in self.programs if not p.finished()]
+      if not alive:
+        break
+
+      runnable = [p for p in alive if not p.blocked]
+      if not runnable:
+        waiting = [p.input.request_line() for p in alive]
+        await asyncio.wait(waiting, return_when = asyncio.FIRST_COMPLETED)
+      else:
+        self._run_quantum(self._choose(runnable))
+        # let input streams be read
+        await asyncio.sleep(0)
+
+      for program in alive:
+        if program.blocked:
+          pending = program.input.request_line()
+          if pending.done():
+            program.input.deliver()
+            program.blocked = False
+
+    return [p.exit_code for p in self.programs]
@@ -0,0 +1,227 @@
+## @package spill
+#  Data stack spilling to disk.
+#
+#  Top of data stack is held in memory as list of values. When it grows
+#  over threshold, its bottom half is encoded to compact binary form
+#  and appended to memory-mapped temporary file as one segment. Segments
+#  are used as a stack too: when memory part gets empty, the last
+#  segment is decoded back and its space in file is reused.
+#
+#  Each value is encoded as type tag followed by payload: 64-bit
+#  integer, length and bytes of big integer or of UTF-8 string,
+#  no payload for bool and nil.
+
+from interpret.structs import Value
+
+import mmap
+import struct
+import tempfile
+
+## Initial size of spill file.
+INITIAL_FILE_SIZE = 1 << 20
+
+## Tags of encoded values.
+TAG_INT = b"i"[0]
+TAG_BIGINT = b"I"[0]
+TAG_STRING = b"s"[0]
+TAG_TRUE = b"t"[0]
+TAG_FALSE = b"f"[0]
+TAG_NIL = b"n"[0]
+
+## Encoded 64-bit integer.
+_INT = struct.Struct("<Bq")
+## Encoded length of big integer or string.
+_LENGTH = struct.Struct("<BI")
+
+## Encode values to bytes.
+#  @param values List of values.
+#  @return Encoded values.
+def encode_values(values):
+  data = bytearray()
+  for value in values:
+    if value.type == "int":
+      if -(1 << 63) <= value.value < (1 << 63):
+        data += _INT.pack(TAG_INT, value.value)
+      else:
+        payload = value.value.to_bytes((value.value.bit_length() + 8) // 8, "little", signed = True)
+        data += _LENGTH.pack(TAG_BIGINT, len(payload))
+        data += payload
+    elif value.type == "string":
+      payload = value.value.encode("utf-8", "surrogatepass")
+      data += _LENGTH.pack(TAG_STRING, len(payload))
+      data += payload
+    elif value.type == "bool":
+      data.append(TAG_TRUE if value.value else TAG_FALSE)
+    else:
+      data.append(TAG_NIL)
+  return data
+
+## Create value.
+#  @param type  Type of value.
+#  @param value Value.
+#  @return Value object.
+def _new_value(type, value):
+  result = Value()
+  result.type = type
+  result.value = value
+  return result
+
+## Decode values from bytes.
+#  @param data Encoded values.
+#  @return List of values.
+def decode_values(data):
+  values = []
+  pos = 0
+  end = len(data)
+  while pos < end:
+    tag = data[pos]
+    if tag == TAG_INT:
+      values.append(_new_value("int", _INT.unpack_from(data, pos)[1]))
+      pos += _INT.size
+    elif tag == TAG_BIGINT or tag == TAG_STRING:
+      length = _LENGTH.unpack_from(data, pos)[1]
+      pos += _LENGTH.size
+      payload = data[pos:pos + length]
+      pos += length
+      if tag == TAG_BIGINT:
+        values.append(_new_value("int", int.from_bytes(payload, "little", signed = True)))
+      else:
+        values.append(_new_value("string", payload.decode("utf-8", "surrogatepass")))
+    elif tag == TAG_NIL:
+      values.append(_new_value("nil", None))
+      pos += 1
+    else:
+      values.append(_new_value("bool", tag == TAG_TRUE))
+      pos += 1
+  return values
+
+## Data stack spilling its bottom part to disk.
+#
+#  Supports list operations used on data stack of interpreter
+#  (append, pop, extend, clear, length, iteration, indexing
+#  and deleting of top slice).
+class SpillingStack:
+  ## Spilling stack constructor.
+  #  @param threshold Maximal number of values held in memory.
+  def __init__(self, threshold):
+    self._threshold = threshold                ## Maximal number of values in memory.
+    self._segment = max(1, threshold // 2)     ## Number of values of one segment.
+    self._hot = []                             ## Values in memory (top of stack).
+    self._segments = []                        ## Spilled segments as (offset, size, count).
+    self._spilled = 0                          ## Number of spilled values.
+    self._file = None                          ## Temporary spill file.
+    self._map = None                           ## Memory map of spill file.
+    self.spills = 0                            ## Number of spilled segments (statistics).
+
+  ## Number of values.
+  def __len__(self):
+    return self._spilled + len(self._hot)
+
+  ## Whether stack is not empty.
+  def __bool__(self):
+    return bool(self._hot) or self._spilled > 0
+
+  ## Iterate values from bottom.
+  def __iter__(self):
+    for offset, size, _ in self._segments:
+      yield from decode_values(self._map[offset:offset + size])
+    yield from self._hot
+
+  ## Return value or list of values.
+  #  @details Slices reaching spilled values are decoded.
+  #  @param key Index or slice.
+  #  @return Value or list of values.
+  def __getitem__(self, key):
+    if isinstance(key, slice):
+      start, stop, step = key.indices(len(self))
+      if start >= self._spilled and step == 1:
+        return self._hot[start - self._spilled:stop - self._spilled]
+      return list(self)[key]
+    idx = key + len(self) if key < 0 else key
+    if not 0 <= idx < len(self):
+      raise IndexError("stack index out of range")
+    if idx >= self._spilled:
+      return self._hot[idx - self._spilled]
+    return list(self)[idx]
+
+  ## Delete top values.
+  #  @param key Slice up to the top of stack.
+  def __delitem__(self, key):
+    start, stop, step = key.indices(len(self))
+    if step != 1 or stop != len(self):
+      raise ValueError("only top of stack can be deleted")
+    while start < self._spilled:
+      self._unspill()
+    del self._hot[start - self._spilled:]
+
+  ## Push value.
+  #  @param value Value to push.
+  def append(self, value):
+    self._hot.append(value)
+    if len(self._hot) > self._threshold:
+      self._spill()
+
+  ## Push values.
+  #  @param values Iterable of values.
+  def extend(self, values):
+    for value in values:
+      self.append(value)
+
+  ## Pop value from top.
+  #  @return Popped value.
+  def pop(self):
+    if not self._hot:
+      if not self._segments:
+        raise IndexError("pop from empty stack")
+      self._unspill()
+    return self._hot.pop()
+
+  ## Remove all values.
+  #  @details Spill file is kept for reuse.
+  def clear(self):
+    self._hot = []
+    self._segments = []
+    self._spilled = 0
+
+  ## Remove all values and release spill file.
+  #  @details Stack can be used again, file is created on next spill.
+  def close(self):
+    self.clear()
+    if self._map is not None:
+      self._map.close()
+      self._map = None
+    if self._file is not None:
+      self._file.close()
+      self._file = None
+
+  ## Move bottom segment of memory part to spill file.
+  def _spill(self):
+    data = encode_values(self._hot[:self._segment])
+    offset = self._segments[-1][0] + self._segments[-1][1] if self._segments else 0
+    self._reserve(offset + len(data))
+    self._map[offset:offset + len(data)] = data
+    self._segments.append((offset, len(data), self._segment))
+    self._spilled += self._segment
+    del self._hot[:self._segment]
+    self.spills += 1
+
+  ## Move the last spilled segment back to memory.
+  def _unspill(self):
+    offset, size, count = self._segments.pop()
+    self._hot[:0] = decode_values(self._map[offset:offset + size])
+    self._spilled -= count
+
+  ## Make spill file large enough.
+  #  @param size Required size in bytes.
+  def _reserve(self, size):
+    if self._map is not None and size <= len(self._map):
+      return
+    if self._file is None:
+      self._file = tempfile.TemporaryFile()
+    new_size = len(self._map) if self._map is not None else INITIAL_FILE_SIZE
+    while new_size < size:
+      new_size *= 2
+    if self._map is not None:
+      self._map.close()
+    self._file.truncate(new_size)
+    self._map = mmap.mmap(self._file.fileno(), new_size)
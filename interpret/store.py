@@ -0,0 +1,247 @@
+## @package store
+#  Struct-of-arrays program store.
+#
+#  Program is held in parallel arrays instead of instruction objects:
+#  opcode ids, orders and operand ids of arguments 1 to 3. Operand id
+#  is index to table of distinct operands (kind, frame and value index
+#  arrays), values point to deduplicated pools of names (variables,
+#  labels, types) and constants. Operand id 0 is missing argument.
+#
+#  Store is saved to file as it is (header, arrays in native byte order
+#  aligned to 8 bytes, pools in JSON) and arrays of loaded store are
+#  views of memory-mapped file, so they are shared by processes running
+#  the same program.
+
+from interpret.factory import InstrFactory
+from interpret.structs import Argument
+import utils.error as error
+
+from array import array
+from itertools import compress
+from operator import attrgetter
+import json
+import mmap
+import struct
+import sys
+
+## Identification of store file.
+MAGIC = b"IPPSTORE"
+## Version of store file format.
+VERSION = 1
+## Header: magic, version, instruction count, operand count,
+#  offset and length of pools.
+HEADER = struct.Struct("=8sIQQQQ")
+## Alignment of arrays in file.
+ALIGN = 8
+## Kinds of operands which take value from name pool.
+NAME_KINDS = ("var", "label", "type")
+## Maximal instruction order (orders are 64-bit signed integers).
+MAX_ORDER = (1 << 63) - 1
+
+## Arrays of store with typecode and whether they are indexed
+#  by instruction (otherwise by operand).
+COLUMNS = (
+  ("opcodes", "B", True),
+  ("orders",  "q", True),
+  ("arg1",    "i", True),
+  ("arg2",    "i", True),
+  ("arg3",    "i", True),
+  ("kinds",   "B", False),
+  ("frames",  "B", False),
+  ("values",  "i", False),
+)
+
+## Table of distinct items and their indexes.
+class _Pool:
+  ## Pool constructor.
+  #  @param items Initial items.
+  def __init__(self, items = ()):
+    self.items = []   ## Items by index.
+    self._index = {}  ## Indexes by item key.
+    for item in items:
+      self.add(item)
+
+  ## Return index of item, item is added if needed.
+  #  @details Type is part of key, so 1 and true are distinct.
+  #  @param item Item to add.
+  #  @return Index of item.
+  def add(self, item):
+    key = (type(item), item)
+    idx = self._index.get(key)
+    if idx is None:
+      idx = len(self.items)
+      self._index[key] = idx
+      self.items.append(item)
+    return idx
+
+## Program store.
+#
+#  Is a sequence of instructions, so it can be used as instruction
+#  list of interpreter. Instruction object is shared by all
+#  instructions with the same opcode and its order and arguments are
+#  set on access, so it is valid only until next access. Hooks and
+#  reports (e.g. flight recorder, coverage) therefore get instruction
+#  valid only during their call and must keep positions or orders,
+#  not instruction objects (copy.copy of instruction can be kept).
+class ProgramStore:
+  ## Program store constructor.
+  #  @param columns Arrays by name (see COLUMNS).
+  #  @param pools   Dictionary of opcodes, kinds, frames, names and constants.
+  #  @param mapped  Memory-mapped file holding arrays (optional).
+  def __init__(self, columns, pools, mapped = None):
+    self._mapped = mapped                ## Memory-mapped store file.
+    self.columns = columns               ## Arrays by name.
+    self.pools = pools                   ## Pools and tables of names.
+    self.opcodes = columns["opcodes"]    ## Opcode ids of instructions.
+    self.orders = columns["orders"]      ## Orders of instructions.
+    self._arg1 = columns["arg1"]         ## Operand ids of argument 1.
+    self._arg2 = columns["arg2"]         ## Operand ids of argument 2.
+    self._arg3 = columns["arg3"]         ## Operand ids of argument 3.
+    self._instrs = [InstrFactory.create_instr(opcode, 0)
+                    for opcode in pools["opcodes"]] ## Shared instructions by opcode id.
+    self._operands = self._create_operands() ## Arguments by operand id.
+
+  ## Create arguments of distinct operands.
+  #  @return List of arguments (None for id 0).
+  def _create_operands(self):
+    pools = self.pools
+    operands = [None]
+    for kind, frame, value in zip(self.columns["kinds"], self.columns["frames"],
+                                  self.columns["values"]):
+      kind = pools["kinds"][kind]
+      pool = pools["names"] if kind in NAME_KINDS else pools["constants"]
+      operands.append(Argument(kind, pool[value], pools["frames"][frame]))
+    return operands
+
+  ## Number of instructions.
+  def __len__(self):
+    return len(self.opcodes)
+
+  ## Return instruction at position.
+  #  @param pos Position of instruction.
+  #  @return Shared instruction object of the opcode.
+  def __getitem__(self, pos):
+    instr = self._instrs[self.opcodes[pos]]
+    instr.order = self.orders[pos]
+    operands = self._operands
+    instr.arg1 = operands[self._arg1[pos]]
+    instr.arg2 = operands[self._arg2[pos]]
+    instr.arg3 = operands[self._arg3[pos]]
+    return instr
+
+  ## Find labels of program.
+  #  @details Exits if label is defined twice.
+  #  @return Dictionary of label names and their position.
+  def labels(self):
+    labels = {}
+    if "LABEL" not in self.pools["opcodes"]:
+      return labels
+    label_id = self.pools["opcodes"].index("LABEL")
+    for pos in compress(range(len(self)), map(label_id.__eq__, self.opcodes)):
+      label_name = self._operands[self._arg1[pos]].value
+      if label_name in labels:
+        error.error_exit(error.SEMANTIC_ERROR, "Label already exist")
+      labels[label_name] = pos
+    return labels
+
+  ## Build store from instructions.
+  #  @details Exits if order of instruction is over MAX_ORDER.
+  #  @param instr_list Sorted list of instructions.
+  #  @return Created store.
+  @classmethod
+  def from_instrs(cls, instr_list):
+    if instr_list and instr_list[-1].order > MAX_ORDER:
+      error.error_exit(error.CLIARG_ERROR, f"Instruction order {instr_list[-1].order} "
+                                           f"does not fit to program store")
+    opcodes = _Pool()
+    kinds = _Pool([None])
+    frames = _Pool([None])
+    names = _Pool()
+    constants = _Pool()
+    operands = {None: 0}
+    columns = {name: array(typecode) for name, typecode, _ in COLUMNS}
+
+    for instr in instr_list:
+      columns["opcodes"].append(opcodes.add(InstrFactory.get_opcode(instr)))
+      for name in ("arg1", "arg2", "arg3"):
+        arg = getattr(instr, name)
+        key = None if arg is None else (arg.type, type(arg.value), arg.value, arg.frame)
+        operand = operands.get(key)
+        if operand is None:
+          operand = operands[key] = len(operands)
+          pool = names if arg.type in NAME_KINDS else constants
+          columns["kinds"].append(kinds.add(arg.type))
+          columns["frames"].append(frames.add(arg.frame))
+          columns["values"].append(pool.add(arg.value))
+        columns[name].append(operand)
+    columns["orders"].extend(map(attrgetter("order"), instr_list))
+
+    pools = {"byteorder": sys.byteorder, "opcodes": opcodes.items, "kinds": kinds.items,
+             "frames": frames.items, "names": names.items, "constants": constants.items}
+    return cls(columns, pools)
+
+  ## Save store to file.
+  #  @details Exits if file cannot be written.
+  #  @param path Path of store file.
+  def save(self, path):
+    pools = json.dumps(self.pools).encode()
+    offset = _align(HEADER.size)
+    for name, typecode, _ in COLUMNS:
+      offset = _align(offset + len(self.columns[name]) * array(typecode).itemsize)
+    try:
+      with open(path, "wb") as store_file:
+        store_file.write(HEADER.pack(MAGIC, VERSION, len(self),
+                                     len(self.columns["kinds"]), offset, len(pools)))
+        for name, _, _ in COLUMNS:
+          store_file.write(bytes(_align(store_file.tell()) - store_file.tell()))
+          store_file.write(self.columns[name])
+        store_file.write(bytes(offset - store_file.tell()))
+        store_file.write(pools)
+    except EnvironmentError as e:
+      error.error_exit(error.FILE_ERROR, f"Cannot access file {e.filename}")
+
+  ## Load store from file.
+  #  @details File is memory-mapped, arrays are not copied.
+  #           Exits if file cannot be read or is not valid store.
+  #  @param path Path of store file.
+  #  @return Loaded store.
+  @classmethod
+  def load(cls, path):
+    try:
+      with open(path, "rb") as store_file:
+        mapped = mmap.mmap(store_file.fileno(), 0, access = mmap.ACCESS_READ)
+    except (EnvironmentError, ValueError):
+      error.error_exit(error.FILE_ERROR, f"Cannot access file {path}")
+
+    try:
+      magic, version, count, operand_count, pools_offset, pools_size = \
+        HEADER.unpack_from(mapped)
+      if magic != MAGIC or version != VERSION:
+        raise ValueError("not a program store")
+      pools = json.loads(mapped[pools_offset:pools_offset + pools_size])
+      if pools["byteorder"] != sys.byteorder:
+        raise ValueError("byte order of store differs")
+
+      view = memoryview(mapped)
+      columns = {}
+      offset = _align(HEADER.size)
+      for name, typecode, by_instr in COLUMNS:
+        size = (count if by_instr else operand_count) * array(typecode).itemsize
+        if offset + size > pools_offset:
+          raise ValueError("truncated store")
+        columns[name] = view[offset:offset + size].cast(typecode)
+        offset = _align(offset + size)
+
+      store = cls(columns, pools, mapped)
+      if max(columns["opcodes"], default = 0) >= len(pools["opcodes"]) or \
+         any(max(columns[name], default = 0) > operand_count for name in ("arg1", "arg2", "arg3")):
+        raise ValueError("invalid id in store")
+    except (ValueError, KeyError, IndexError, TypeError, struct.error):
+      error.error_exit(error.XMLSTRUCT_ERROR, "Invalid program store")
+    return store
+
+## Round offset up to alignment of arrays.
+#  @param offset Offset in file.
+#  @return Aligned offset.
+def _align(offset):
+  return (offset + ALIGN - 1) // ALIGN * ALIGN
@@ -14,9 +14,62 @@ class Value:
 ## Instruction argument.
 #
 #  Type and value are compatible with Value class.
+#  Arguments are shared between instructions (see ArgumentTable),
+#  so they must not be modified after creation.
 class Argument:
+  __slots__ = ("type", "value", "frame")
+
   ## Argument constructor.
   def __init__(self, type, value, frame = None):
     self.type = type   ## Argument type (variable, label, int, etc.)
     self.value = value ## Value (variable name, int constant, etc.)
     self.frame = frame ## Name of frame if variable type.
+
+## Interning table of instruction arguments.
+#
+#  Identical arguments (type, value and frame) are created only once
+#  and shared by all instructions. Arguments can also be looked up
+#  by their source text, so conversion (unescaping) is done only once.
+class ArgumentTable:
+  ## Argument table constructor.
+  #  @param enabled If false, new argument is always created.
+  def __init__(self, enabled = True):
+    self._enabled = enabled ## Whether arguments are interned.
+    self._args = {}         ## Arguments by type, value and frame.
+    self._texts = {}        ## Arguments by type and source text.
+
+  ## Return interned argument.
+  #  @param type  Argument type.
+  #  @param value Argument value.
+  #  @param frame Name of frame if variable type.
+  #  @return Shared Argument object.
+  def intern(self, type, value, frame = None):
+    if not self._enabled:
+      return Argument(type, value, frame)
+
+    key = (type, value, frame)
+    arg = self._args.get(key)
+    if arg is None:
+      arg = Argument(type, value, frame)
+      self._args[key] = arg
+    return arg
+
+  ## Return argument created from source text.
+  #  @param type Argument type.
+  #  @param text Source text of argument.
+  #  @return Argument object or None if not created yet.
+  def lookup_text(self, type, text):
+    return self._texts.get((type, text))
+
+  ## Remember argument created from source text.
+  #  @param type Argument type.
+  #  @param text Source text of argument.
+  #  @param arg  Argument object.
+  def add_text(self, type, text, arg):
+    if self._enabled:
+      self._texts[(type, text)] = arg
+
+  ## Number of distinct arguments in table.
+  #  @return Count of interned arguments.
+  def __len__(self):
+    return len(self._args)
@@ -0,0 +1,214 @@
+## @package testsuite
+#  Parallel runner of test programs.
+#
+#  Tests are found in directories in the usual test layout: source
+#  code (name.src), standard input (name.in), expected standard output
+#  (name.out) and expected exit code (name.rc). Missing input and output
+#  are empty, missing exit code is 0. Standard output is compared only
+#  when expected exit code is 0, exactly (newlines are not translated).
+#
+#  Tests are run by pool of processes, each test is run in worker
+#  process by runner module (or by interpret.py in subprocess
+#  with --subprocess). Results are listed from the slowest test.
+#
+#  Usage: python -m interpret.testsuite DIR [DIR ...] [options]
+
+from interpret.runner import run_source
+import utils.error as error
+
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+
+## Path of interpreter script run with --subprocess.
+INTERPRET_SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                "interpret.py")
+## Exit code reported for test which did not finish in time.
+TIMEOUT_CODE = "timeout"
+
+## Raised when test runs longer than timeout.
+class _Timeout(Exception):
+  pass
+
+## Result of one test.
+class TestResult:
+  ## Test result constructor.
+  #  @param name    Name of test (path without extension).
+  #  @param time    Run time in seconds.
+  #  @param failure Description of failure or None if test passed.
+  def __init__(self, name, time, failure = None):
+    self.name = name       ## Name of test.
+    self.time = time       ## Run time in seconds.
+    self.failure = failure ## Description of failure.
+
+## Find tests in directories.
+#  @param directories Paths of directories (searched recursively).
+#  @return Sorted list of test names (paths without extension).
+def find_tests(directories):
+  tests = []
+  for directory in directories:
+    for root, _, files in os.walk(directory):
+      tests += [os.path.join(root, name[:-4]) for name in files if name.endswith(".src")]
+  return sorted(tests)
+
+## Read test file.
+#  @param path    Path of file.
+#  @param default Content of missing file.
+#  @param newline Newline mode of open (None translates newlines
+#                 like standard input of interpreter does).
+#  @return Content of file.
+def _read(path, default, newline = None):
+  try:
+    with open(path, "r", newline = newline) as test_file:
+      return test_file.read()
+  except FileNotFoundError:
+    return default
+
+## Raise timeout of test (SIGALRM handler).
+def _alarm(signum, frame):
+  raise _Timeout()
+
+## Run program in current process.
+#  @param name          Name of test.
+#  @param input_text    Text of standard input.
+#  @param source_format Format of source code.
+#  @param timeout       Timeout in seconds.
+#  @return Tuple of standard output and exit code.
+def _run_in_process(name, input_text, source_format, timeout):
+  prev_handler = signal.signal(signal.SIGALRM, _alarm)
+  signal.setitimer(signal.ITIMER_REAL, timeout)
+  try:
+    stdout, _, code = run_source(f"{name}.src", input_text, source_format)
+  except _Timeout:
+    return "", TIMEOUT_CODE
+  finally:
+    signal.setitimer(signal.ITIMER_REAL, 0)
+    signal.signal(signal.SIGALRM, prev_handler)
+  return stdout, code
+
+## Run program by interpret.py in subprocess.
+#  @param name          Name of test.
+#  @param input_text    Text of standard input.
+#  @param source_format Format of source code.
+#  @param timeout       Timeout in seconds.
+#  @return Tuple of standard output (without newline translation) and exit code.
+def _run_subprocess(name, input_text, source_format, timeout):
+  try:
+    process = subprocess.run([sys.executable, INTERPRET_SCRIPT, "--source", f"{name}.src",
+                              "--source-format", source_format],
+                             input = input_text.encode(), capture_output = True,
+                             timeout = timeout)
+  except subprocess.TimeoutExpired:
+    return "", TIMEOUT_CODE
+  return process.stdout.decode(errors = "replace"), process.returncode
+
+## Run one test.
+#  @details Crash of interpreter (Python exception) and invalid
+#           expected exit code are failures of test.
+#  @param name          Name of test.
+#  @param source_format Format of source code.
+#  @param timeout       Timeout in seconds.
+#  @param in_process    Whether test is run in current process.
+#  @return TestResult object.
+def run_test(name, source_format = "xml", timeout = 10.0, in_process = True):
+  input_text = _read(f"{name}.in", "")
+  expected_output = _read(f"{name}.out", "", newline = "")
+  expected_code = _read(f"{name}.rc", "0").strip() or "0"
+  try:
+    expected_code = int(expected_code)
+  except ValueError:
+    return TestResult(name, 0.0, f"invalid exit code '{expected_code}' in {name}.rc")
+
+  run = _run_in_process if in_process else _run_subprocess
+  start = time.perf_counter()
+  try:
+    output, code = run(name, input_text, source_format, timeout)
+  except Exception as e:
+    return TestResult(name, time.perf_counter() - start, f"crash: {e!r}")
+  elapsed = time.perf_counter() - start
+
+  if code == TIMEOUT_CODE:
+    return TestResult(name, elapsed, f"timeout after {timeout} s")
+  if code != expected_code:
+    return TestResult(name, elapsed, f"exit code {code}, expected {expected_code}")
+  if expected_code == 0 and output != expected_output:
+    return TestResult(name, elapsed, "output differs")
+  return TestResult(name, elapsed)
+
+## Run tests by pool of processes.
+#  @param tests         List of test names.
+#  @param jobs          Number of worker processes (1 runs tests in this process).
+#  @param source_format Format of source code.
+#  @param timeout       Timeout of test in seconds.
+#  @param in_process    Whether tests are run in worker processes
+#                       (otherwise by interpret.py in subprocess).
+#  @return List of TestResult objects sorted from the slowest.
+def run_tests(tests, jobs, source_format = "xml", timeout = 10.0, in_process = True):
+  count = len(tests)
+  args = ([source_format] * count, [timeout] * count, [in_process] * count)
+  if jobs == 1:
+    results = list(map(run_test, tests, *args))
+  else:
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+      results = list(executor.map(run_test, tests, *args,
+                                  chunksize = max(1, count // (jobs * 8))))
+  return sorted(results, key = lambda result: result.time, reverse = True)
+
+## Write report of results.
+#  @param results     List of TestResult objects.
+#  @param elapsed     Wall time of the whole run.
+#  @param out_file    File to write to.
+#  @param failed_only Whether only failed tests are listed.
+def write_report(results, elapsed, out_file, failed_only = False):
+  for result in results:
+    if failed_only and result.failure is None:
+      continue
+    status = "ok" if result.failure is None else "FAIL"
+    line = f"{result.time * 1000:10.1f} ms  {status:4}  {result.name}"
+    if result.failure is not None:
+      line += f": {result.failure}"
+    out_file.write(line + "\n")
+  failed = sum(1 for result in results if result.failure is not None)
+  out_file.write(f"Passed: {len(results) - failed}/{len(results)}, "
+                 f"failed: {failed}, time: {elapsed:.2f} s\n")
+
+## Create argument parser of test runner.
+#  @return Created parser.
+def create_argparser():
+  arg_parser = argparse.ArgumentParser(description="Run IPPcode22 test programs.")
+  arg_parser.add_argument("directories", nargs="+", metavar="DIR",
+                          help="directories with tests (searched recursively)")
+  arg_parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1,
+                          help="number of worker processes")
+  arg_parser.add_argument("--source-format", choices=["xml", "text"], default="xml",
+                          help="format of source code (XML or IPPcode22 text)")
+  arg_parser.add_argument("--timeout", type=float, default=10.0,
+                          help="timeout of one test in seconds")
+  arg_parser.add_argument("--subprocess", action="store_true",
+                          help="run each test by interpret.py in subprocess")
+  arg_parser.add_argument("--failed-only", action="store_true",
+                          help="list only failed tests")
+  return arg_parser
+
+## Entrypoint of a test runner.
+#  @details Exits with 1 if any test failed.
+def main():
+  args = create_argparser().parse_args()
+  if args.jobs < 1:
+    error.error_exit(error.CLIARG_ERROR, "Number of jobs must be positive")
+  tests = find_tests(args.directories)
+
+  start = time.perf_counter()
+  results = run_tests(tests, args.jobs, args.source_format, args.timeout, not args.subprocess)
+  elapsed = time.perf_counter() - start
+
+  write_report(results, elapsed, sys.stdout, args.failed_only)
+  if any(result.failure is not None for result in results):
+    exit(1)
+
+if __name__ == "__main__":
+  main()
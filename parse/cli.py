@@ -13,6 +13,60 @@ def create_argparser():
   arg_parser = argparse.ArgumentParser()
   arg_parser.add_argument("--source", help="XML source code")
   arg_parser.add_argument("--input", help="input values file")
+  arg_parser.add_argument("--source-format", choices=["xml", "text", "store"], default="xml",
+                          help="format of source code (XML, IPPcode22 text or program store)")
+  arg_parser.add_argument("--store-out", metavar="FILE",
+                          help="write loaded program to program store file")
+  arg_parser.add_argument("--jobs", type=int, default=1,
+                          help="number of processes for parsing XML source")
+  arg_parser.add_argument("--engine", choices=["loop", "blocks"], default="loop",
+                          help="execution engine (instruction loop or basic blocks)")
+  arg_parser.add_argument("--cfg-dot", metavar="FILE",
+                          help="write control-flow graph in DOT format to file")
+  arg_parser.add_argument("--sample-profile", metavar="FILE",
+                          help="write sampled call stacks (collapsed format) to file")
+  arg_parser.add_argument("--sample-interval", type=float, default=1.0,
+                          help="sampling interval in milliseconds of CPU time")
+  arg_parser.add_argument("--lower-stack", action="store_true",
+                          help="rewrite STACK instructions to register form")
+  arg_parser.add_argument("--inline", action="store_true",
+                          help="copy small subroutines to their CALL sites")
+  arg_parser.add_argument("--inline-size", type=int, default=16,
+                          help="maximal number of instructions of inlined subroutine")
+  arg_parser.add_argument("--memoize", action="store_true",
+                          help="cache results of pure subroutines")
+  arg_parser.add_argument("--memo-size", type=int, default=10000,
+                          help="maximal number of cached subroutine results")
+  arg_parser.add_argument("--coverage", metavar="FILE",
+                          help="write execution counts of instructions to file")
+  arg_parser.add_argument("--record", metavar="DIR",
+                          help="record program input and output to directory")
+  arg_parser.add_argument("--replay", metavar="DIR",
+                          help="run program with recorded input and verify output")
+  arg_parser.add_argument("--profile-out", metavar="DIR",
+                          help="store runtime profile of the program to directory")
+  arg_parser.add_argument("--profile-in", metavar="DIR",
+                          help="specialize hot instructions by stored runtime profile")
+  arg_parser.add_argument("--metrics", metavar="FILE",
+                          help="write metrics in Prometheus text format to file")
+  arg_parser.add_argument("--metrics-interval", type=float, default=10.0,
+                          help="seconds between writes of metrics file")
+  arg_parser.add_argument("--stack-spill-threshold", type=int, metavar="N",
+                          help="spill data stack values over N to temporary file")
+  arg_parser.add_argument("--flight-recorder", type=int, metavar="N",
+                          help="dump last N run instructions when program fails")
+  arg_parser.add_argument("--flight-recorder-file", metavar="FILE",
+                          help="write flight recorder dump to file instead of STDERR")
+  arg_parser.add_argument("--flight-recorder-types", action="store_true",
+                          help="record also types of variable operands")
+  arg_parser.add_argument("--introspect", metavar="FILE",
+                          help="write snapshot on SIGUSR1 to file ('-' for STDERR)")
+  arg_parser.add_argument("--mem-stats", metavar="FILE",
+                          help="write memory statistics to file ('-' for STDERR)")
+  arg_parser.add_argument("--mem-stats-interval", type=int, default=1,
+                          help="instructions between scans of variables and strings")
+  arg_parser.add_argument("--mem-stats-tracemalloc", action="store_true",
+                          help="track Python allocations with tracemalloc")
   return arg_parser
 
 ## Get parsed arguments from CLI.
@@ -28,8 +82,69 @@ def get_args():
     exit(0) if not e.code else exit(error.CLIARG_ERROR)
   
   # at least one must be entered
-  if not args.source and not args.input:
+  if not args.source and not args.input and not args.replay:
     error.error_exit(error.CLIARG_ERROR,
                      "Either source code or input file must be entered")
+  if args.jobs < 1:
+    error.error_exit(error.CLIARG_ERROR, "Number of jobs must be positive")
+  if args.sample_interval <= 0:
+    error.error_exit(error.CLIARG_ERROR, "Sampling interval must be positive")
+  if args.inline_size < 0:
+    error.error_exit(error.CLIARG_ERROR, "Inlined subroutine size must not be negative")
+  if args.memo_size < 1:
+    error.error_exit(error.CLIARG_ERROR, "Memoization cache size must be positive")
+  if args.mem_stats_interval < 1:
+    error.error_exit(error.CLIARG_ERROR, "Memory statistics interval must be positive")
+  if args.record and args.replay:
+    error.error_exit(error.CLIARG_ERROR, "Cannot record and replay at once")
+  if args.record and not args.source:
+    error.error_exit(error.CLIARG_ERROR, "Recording requires source code file")
+  if (args.record or args.replay) and args.mem_stats:
+    error.error_exit(error.CLIARG_ERROR,
+                     "Recording and replay cannot be used with memory statistics")
+  if args.metrics_interval <= 0:
+    error.error_exit(error.CLIARG_ERROR, "Metrics interval must be positive")
+  if args.metrics and args.mem_stats:
+    error.error_exit(error.CLIARG_ERROR, "Metrics cannot be used with memory statistics")
+  if args.metrics and args.engine == "blocks":
+    error.error_exit(error.CLIARG_ERROR, "Metrics are collected only by loop engine")
+  if args.profile_out and args.mem_stats:
+    error.error_exit(error.CLIARG_ERROR,
+                     "Profile cannot be stored with memory statistics")
+  if args.coverage and args.mem_stats:
+    error.error_exit(error.CLIARG_ERROR, "Coverage cannot be used with memory statistics")
+  if args.engine == "blocks" and args.mem_stats:
+    error.error_exit(error.CLIARG_ERROR,
+                     "Memory statistics are tracked only by loop engine")
+  if args.stack_spill_threshold is not None and args.stack_spill_threshold < 2:
+    error.error_exit(error.CLIARG_ERROR, "Stack spill threshold must be at least 2")
+  if args.flight_recorder is not None and args.flight_recorder < 1:
+    error.error_exit(error.CLIARG_ERROR, "Flight recorder size must be positive")
+  if args.flight_recorder and args.mem_stats:
+    error.error_exit(error.CLIARG_ERROR,
+                     "Flight recorder cannot be used with memory statistics")
+  if args.flight_recorder and args.engine == "blocks":
+    error.error_exit(error.CLIARG_ERROR, "Flight recorder is used only by loop engine")
+  if (args.flight_recorder_file or args.flight_recorder_types) and not args.flight_recorder:
+    error.error_exit(error.CLIARG_ERROR, "Flight recorder options require --flight-recorder")
+  if args.introspect and args.mem_stats:
+    error.error_exit(error.CLIARG_ERROR, "Introspection cannot be used with memory statistics")
+  if args.introspect and args.engine == "blocks":
+    error.error_exit(error.CLIARG_ERROR, "Introspection is used only by loop engine")
+  if args.source_format == "store" and not args.source and not args.replay:
+    error.error_exit(error.CLIARG_ERROR, "Program store must be read from file")
+  check_source_format(args)
 
   return args
+
+## Check options against format of source code.
+#  @details Called also after format of replayed source is
+#           resolved from recording.
+#  @param args Parsed CLI arguments.
+def check_source_format(args):
+  if args.source_format == "store":
+    if args.engine != "loop" or args.cfg_dot or args.lower_stack or args.inline \
+       or args.memoize or args.profile_in:
+      error.error_exit(error.CLIARG_ERROR,
+                       "Program store is run only by loop engine without --cfg-dot, "
+                       "--lower-stack, --inline, --memoize and --profile-in")
@@ -0,0 +1,176 @@
+## @package parallel_xml
+#  Parse XML from input file in parallel worker processes.
+#
+#  Body of the program element is split into chunks of instructions
+#  at byte boundaries. Chunks are parsed and validated by worker
+#  processes using the same checks as sequential parser and sent back
+#  in compact form. Whenever document cannot be split safely,
+#  sequential parser is used instead.
+
+from interpret.factory import InstrFactory
+from interpret.structs import ArgumentTable
+from parse.parse_xml import parse_xml
+import utils.error as error
+
+from concurrent.futures import ProcessPoolExecutor
+import contextlib
+import io
+import re
+import sys
+import xml.etree.ElementTree as ET
+
+## Minimal size of chunk in bytes.
+MIN_CHUNK_SIZE = 256 * 1024
+## Number of chunks per worker process.
+CHUNKS_PER_JOB = 4
+
+## Allowed content before program element.
+_PROLOG_RE = re.compile(rb"\s*(<\?xml[^>]*\?>)?\s*")
+## Program element start tag.
+_PROGRAM_RE = re.compile(rb"<program\b[^>]*>")
+## Start of instruction element.
+_INSTR_RE = re.compile(rb"<instruction[\s/>]")
+## Encoding declaration.
+_ENCODING_RE = re.compile(rb"encoding\s*=\s*[\"']([^\"']*)[\"']")
+
+## Collects instructions parsed by worker process.
+#
+#  Has same interface as interpreter for parse_xml.
+class _Collector:
+  ## Collector constructor.
+  def __init__(self):
+    self.instrs = [] ## Instructions in compact form.
+
+  ## Append instruction in compact form.
+  #  @param instr Instruction to append.
+  def append_instr(self, instr):
+    self.instrs.append(instr)
+
+  ## Return instructions in compact form.
+  #  @details Compact form is tuple of order, opcode and
+  #           three arguments as (type, value, frame) tuples or None.
+  #  @return List of compact instructions.
+  def compact(self):
+    return [(instr.order, InstrFactory.get_opcode(instr),
+             _compact_arg(instr.arg1), _compact_arg(instr.arg2),
+             _compact_arg(instr.arg3)) for instr in self.instrs]
+
+## Convert argument to compact form.
+#  @param arg Argument object or None.
+#  @return Tuple of type, value and frame or None.
+def _compact_arg(arg):
+  if arg is None:
+    return None
+  return (arg.type, arg.value, arg.frame)
+
+## Read XML code file and get all instructions using worker processes.
+#  @details Instructions are appended to interpreter.
+#           Exits if not valid. Reported error is the same
+#           as of sequential parser.
+#  @param args        CLI arguments object.
+#  @param interpreter Interpreter object to which
+#                     instructions are appended.
+#  @param jobs        Number of worker processes.
+def get_instructions_parallel(args, interpreter, jobs):
+  try:
+    if args.source:
+      with open(args.source, "rb") as xml_file:
+        data = xml_file.read()
+    else:
+      data = sys.stdin.buffer.read()
+  except EnvironmentError as e:
+    error.error_exit(error.FILE_ERROR, f"Cannot access file {e.filename}")
+
+  split = split_program(data, jobs)
+  if split is None:
+    parse_sequential(data, interpreter)
+    return
+
+  header, chunks = split
+  with ProcessPoolExecutor(max_workers=jobs) as executor:
+    results = list(executor.map(parse_chunk, [header] * len(chunks), chunks))
+
+  # not well-formed chunk, whole document decides the error
+  if None in results:
+    parse_sequential(data, interpreter)
+    return
+
+  arg_table = ArgumentTable()
+  for instrs, err in results:
+    if err is not None:
+      error.error_exit(*err)
+    for order, opcode, arg1, arg2, arg3 in instrs:
+      instr_obj = InstrFactory.create_instr(opcode, order)
+      if arg1 is not None:
+        instr_obj.arg1 = arg_table.intern(*arg1)
+      if arg2 is not None:
+        instr_obj.arg2 = arg_table.intern(*arg2)
+      if arg3 is not None:
+        instr_obj.arg3 = arg_table.intern(*arg3)
+      interpreter.append_instr(instr_obj)
+
+## Parse whole XML document in current process.
+#  @param data        XML document bytes.
+#  @param interpreter Interpreter object to which
+#                     instructions are appended.
+def parse_sequential(data, interpreter):
+  try:
+    root_node = ET.fromstring(data)
+  except ET.ParseError:
+    error.error_exit(error.XMLFORMAT_ERROR, "XML not well-formed")
+  parse_xml(root_node, interpreter)
+
+## Split body of program element into chunks of instructions.
+#  @details Split is done only before instruction start tags.
+#  @param data XML document bytes.
+#  @param jobs Number of worker processes.
+#  @return Tuple of program start tag and list of chunks
+#          or None if document cannot be split.
+def split_program(data, jobs):
+  prolog = _PROLOG_RE.match(data)
+  encoding = _ENCODING_RE.search(prolog.group(0))
+  if encoding and encoding[1].lower() not in (b"utf-8", b"utf8"):
+    return None
+
+  program = _PROGRAM_RE.match(data, prolog.end())
+  if program is None or program.group(0).endswith(b"/>"):
+    return None
+  end = data.rfind(b"</program>")
+  if end < program.end() or data[end + len(b"</program>"):].strip():
+    return None
+
+  body_start = program.end()
+  chunk_size = max(MIN_CHUNK_SIZE, (end - body_start) // (jobs * CHUNKS_PER_JOB))
+  chunks = []
+  start = body_start
+  while start < end:
+    split = _INSTR_RE.search(data, min(start + chunk_size, end), end)
+    split_pos = split.start() if split else end
+    chunks.append(data[start:split_pos])
+    start = split_pos
+
+  if len(chunks) < 2:
+    return None
+  return (program.group(0), chunks)
+
+## Parse and validate chunk of instructions.
+#  @details Is run in worker process.
+#  @param header Program element start tag.
+#  @param chunk  Chunk of instruction elements.
+#  @return Tuple of compact instructions and error (code and message)
+#          or None if chunk is not well-formed.
+def parse_chunk(header, chunk):
+  try:
+    root_node = ET.fromstring(header + chunk + b"</program>")
+  except ET.ParseError:
+    return None
+
+  collector = _Collector()
+  err_output = io.StringIO()
+  try:
+    with contextlib.redirect_stderr(err_output):
+      parse_xml(root_node, collector)
+  except SystemExit as e:
+    message = err_output.getvalue().rstrip("\n").removeprefix("ERROR: ")
+    return (collector.compact(), (e.code, message))
+  return (collector.compact(), None)
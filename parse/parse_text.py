@@ -0,0 +1,172 @@
+## @package parse_text
+#  Parse IPPcode22 source code from input file.
+#
+#  Alternative to XML representation. Same instruction
+#  and argument objects are created and errors are reported
+#  with the same codes as for XML representation.
+
+from interpret.factory import InstrFactory
+from interpret.structs import ArgumentTable
+from parse.parse_xml import text_to_arg
+import utils.error as error
+
+import re
+from sys import stdin
+
+## Variable operand.
+_VAR_RE = re.compile(r"^(GF|LF|TF)@[A-Za-z_\-$&%*!?][A-Za-z0-9_\-$&%*!?]*$")
+## Label operand.
+_LABEL_RE = re.compile(r"^[A-Za-z_\-$&%*!?][A-Za-z0-9_\-$&%*!?]*$")
+## Constant operand.
+_CONST_RE = re.compile(r"^(int|bool|string|nil)@(.*)$")
+## Type operand.
+_TYPE_RE = re.compile(r"^(int|bool|string|nil)$")
+
+## Operands of instructions by opcode.
+#  @details "var" is variable, "symb" is variable or constant,
+#           "label" is label and "type" is type name.
+OPERANDS = {
+  "MOVE":        ("var", "symb"),
+  "CREATEFRAME": (),
+  "PUSHFRAME":   (),
+  "POPFRAME":    (),
+  "DEFVAR":      ("var",),
+  "CALL":        ("label",),
+  "RETURN":      (),
+  "PUSHS":       ("symb",),
+  "POPS":        ("var",),
+  "ADD":         ("var", "symb", "symb"),
+  "SUB":         ("var", "symb", "symb"),
+  "MUL":         ("var", "symb", "symb"),
+  "IDIV":        ("var", "symb", "symb"),
+  "LT":          ("var", "symb", "symb"),
+  "GT":          ("var", "symb", "symb"),
+  "EQ":          ("var", "symb", "symb"),
+  "AND":         ("var", "symb", "symb"),
+  "OR":          ("var", "symb", "symb"),
+  "NOT":         ("var", "symb"),
+  "INT2CHAR":    ("var", "symb"),
+  "STRI2INT":    ("var", "symb", "symb"),
+  "READ":        ("var", "type"),
+  "WRITE":       ("symb",),
+  "CONCAT":      ("var", "symb", "symb"),
+  "STRLEN":      ("var", "symb"),
+  "GETCHAR":     ("var", "symb", "symb"),
+  "SETCHAR":     ("var", "symb", "symb"),
+  "TYPE":        ("var", "symb"),
+  "LABEL":       ("label",),
+  "JUMP":        ("label",),
+  "JUMPIFEQ":    ("label", "symb", "symb"),
+  "JUMPIFNEQ":   ("label", "symb", "symb"),
+  "EXIT":        ("symb",),
+  "DPRINT":      ("symb",),
+  "BREAK":       (),
+  "CLEARS":      (),
+  "ADDS":        (),
+  "SUBS":        (),
+  "MULS":        (),
+  "IDIVS":       (),
+  "LTS":         (),
+  "GTS":         (),
+  "EQS":         (),
+  "ANDS":        (),
+  "ORS":         (),
+  "NOTS":        (),
+  "INT2CHARS":   (),
+  "STRI2INTS":   (),
+  "JUMPIFEQS":   ("label",),
+  "JUMPIFNEQS":  ("label",)
+}
+
+## Read IPPcode22 source code file and get all instructions.
+#  @details Instructions are appended to interpreter.
+#           Exits if not valid.
+#  @param args        CLI arguments object.
+#  @param interpreter Interpreter object to which
+#                     instructions are appended.
+def get_text_instructions(args, interpreter):
+  src_file = stdin
+  try:
+    if args.source:
+      src_file = open(args.source, "r")
+  except EnvironmentError as e:
+    error.error_exit(error.FILE_ERROR, f"Cannot access file {e.filename}")
+
+  parse_text(src_file, interpreter)
+
+  if args.source:
+    src_file.close()
+
+## Check validness of source code, create instructions
+#  and append them to interpreter.
+#  @details Order of instructions is their position in code
+#           starting from 1. Exits if not valid.
+#  @param lines       Iterable of source code lines.
+#  @param interpreter Interpreter object to which
+#                     instructions are appended.
+#  @param arg_table   ArgumentTable for interning arguments.
+#                     New table is used if not given.
+def parse_text(lines, interpreter, arg_table = None):
+  if arg_table is None:
+    arg_table = ArgumentTable()
+
+  token_args = {} # already converted tokens, validated only once
+  header = False
+  order = 0
+  for line in lines:
+    tokens = line.partition("#")[0].split()
+    if not tokens:
+      continue
+
+    if not header:
+      if len(tokens) != 1 or tokens[0].upper() != ".IPPCODE22":
+        error.error_exit(error.XMLSTRUCT_ERROR, "Missing '.IPPcode22' header")
+      header = True
+      continue
+
+    opcode = tokens[0].upper()
+    order += 1
+    instr_obj = InstrFactory.create_instr(opcode, order)
+    operands = OPERANDS[opcode]
+    if len(tokens) - 1 != len(operands):
+      error.error_exit(error.XMLSTRUCT_ERROR, "Invalid number of arguments")
+
+    args = []
+    for kind, token in zip(operands, tokens[1:]):
+      arg_obj = token_args.get((kind, token))
+      if arg_obj is None:
+        arg_obj = token_to_arg(kind, token, arg_table)
+        token_args[(kind, token)] = arg_obj
+      args.append(arg_obj)
+    args += [None] * (3 - len(args))
+    instr_obj.arg1, instr_obj.arg2, instr_obj.arg3 = args
+    interpreter.append_instr(instr_obj)
+
+  if not header:
+    error.error_exit(error.XMLSTRUCT_ERROR, "Missing '.IPPcode22' header")
+
+## Convert operand token to Argument class object.
+#  @details Exits if not valid.
+#  @param kind      Expected operand kind (var, symb, label, type).
+#  @param token     Operand token.
+#  @param arg_table ArgumentTable for interning arguments.
+#  @return Argument object.
+def token_to_arg(kind, token, arg_table):
+  if kind == "label":
+    if not _LABEL_RE.match(token):
+      error.error_exit(error.XMLSTRUCT_ERROR, "Invalid label")
+    return text_to_arg("label", token, arg_table)
+  elif kind == "type":
+    if not _TYPE_RE.match(token):
+      error.error_exit(error.XMLSTRUCT_ERROR, "Invalid type")
+    return text_to_arg("type", token, arg_table)
+
+  if _VAR_RE.match(token):
+    return text_to_arg("var", token, arg_table)
+  if kind == "var":
+    error.error_exit(error.XMLSTRUCT_ERROR, "Invalid variable")
+
+  const = _CONST_RE.match(token)
+  if const is None:
+    error.error_exit(error.XMLSTRUCT_ERROR, "Invalid 'type' attribute value")
+  return text_to_arg(const[1], const[2], arg_table)
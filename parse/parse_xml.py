@@ -2,7 +2,7 @@
 #  Parse XML from input file.
 
 from interpret.factory import InstrFactory
-from interpret.structs import Argument
+from interpret.structs import ArgumentTable
 import utils.error as error
 
 import re
@@ -40,7 +40,11 @@ def get_instructions(args, interpreter):
 #  @param root_node  XML root element.
 #  @param interpeter Interpreter object to which
 #                    instructions are appended.
-def parse_xml(root_node, interpreter):
+#  @param arg_table  ArgumentTable for interning arguments.
+#                    New table is used if not given.
+def parse_xml(root_node, interpreter, arg_table = None):
+  if arg_table is None:
+    arg_table = ArgumentTable()
   check_root(root_node)
   for instr_node in root_node:
     check_instr(instr_node)
@@ -57,7 +61,7 @@ def parse_xml(root_node, interpreter):
 
     for arg_node in instr_node:
       check_arg(arg_node)
-      arg_obj = xml_to_arg(arg_node)
+      arg_obj = xml_to_arg(arg_node, arg_table)
       if(arg_node.tag == "arg1"):
         instr_obj.arg1 = arg_obj
       elif(arg_node.tag == "arg2"):
@@ -107,18 +111,33 @@ def check_arg(arg_node):
     error.error_exit(error.XMLSTRUCT_ERROR, "Invalid 'type' attribute value")
 
 ## Convert XML argument element to Argument class object.
-#  @details Exits if not valid.
-#  @param arg XML argument element.
+#  @details Exits if not valid. Identical arguments
+#           are shared using argument table.
+#  @param arg       XML argument element.
+#  @param arg_table ArgumentTable for interning arguments.
 #  @return Argument object.
-def xml_to_arg(arg_node):
-  value = arg_node.text
-  type = arg_node.attrib["type"]
+def xml_to_arg(arg_node, arg_table):
+  return text_to_arg(arg_node.attrib["type"], arg_node.text, arg_table)
+
+## Convert argument type and text to Argument class object.
+#  @details Exits if not valid. Identical arguments
+#           are shared using argument table.
+#  @param type      Argument type.
+#  @param text      Argument text (value without type).
+#  @param arg_table ArgumentTable for interning arguments.
+#  @return Argument object.
+def text_to_arg(type, text, arg_table):
+  value = text
   frame = None
 
+  arg_obj = arg_table.lookup_text(type, text)
+  if arg_obj is not None:
+    return arg_obj
+
   try:
     if type == "var":
-      frame = arg_node.text.split("@")[0]
-      value = arg_node.text.split("@")[1]
+      frame = text.split("@")[0]
+      value = text.split("@")[1]
     elif type == "int":
       value = int(value)
     elif type == "string":
@@ -135,5 +154,6 @@ def xml_to_arg(arg_node):
   except IndexError:
     error.error_exit(error.XMLSTRUCT_ERROR, "Invalid variable")
 
-  arg_obj = Argument(type, value, frame)
+  arg_obj = arg_table.intern(type, value, frame)
+  arg_table.add_text(type, text, arg_obj)
   return arg_obj
@@ -0,0 +1,35 @@
+## @package conftest
+#  Common fixtures of tests.
+#
+#  Programs are run by interpret.py in subprocess, so options
+#  are tested the same way as from command line.
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+## Root directory of repository.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+## Path of interpreter script.
+INTERPRET_SCRIPT = os.path.join(ROOT, "interpret.py")
+
+sys.path.insert(0, ROOT)
+
+## Run program by interpret.py.
+#  @param tmp_path Temporary directory of test.
+#  @return Function taking source code, options, input text and
+#          format of source code (IPPcode22 text by default)
+#          and returning tuple of standard output and exit code.
+@pytest.fixture
+def run_ipp(tmp_path):
+  def run(source, *options, input_text = "", source_format = "text"):
+    source_path = tmp_path / "prog.src"
+    source_path.write_text(source)
+    process = subprocess.run([sys.executable, INTERPRET_SCRIPT, "--source", str(source_path),
+                              "--source-format", source_format, *options],
+                             input = input_text, capture_output = True, text = True,
+                             cwd = tmp_path, timeout = 60)
+    return process.stdout, process.returncode
+  return run
@@ -0,0 +1,68 @@
+## @package test_batch
+#  Differential tests of lockstep batch engine.
+
+from bench.generator import ProgramGenerator
+from bench.programs import to_text
+from interpret.core import Interpreter
+from interpret.runner import run_program
+from parse.parse_text import parse_text
+
+import io
+import random
+
+import pytest
+
+pytest.importorskip("numpy")
+from interpret.batch import run_batch
+
+## Inputs of lanes (including invalid and missing input).
+INPUTS = ["0\n", "5\n", "-17\n", "1000\n", "abc\n", "", "9223372036854775807\n"]
+
+## Program with branches depending on input and errors for some lanes
+#  (zero division, invalid input).
+BRANCHES = """.IPPcode22
+DEFVAR GF@n
+DEFVAR GF@r
+READ GF@n int
+LT GF@r GF@n int@0
+JUMPIFEQ negative GF@r bool@true
+MUL GF@r GF@n GF@n
+IDIV GF@r GF@r GF@n
+WRITE GF@r
+EXIT int@0
+LABEL negative
+SUB GF@n int@0 GF@n
+WRITE GF@n
+EXIT int@3
+"""
+
+## Load program.
+#  @param source IPPcode22 source code.
+#  @return Sorted list of instructions.
+def _load(source):
+  interpreter = Interpreter()
+  parse_text(io.StringIO(source), interpreter)
+  interpreter.instr_sort()
+  return interpreter._instr_list
+
+## Check batch results against scalar runs.
+#  @param source IPPcode22 source code.
+#  @return List of LaneResult objects.
+def _check(source):
+  instr_list = _load(source)
+  results = run_batch(instr_list, INPUTS)
+  for input_text, result in zip(INPUTS, results):
+    stdout, _, exit_code = run_program(instr_list, input_text)
+    assert (result.stdout, result.exit_code) == (stdout, exit_code), input_text
+  return results
+
+def test_branches():
+  results = _check(BRANCHES)
+  assert sum(result.vectorized for result in results) >= 3
+
+def test_generated():
+  rng = random.Random(33)
+  for _ in range(5):
+    program = ProgramGenerator(rng, 100, loop_iterations = 3, mix = (5, 1, 0),
+                               label_density = 0.2).generate()
+    _check(to_text(program))
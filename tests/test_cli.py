@@ -0,0 +1,30 @@
+## @package test_cli
+#  Tests of rejected combinations of command line options.
+
+from conftest import INTERPRET_SCRIPT
+
+import subprocess
+import sys
+
+import pytest
+
+## Program run with rejected options.
+SOURCE = ".IPPcode22\nWRITE string@a\n"
+
+@pytest.mark.parametrize("options", [
+  ("--metrics", "metrics.prom", "--engine", "blocks"),
+  ("--flight-recorder", "8", "--engine", "blocks"),
+  ("--introspect", "-", "--engine", "blocks"),
+])
+def test_rejected_options(run_ipp, options):
+  assert run_ipp(SOURCE, *options) == ("", 10)
+
+@pytest.mark.parametrize("option", ["--inline", "--memoize", "--lower-stack"])
+def test_replay_of_store_rejected(run_ipp, tmp_path, option):
+  store = str(tmp_path / "prog.store")
+  assert run_ipp(SOURCE, "--store-out", store) == ("a", 0)
+  assert run_ipp("", "--source", store, "--record", "rec", source_format = "store") == ("a", 0)
+  # without --source, format of replayed program is known only from recording
+  process = subprocess.run([sys.executable, INTERPRET_SCRIPT, "--replay", "rec", option],
+                           capture_output = True, text = True, cwd = tmp_path, timeout = 60)
+  assert (process.stdout, process.returncode) == ("", 10)
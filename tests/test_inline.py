@@ -0,0 +1,39 @@
+## @package test_inline
+#  Tests of inlining of small subroutines.
+
+## Program calling subroutines with body of one instruction,
+#  without body and with error.
+SOURCE = """.IPPcode22
+DEFVAR GF@x
+MOVE GF@x int@1
+CALL f
+CALL f
+WRITE GF@x
+CALL g
+WRITE string@\\010
+CALL h
+LABEL f
+ADD GF@x GF@x GF@x
+RETURN
+LABEL g
+POPS GF@x
+RETURN
+LABEL h
+RETURN
+"""
+
+def test_output(run_ipp):
+  plain = run_ipp(SOURCE)
+  assert plain == ("4", 56)
+  assert run_ipp(SOURCE, "--inline") == plain
+  source = SOURCE.replace("POPS GF@x", "PUSHS GF@x\nPOPS GF@x").replace("CALL h", "CALL h\nEXIT int@0")
+  plain = run_ipp(source)
+  assert plain == ("4\n", 0)
+  assert run_ipp(source, "--inline") == plain
+
+def test_coverage(run_ipp, tmp_path):
+  run_ipp(SOURCE, "--coverage", "plain.txt")
+  run_ipp(SOURCE, "--coverage", "inlined.txt", "--inline")
+  plain = (tmp_path / "plain.txt").read_text()
+  assert plain.startswith("Covered: 9/16\n")
+  assert (tmp_path / "inlined.txt").read_text() == plain
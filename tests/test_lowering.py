@@ -0,0 +1,103 @@
+## @package test_lowering
+#  Differential tests of lowering of STACK instructions.
+#
+#  Random stack programs are run with and without lowering,
+#  output, errors and exit code must be the same.
+
+from bench.programs import to_text
+from interpret.core import Interpreter
+from interpret.lowering import lower_stack
+from interpret.runner import run_program
+from parse.parse_text import parse_text
+
+import io
+import random
+
+import pytest
+
+## Number of generated programs.
+PROGRAMS = 300
+
+## Defined variables (GF@u is not initialized), GF@nx is not defined.
+VARS = ["GF@a", "GF@b", "GF@c", "GF@u"]
+## Constant operands.
+CONSTS = [("int", "1"), ("int", "0"), ("int", "7"), ("int", "98"), ("bool", "true"),
+          ("string", "ab"), ("nil", "nil"), ("int", "-1"), ("int", "1114112")]
+## Stack operations.
+OPS = ["ADDS", "SUBS", "MULS", "LTS", "GTS", "EQS", "ANDS", "ORS", "NOTS",
+       "INT2CHARS", "STRI2INTS"]
+
+## Generate random stack program.
+#  @param rng Random generator.
+#  @return List of instructions.
+def _generate(rng):
+  program = [("DEFVAR", [("var", var)]) for var in VARS]
+  program += [("MOVE", [("var", var), rng.choice(CONSTS)]) for var in VARS[:3]]
+  for idx in range(rng.randint(1, 14)):
+    r = rng.random()
+    if r < 0.35:
+      var = rng.choice(VARS if rng.random() < 0.1 else VARS[:3])
+      program.append(("PUSHS", [("var", var) if rng.random() < 0.5 else rng.choice(CONSTS)]))
+    elif r < 0.6:
+      program.append((rng.choice(OPS), []))
+    elif r < 0.75:
+      program.append(("POPS", [("var", "GF@nx" if rng.random() < 0.1 else rng.choice(VARS[:3]))]))
+    elif r < 0.85:
+      program.append((rng.choice(["JUMPIFEQS", "JUMPIFNEQS"]), [("label", "end")]))
+    elif r < 0.9:
+      program.append(("WRITE", [("var", rng.choice(VARS[:3]))]))
+    else:
+      program.append(("LABEL", [("label", f"l{idx}")]))
+  program.append(("LABEL", [("label", "end")]))
+  for var in VARS[:3]:
+    program += [("WRITE", [("var", var)]), ("WRITE", [("string", "|")])]
+  return program
+
+## Load program.
+#  @param source IPPcode22 source code.
+#  @param lower  Whether stack instructions are lowered.
+#  @return Interpreter with loaded instructions.
+def _load(source, lower):
+  interpreter = Interpreter()
+  parse_text(io.StringIO(source), interpreter)
+  interpreter.instr_sort()
+  interpreter.find_labels()
+  if lower:
+    lower_stack(interpreter)
+  return interpreter
+
+## Run loaded program.
+#  @param interpreter Interpreter with loaded instructions.
+#  @return Tuple of standard output, standard error output and exit code.
+def _run(interpreter):
+  return run_program(interpreter._instr_list, "", interpreter._registers)
+
+def test_random_programs():
+  rng = random.Random(41)
+  lowered = 0
+  for _ in range(PROGRAMS):
+    source = to_text(_generate(rng))
+    plain = _load(source, False)
+    lowered_interpreter = _load(source, True)
+    assert _run(lowered_interpreter) == _run(plain), source
+    lowered += len(lowered_interpreter._instr_list) < len(plain._instr_list)
+  assert lowered > PROGRAMS // 4
+
+@pytest.mark.parametrize("codepoint", ["-1", "1114112"])
+def test_invalid_codepoint_popped_to_undefined_variable(codepoint):
+  source = f".IPPcode22\nPUSHS int@{codepoint}\nINT2CHARS\nPOPS GF@nx\n"
+  plain = _run(_load(source, False))
+  assert plain[2] == 58
+  assert _run(_load(source, True)) == plain
+
+def test_huge_orders(run_ipp):
+  source = ('<?xml version="1.0" encoding="UTF-8"?>\n<program language="IPPcode22">\n'
+            '<instruction order="99999999999999999999" opcode="ADDS"/>\n'
+            '<instruction order="99999999999999999999999" opcode="WRITE">'
+            '<arg1 type="string">b</arg1></instruction>\n'
+            '<instruction order="1" opcode="PUSHS"><arg1 type="int">1</arg1></instruction>\n'
+            '<instruction order="2" opcode="PUSHS"><arg1 type="int">2</arg1></instruction>\n'
+            '</program>\n')
+  plain = run_ipp(source, source_format = "xml")
+  assert plain == ("b", 0)
+  assert run_ipp(source, "--lower-stack", source_format = "xml") == plain
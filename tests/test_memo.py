@@ -0,0 +1,62 @@
+## @package test_memo
+#  Tests of memoization of pure subroutines.
+
+## Subroutine pushes temporary frame of the caller and writes
+#  result to it (the usual calling convention).
+TF_CONVENTION = """.IPPcode22
+DEFVAR GF@i
+MOVE GF@i int@0
+LABEL loop
+JUMPIFEQ end GF@i int@3
+CREATEFRAME
+DEFVAR TF@x
+MOVE TF@x int@5
+CALL sq
+WRITE TF@r
+WRITE string@\\010
+ADD GF@i GF@i int@1
+JUMP loop
+LABEL end
+EXIT int@0
+LABEL sq
+PUSHFRAME
+DEFVAR LF@r
+MUL LF@r LF@x LF@x
+POPFRAME
+RETURN
+"""
+
+## Pure subroutine not touching temporary frame of the caller.
+KEEP_FRAME = """.IPPcode22
+DEFVAR GF@i
+DEFVAR GF@r
+MOVE GF@i int@0
+LABEL loop
+CREATEFRAME
+DEFVAR TF@x
+MOVE TF@x GF@i
+PUSHS int@4
+CALL double
+POPS GF@r
+WRITE TF@x
+WRITE string@\\032
+WRITE GF@r
+WRITE string@\\010
+ADD GF@i GF@i int@1
+JUMPIFNEQ loop GF@i int@3
+EXIT int@0
+LABEL double
+PUSHS int@2
+MULS
+RETURN
+"""
+
+def test_tf_calling_convention(run_ipp):
+  expected = ("25\n25\n25\n", 0)
+  assert run_ipp(TF_CONVENTION) == expected
+  assert run_ipp(TF_CONVENTION, "--memoize") == expected
+
+def test_untouched_tf_is_kept(run_ipp):
+  expected = ("0 8\n1 8\n2 8\n", 0)
+  assert run_ipp(KEEP_FRAME) == expected
+  assert run_ipp(KEEP_FRAME, "--memoize") == expected
@@ -0,0 +1,28 @@
+## @package test_order
+#  Tests of instruction ordering.
+
+## Create XML program writing strings in order of instructions.
+#  @param orders List of (order, string) tuples in document order.
+#  @return XML document string.
+def _program(orders):
+  instrs = "".join(f'<instruction order="{order}" opcode="WRITE">'
+                   f'<arg1 type="string">{text}</arg1></instruction>\n'
+                   for order, text in orders)
+  return ('<?xml version="1.0" encoding="UTF-8"?>\n'
+          f'<program language="IPPcode22">\n{instrs}</program>\n')
+
+def test_sparse_orders(run_ipp):
+  source = _program([(5, "c"), (1, "a"), (3, "b")])
+  assert run_ipp(source, source_format = "xml") == ("abc", 0)
+  source = _program([(1000000, "c"), (1, "a"), (500, "b")])
+  assert run_ipp(source, source_format = "xml") == ("abc", 0)
+
+def test_huge_orders(run_ipp):
+  source = _program([(99999999999999999999, "b"), (1, "a")])
+  assert run_ipp(source, source_format = "xml") == ("ab", 0)
+
+def test_duplicate_order(run_ipp):
+  source = _program([(2, "a"), (1, "b"), (2, "c")])
+  assert run_ipp(source, source_format = "xml") == ("", 32)
+  source = _program([(99999999999999999999, "a"), (1, "b"), (99999999999999999999, "c")])
+  assert run_ipp(source, source_format = "xml") == ("", 32)
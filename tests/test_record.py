@@ -0,0 +1,19 @@
+## @package test_record
+#  Tests of recording and replay of program I/O.
+
+## Program reading line and writing carriage returns.
+SOURCE = """.IPPcode22
+DEFVAR GF@s
+READ GF@s string
+WRITE string@a\\013b
+WRITE GF@s
+WRITE string@\\013\\010c
+"""
+
+def test_round_trip_with_carriage_returns(run_ipp, tmp_path):
+  _, code = run_ipp(SOURCE, "--record", "rec", input_text = "x\r\ny\n")
+  assert code == 0
+  output = (tmp_path / "rec" / "output").read_bytes()
+  assert b"a\rb" in output and output.endswith(b"\r\nc")
+  _, code = run_ipp(SOURCE, "--replay", "rec")
+  assert code == 0
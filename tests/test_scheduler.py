@@ -0,0 +1,167 @@
+## @package test_scheduler
+#  Tests of cooperative scheduler and stepping of interpreter.
+
+from interpret.core import Interpreter
+from interpret.instruction import Instruction
+from interpret.scheduler import InputBlocked, Scheduler
+from parse.parse_text import parse_text
+
+import asyncio
+import contextlib
+import io
+
+import pytest
+
+## Program writing five characters.
+WRITES = ".IPPcode22\n" + "".join(f"WRITE string@{c}\n" for c in "abcde")
+
+## Program writing read integer.
+ECHO = ".IPPcode22\nDEFVAR GF@x\nREAD GF@x int\nWRITE GF@x\n"
+
+## Load program.
+#  @param source IPPcode22 source code.
+#  @return Interpreter with loaded instructions.
+def _load(source):
+  interpreter = Interpreter()
+  parse_text(io.StringIO(source), interpreter)
+  interpreter.instr_sort()
+  interpreter.find_labels()
+  return interpreter
+
+## Create scheduler which remembers order of run quanta.
+#  @param quantum Number of instructions run at once.
+#  @param policy  Scheduling policy.
+#  @return Tuple of scheduler and list of names of run programs.
+def _traced_scheduler(quantum, policy = "round-robin"):
+  scheduler = Scheduler(quantum, policy)
+  trace = []
+  run_quantum = scheduler._run_quantum
+  def traced(program):
+    trace.append(program.name)
+    run_quantum(program)
+  scheduler._run_quantum = traced
+  return scheduler, trace
+
+## Add program to scheduler.
+#  @param scheduler Scheduler.
+#  @param name      Name of program in trace.
+#  @param source    IPPcode22 source code.
+#  @param reader    asyncio.StreamReader with input or None.
+#  @param priority  Priority of program.
+#  @return Program object.
+def _add(scheduler, name, source, reader = None, priority = 0):
+  program = scheduler.add(_load(source), reader, priority)
+  program.name = name
+  return program
+
+## Feed input stream after a delay.
+#  @param reader asyncio.StreamReader.
+#  @param data   Bytes of input (stream ends after them).
+async def _feed_later(reader, data):
+  await asyncio.sleep(0.05)
+  reader.feed_data(data)
+  reader.feed_eof()
+
+def test_round_robin():
+  scheduler, trace = _traced_scheduler(2)
+  for name in "ABC":
+    _add(scheduler, name, WRITES)
+  assert asyncio.run(scheduler.run()) == [0, 0, 0]
+  assert "".join(trace) == "ABCABCABC"
+  assert [program.stdout.getvalue() for program in scheduler.programs] == ["abcde"] * 3
+
+def test_priority():
+  scheduler, trace = _traced_scheduler(2, "priority")
+  _add(scheduler, "A", WRITES)
+  _add(scheduler, "B", WRITES, priority = 2)
+  _add(scheduler, "C", WRITES, priority = 1)
+  _add(scheduler, "D", WRITES, priority = 1)
+  assert asyncio.run(scheduler.run()) == [0, 0, 0, 0]
+  # equal priorities alternate
+  assert "".join(trace) == "BBBCDCDCDAAA"
+
+def test_read_waits_for_input():
+  async def run():
+    scheduler, trace = _traced_scheduler(1)
+    reader = asyncio.StreamReader()
+    echo = _add(scheduler, "E", ECHO, reader)
+    other = _add(scheduler, "W", WRITES)
+    feeder = asyncio.ensure_future(_feed_later(reader, b"42\n"))
+    codes = await scheduler.run()
+    await feeder
+    return codes, trace, echo, other
+  codes, trace, echo, other = asyncio.run(run())
+  assert codes == [0, 0]
+  assert echo.stdout.getvalue() == "42"
+  assert other.stdout.getvalue() == "abcde"
+  # READ blocks in the second quantum of E, W runs to the end, READ is run again
+  assert "".join(trace) == "EWEWWWWEE"
+
+@pytest.mark.parametrize("data", [None, b"", b"7"])
+def test_end_of_input(data):
+  source = ECHO + "DEFVAR GF@t\nTYPE GF@t GF@x\nWRITE GF@t\nREAD GF@x int\nWRITE GF@x\n"
+  async def run():
+    scheduler = Scheduler(1)
+    reader = None
+    if data is not None:
+      reader = asyncio.StreamReader()
+      reader.feed_data(data)
+      reader.feed_eof()
+    program = scheduler.add(_load(source), reader)
+    return await scheduler.run(), program.stdout.getvalue()
+  # line without newline is read, then input ends
+  expected = "7int" if data else "nil"
+  assert asyncio.run(run()) == ([0], expected)
+
+def test_outputs_and_exit_codes():
+  scheduler = Scheduler(1)
+  exits = scheduler.add(_load(".IPPcode22\nWRITE string@x\nEXIT int@5\nWRITE string@y\n"))
+  fails = scheduler.add(_load(".IPPcode22\nWRITE string@z\nWRITE GF@nx\n"))
+  writes = scheduler.add(_load(WRITES))
+  assert asyncio.run(scheduler.run()) == [5, 54, 0]
+  assert [exits.stdout.getvalue(), fails.stdout.getvalue(), writes.stdout.getvalue()] \
+         == ["x", "z", "abcde"]
+  assert fails.stderr.getvalue() != ""
+  assert exits.stderr.getvalue() == writes.stderr.getvalue() == ""
+
+## Run steps of interpreter.
+#  @param interpreter Interpreter with loaded instructions.
+#  @param count       Maximal number of instructions to run.
+#  @return Tuple of result of step and written output.
+def _step(interpreter, count):
+  prev_interpreter = Instruction._interpreter
+  Instruction.switch_interpreter(interpreter)
+  stdout = io.StringIO()
+  try:
+    with contextlib.redirect_stdout(stdout):
+      return interpreter.step(count), stdout.getvalue()
+  finally:
+    Instruction.switch_interpreter(prev_interpreter)
+
+def test_step_budget():
+  interpreter = _load(WRITES)
+  assert _step(interpreter, 2) == (False, "ab")
+  assert interpreter._counter == 2
+  assert _step(interpreter, 0) == (False, "")
+  assert _step(interpreter, 2) == (False, "cd")
+  assert interpreter._counter == 4
+  assert _step(interpreter, 10) == (True, "e")
+  assert interpreter._counter == 5
+  assert _step(interpreter, 1) == (True, "")
+
+def test_step_resumes_blocked_instruction():
+  class Input:
+    lines = []
+    def readline(self):
+      if not self.lines:
+        raise InputBlocked()
+      return self.lines.pop(0)
+
+  interpreter = _load(ECHO)
+  interpreter.input_stream = Input()
+  with pytest.raises(InputBlocked):
+    _step(interpreter, 5)
+  # counter stays on READ
+  assert interpreter._counter == 1
+  Input.lines.append("3\n")
+  assert _step(interpreter, 5) == (True, "3")
@@ -0,0 +1,77 @@
+## @package test_spill
+#  Tests of data stack spilling.
+
+from interpret.spill import SpillingStack, decode_values, encode_values
+from interpret.structs import Value
+
+import pytest
+
+## Create value.
+#  @param type  Type of value.
+#  @param value Value.
+#  @return Value object.
+def _value(type, value):
+  result = Value()
+  result.type = type
+  result.value = value
+  return result
+
+## Values of all types and encodings.
+VALUES = [_value("int", 0), _value("int", -(1 << 63)), _value("int", (1 << 63) - 1),
+          _value("int", 1 << 63), _value("int", -(10 ** 30)), _value("string", ""),
+          _value("string", "žluť\n\udc80"), _value("bool", True), _value("bool", False),
+          _value("nil", None)]
+
+## Convert values to comparable tuples.
+#  @param values Iterable of values.
+#  @return List of (type, value) tuples.
+def _plain(values):
+  return [(value.type, value.value) for value in values]
+
+def test_encode_round_trip():
+  assert _plain(decode_values(encode_values(VALUES))) == _plain(VALUES)
+  assert decode_values(encode_values([])) == []
+
+def test_operations_across_segments():
+  stack = SpillingStack(4)
+  expected = []
+  for idx in range(50):
+    value = VALUES[idx % len(VALUES)]
+    stack.append(value)
+    expected.append(value)
+  assert stack.spills > 0
+  assert len(stack) == len(expected)
+  assert _plain(stack) == _plain(expected)
+  assert _plain(stack[-7:]) == _plain(expected[-7:])
+  assert _plain([stack[3], stack[-1]]) == _plain([expected[3], expected[-1]])
+
+  # deleting top slice and popping reach spilled segments
+  del stack[len(stack) - 13:]
+  del expected[len(expected) - 13:]
+  assert _plain(stack) == _plain(expected)
+  for _ in range(20):
+    assert _plain([stack.pop()]) == _plain([expected.pop()])
+  stack.extend(VALUES)
+  expected.extend(VALUES)
+  while expected:
+    assert _plain([stack.pop()]) == _plain([expected.pop()])
+  assert not stack
+  with pytest.raises(IndexError):
+    stack.pop()
+
+def test_close():
+  stack = SpillingStack(2)
+  stack.extend(VALUES)
+  stack.close()
+  assert len(stack) == 0 and stack._file is None and stack._map is None
+  stack.extend(VALUES)
+  assert _plain(stack) == _plain(VALUES)
+  stack.close()
+
+def test_program(run_ipp):
+  source = ".IPPcode22\nDEFVAR GF@i\nMOVE GF@i int@0\nLABEL push\nPUSHS GF@i\n" \
+           "ADD GF@i GF@i int@1\nJUMPIFNEQ push GF@i int@100\nLABEL pop\nPOPS GF@i\n" \
+           "WRITE GF@i\nJUMPIFNEQ pop GF@i int@0\n"
+  plain = run_ipp(source)
+  assert plain == ("".join(str(idx) for idx in range(99, -1, -1)), 0)
+  assert run_ipp(source, "--stack-spill-threshold", "4") == plain
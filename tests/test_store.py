@@ -0,0 +1,32 @@
+## @package test_store
+#  Tests of program store.
+
+## Program with labels, calls and constants of all types.
+SOURCE = """.IPPcode22
+DEFVAR GF@s
+MOVE GF@s string@a\\032b
+CALL f
+WRITE GF@s
+WRITE bool@true
+WRITE nil@nil
+WRITE int@-7
+EXIT int@3
+LABEL f
+CONCAT GF@s GF@s string@ž
+RETURN
+"""
+
+def test_round_trip(run_ipp, tmp_path):
+  store = str(tmp_path / "prog.store")
+  plain = run_ipp(SOURCE, "--store-out", store)
+  assert plain == ("a bžtrue-7", 3)
+  # the later --source option replaces program written by fixture
+  assert run_ipp("", "--source", store, source_format = "store") == plain
+
+def test_huge_order_rejected(run_ipp, tmp_path):
+  source = ('<?xml version="1.0" encoding="UTF-8"?>\n<program language="IPPcode22">\n'
+            '<instruction order="99999999999999999999" opcode="WRITE">'
+            '<arg1 type="string">a</arg1></instruction>\n</program>\n')
+  assert run_ipp(source, source_format = "xml") == ("a", 0)
+  assert run_ipp(source, "--store-out", str(tmp_path / "prog.store"),
+                 source_format = "xml") == ("", 10)
@@ -0,0 +1,40 @@
+## @package test_testsuite
+#  Tests of test-suite runner.
+
+from interpret.testsuite import find_tests, run_tests
+
+import pytest
+
+## Create test files.
+#  @param directory Directory of tests.
+#  @param name      Name of test.
+#  @param files     Dictionary of extension to content.
+def _write_test(directory, name, files):
+  for extension, content in files.items():
+    (directory / f"{name}.{extension}").write_text(content)
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_results(tmp_path, jobs):
+  _write_test(tmp_path, "ok", {"src": ".IPPcode22\nREAD GF@x int\n", "rc": "54\n"})
+  _write_test(tmp_path, "echo", {"src": ".IPPcode22\nDEFVAR GF@x\nREAD GF@x int\nWRITE GF@x\n",
+                                 "in": "42\n", "out": "42"})
+  _write_test(tmp_path, "wrong", {"src": ".IPPcode22\nWRITE int@1\n", "out": "2"})
+  _write_test(tmp_path, "badrc", {"src": ".IPPcode22\n", "rc": "zero\n"})
+
+  results = run_tests(find_tests([str(tmp_path)]), jobs, "text")
+  failures = {result.name.rsplit("/", 1)[1]: result.failure for result in results}
+  assert failures["ok"] is None
+  assert failures["echo"] is None
+  assert failures["wrong"] == "output differs"
+  assert failures["badrc"] == f"invalid exit code 'zero' in {tmp_path / 'badrc'}.rc"
+
+@pytest.mark.parametrize("in_process", [True, False])
+def test_carriage_return(tmp_path, in_process):
+  _write_test(tmp_path, "cr", {"src": ".IPPcode22\nWRITE string@a\\013b\\013\\010\n",
+                               "out": "a\rb\r\n"})
+  _write_test(tmp_path, "lf", {"src": ".IPPcode22\nWRITE string@a\\010b\n", "out": "a\rb"})
+
+  results = run_tests(find_tests([str(tmp_path)]), 1, "text", in_process = in_process)
+  failures = {result.name.rsplit("/", 1)[1]: result.failure for result in results}
+  assert failures["cr"] is None
+  assert failures["lf"] == "output differs"
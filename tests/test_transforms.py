@@ -0,0 +1,80 @@
+## @package test_transforms
+#  Differential tests of engines and program transforms.
+#
+#  Each program is run by the plain instruction loop and with each
+#  engine or transform, standard output and exit code must be the same.
+#  Programs are in tests/programs (usual test layout, IPPcode22 text)
+#  and generated by bench.generator.
+
+from bench.generator import ProgramGenerator
+from bench.programs import to_text
+
+import glob
+import os
+import random
+
+import pytest
+
+## Directory of test programs.
+PROGRAMS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "programs")
+## Names of test programs.
+PROGRAMS = sorted(os.path.basename(path)[:-4]
+                  for path in glob.glob(os.path.join(PROGRAMS_DIR, "*.src")))
+## Seeds of generated programs.
+GENERATED = [1, 2, 3]
+
+## Options of engines and transforms compared with plain run.
+OPTIONS = [
+  ("--engine", "blocks"),
+  ("--lower-stack",),
+  ("--memoize",),
+  ("--inline",),
+  ("--inline", "--inline-size", "2"),
+  ("--stack-spill-threshold", "2"),
+  ("--lower-stack", "--inline", "--memoize", "--engine", "blocks"),
+]
+
+## Read file of test program.
+#  @param name      Name of program.
+#  @param extension Extension of file.
+#  @param default   Content of missing file.
+#  @return Content of file.
+def _read(name, extension, default = ""):
+  path = os.path.join(PROGRAMS_DIR, f"{name}.{extension}")
+  if not os.path.exists(path):
+    return default
+  with open(path, "r") as program_file:
+    return program_file.read()
+
+## Source code and input of program.
+#  @param program Name of test program or seed of generated program.
+#  @return Tuple of source code and input text.
+def _program(program):
+  if isinstance(program, int):
+    rng = random.Random(program)
+    generated = ProgramGenerator(rng, 150, loop_iterations = 4, recursion_depth = 6,
+                                 label_density = 0.2).generate()
+    return to_text(generated), f"{rng.randint(-100, 100)}\n"
+  return _read(program, "src"), _read(program, "in")
+
+@pytest.mark.parametrize("program", PROGRAMS)
+def test_expected_results(run_ipp, program):
+  source, input_text = _program(program)
+  expected = (_read(program, "out"), int(_read(program, "rc", "0")))
+  assert run_ipp(source, input_text = input_text) == expected
+
+@pytest.mark.parametrize("options", OPTIONS, ids = " ".join)
+@pytest.mark.parametrize("program", PROGRAMS + GENERATED)
+def test_same_as_plain(run_ipp, program, options):
+  source, input_text = _program(program)
+  plain = run_ipp(source, input_text = input_text)
+  assert run_ipp(source, *options, input_text = input_text) == plain
+
+@pytest.mark.parametrize("program", PROGRAMS + GENERATED)
+def test_store_round_trip(run_ipp, tmp_path, program):
+  source, input_text = _program(program)
+  store = str(tmp_path / "prog.store")
+  plain = run_ipp(source, "--store-out", store, input_text = input_text)
+  # the later --source option replaces program written by fixture
+  assert run_ipp("", "--source", store, input_text = input_text,
+                 source_format = "store") == plain
@@ -26,6 +26,8 @@ NOVALUE_ERROR   = 56
 INVVALUE_ERROR  = 57
 ## String operation error.
 STRING_ERROR    = 58
+## Replayed run differs from recording.
+REPLAY_ERROR    = 90
 
 ## Error exit of a program.
 #  @details Print message to STDERR and